@@ -0,0 +1,152 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, List
+import numpy as np
+from benchmarks.market_generator import generate_rates, generate_universe, resample, to_frame
+from src.application.backtesting_service import BacktestingService
+from src.application.trading_service import TradingService
+from src.domain.entities.candle_series import CandleSeries
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
+from src.infrastructure.data_providers.mt5_data_provider import DataFetcher
+from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.indicators.batch_indicators import add_technical_indicators_batch
+from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
+from src.infrastructure.trading_strategies.llm_trading_strategy import TradingModule
+
+SYMBOL = 'SYM000'
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # Builds the inputs once and returns the call to time
+    setup: Callable[[int], Callable[[], object]]
+    number: int
+    repeat: int = 5
+
+
+class StubLLMApiClient(LLMApiClient):
+    """LLMApiClient without the network: the prompt is built as usual and answered with a decision 2 ATR away."""
+
+    def __init__(self):
+        super().__init__('http://localhost/v1/chat/completions', 'benchmark', latency_budget=0, streaming=False)
+
+    def get_trading_decision(self, one_minute_data, five_minute_data, allowed_side=None) -> str:
+        self._generate_prompt(one_minute_data, five_minute_data, allowed_side)
+        price = float(np.asarray(one_minute_data['close'])[-1])
+        risk = 2 * float(np.asarray(one_minute_data['ATR'])[-1])
+        side = allowed_side or 'buy'
+        direction = 1 if side == 'buy' else -1
+        return json.dumps({
+            'signal': side,
+            'stop_loss': round(price - direction * risk, 2),
+            'take_profit': round(price + direction * 2 * risk, 2),
+            'explanation': 'Benchmark decision.',
+        })
+
+
+def _data_fetcher(seed: int, columns=None) -> DataFetcher:
+    broker = SimulatedBroker({SYMBOL: generate_rates(2000, seed)}, seed=seed)
+    return DataFetcher(SYMBOL, broker=broker, indicator_columns=columns)
+
+
+def _windows(seed: int, candles: int = 50):
+    one_minute = generate_rates(3000, seed)
+    data_fetcher = _data_fetcher(seed)
+    one_minute_data = data_fetcher._add_technical_indicators(to_frame(one_minute))
+    five_minute_data = data_fetcher._add_technical_indicators(to_frame(resample(one_minute, 5)))
+    return CandleSeries.from_frame(one_minute_data).tail(candles), CandleSeries.from_frame(five_minute_data).tail(candles)
+
+
+def add_technical_indicators(seed: int):
+    data_fetcher = _data_fetcher(seed)
+    data = to_frame(generate_rates(3000, seed))
+    return lambda: data_fetcher._add_technical_indicators(data)
+
+
+def add_decision_indicators(seed: int):
+    data_fetcher = _data_fetcher(seed, TradingModule.DECISION_COLUMNS)
+    data = to_frame(generate_rates(3000, seed))
+    return lambda: data_fetcher._add_technical_indicators(data)
+
+
+def batch_indicators(seed: int):
+    frames = {symbol: to_frame(rates) for symbol, rates in generate_universe(20, 5000, seed).items()}
+    return lambda: add_technical_indicators_batch(frames)
+
+
+def simulate_trade(seed: int):
+    # _simulate_trade reads nothing from the service, whose constructor needs a terminal for its data fetcher
+    backtesting_service = BacktestingService.__new__(BacktestingService)
+    future_data = to_frame(generate_rates(5000, seed))
+    price = float(future_data['close'].iloc[0])
+    decision = SimpleNamespace(signal='buy')
+    return lambda: backtesting_service._simulate_trade(future_data, decision, price, price * 0.99, price * 1.02)
+
+
+def simulate_trades(seed: int):
+    backtesting_service = BacktestingService.__new__(BacktestingService)
+    data = to_frame(generate_rates(20000, seed))
+    rng = np.random.default_rng(seed)
+    starts = np.sort(rng.integers(0, len(data) - 1, 1000))
+    sides = rng.choice([1, -1], 1000)
+    prices = data['close'].to_numpy()[starts]
+    stop_losses = prices * (1 - sides * 0.005)
+    take_profits = prices * (1 + sides * 0.01)
+    return lambda: backtesting_service.simulate_trades(data, starts, sides, stop_losses, take_profits)
+
+
+def parse_json_response(seed: int):
+    trading_module = TradingModule(api_client=None)
+    response = '```json\n{"signal": "buy", "stop_loss": 59850.5, "take_profit": 60300.25, "explanation": "Uptrend with rising ADX."}\n```'
+    return lambda: trading_module._parse_llm_response(response)
+
+
+def parse_text_response(seed: int):
+    trading_module = TradingModule(api_client=None)
+    response = ("**Signal:** Sell\n**Stop Loss:** $60,150.00\n**Take Profit:** $59,700.50\n"
+                "**Explanation:** Price is below the 20-period SMA and ADX confirms the downtrend.")
+    return lambda: trading_module._parse_llm_response(response)
+
+
+def generate_prompt(seed: int):
+    llm_api_client = StubLLMApiClient()
+    one_minute_window, five_minute_window = _windows(seed)
+    return lambda: llm_api_client._generate_prompt(one_minute_window, five_minute_window, 'buy')
+
+
+def can_open_more_trades(seed: int):
+    risk_manager = RiskManager()
+    one_minute_window, five_minute_window = _windows(seed)
+    account_info = SimpleNamespace(balance=10000.0, equity=10000.0, margin=100.0)
+    market_data = {'1m': one_minute_window, '5m': five_minute_window}
+    current_time = datetime(2024, 1, 2, 12)
+    return lambda: risk_manager.can_open_more_trades(account_info, [], market_data, current_time)
+
+
+def trading_cycle(seed: int):
+    broker = SimulatedBroker({SYMBOL: generate_rates(6000, seed)}, seed=seed)
+    trading_service = TradingService([SYMBOL], broker=broker, trading_modules={SYMBOL: TradingModule(StubLLMApiClient())})
+
+    def run():
+        # One bar closes per cycle, so every cycle sees new data as in live trading
+        if not broker.advance(1):
+            raise RuntimeError("Benchmark market data exhausted")
+        trading_service._trading_cycle(SYMBOL)
+    return run
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark('indicators.add_technical_indicators', add_technical_indicators, number=5),
+    Benchmark('indicators.decision_columns', add_decision_indicators, number=10),
+    Benchmark('indicators.batch_20x5000', batch_indicators, number=1),
+    Benchmark('backtest.simulate_trade', simulate_trade, number=20),
+    Benchmark('backtest.simulate_trades_1000', simulate_trades, number=5),
+    Benchmark('llm.parse_json_response', parse_json_response, number=2000),
+    Benchmark('llm.parse_text_response', parse_text_response, number=2000),
+    Benchmark('llm.generate_prompt', generate_prompt, number=20),
+    Benchmark('risk.can_open_more_trades', can_open_more_trades, number=500),
+    Benchmark('service.trading_cycle', trading_cycle, number=20),
+]
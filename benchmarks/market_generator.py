@@ -0,0 +1,67 @@
+from typing import Dict
+import numpy as np
+import pandas as pd
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE
+from src.infrastructure.data_providers.timeframe_resampler import aggregate_rates
+
+# Volatility multiplier and typical spread (points) of each regime
+REGIMES = {
+    'calm': (0.5, 8),
+    'normal': (1.0, 12),
+    'volatile': (2.5, 30),
+}
+
+
+def generate_rates(bars: int, seed: int = 0, start: str = '2024-01-01', timeframe_minutes: int = 1, price: float = 60000.0,
+                   volatility: float = 0.0008, drift: float = 0.0, regime_persistence: float = 0.995, point: float = 0.01,
+                   exchange_volume: bool = False) -> np.ndarray:
+    """
+    Seeded synthetic rates laid out like MT5 copy_rates_* results. Closes follow a geometric Brownian
+    motion whose volatility switches between regimes (a regime lasts 1 / (1 - regime_persistence) bars on
+    average). Tick volume and spread rise with the regime's volatility; real_volume is 0 as for FX and
+    CFD symbols unless exchange_volume is set.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = np.array([multiplier for multiplier, _ in REGIMES.values()])
+    spreads = np.array([spread for _, spread in REGIMES.values()])
+
+    switches = rng.random(bars) > regime_persistence
+    segment = np.cumsum(switches)
+    regime = rng.integers(0, len(REGIMES), segment[-1] + 1 if bars else 1)[segment]
+    sigma = volatility * multipliers[regime]
+
+    shocks = rng.standard_normal(bars)
+    log_returns = (drift - 0.5 * sigma ** 2) + sigma * shocks
+    close = price * np.exp(np.cumsum(log_returns))
+    open_ = np.r_[price, close[:-1]]
+    # Wicks beyond the body, scaled by the bar's volatility
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.standard_normal(bars)) * sigma * 0.5)
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.standard_normal(bars)) * sigma * 0.5)
+
+    rates = np.empty(bars, dtype=RATE_DTYPE)
+    rates['time'] = int(pd.Timestamp(start).timestamp()) + np.arange(bars) * timeframe_minutes * 60
+    rates['open'] = np.round(open_ / point) * point
+    rates['close'] = np.round(close / point) * point
+    rates['high'] = np.maximum(np.round(high / point) * point, np.maximum(rates['open'], rates['close']))
+    rates['low'] = np.minimum(np.round(low / point) * point, np.minimum(rates['open'], rates['close']))
+    rates['tick_volume'] = np.maximum(rng.poisson(40 * timeframe_minutes * multipliers[regime] * (1 + np.abs(shocks))), 1)
+    rates['spread'] = spreads[regime] + rng.integers(0, 4, bars)
+    rates['real_volume'] = rates['tick_volume'] * rng.integers(1, 20, bars) if exchange_volume else 0
+    return rates
+
+
+def to_frame(rates: np.ndarray) -> pd.DataFrame:
+    """Rates as the DataFrame DataFetcher builds from them."""
+    data = pd.DataFrame(rates)
+    data['time'] = pd.to_datetime(data['time'], unit='s')
+    return data
+
+
+def generate_universe(symbols: int, bars: int, seed: int = 0, **kwargs) -> Dict[str, np.ndarray]:
+    """One independent series per symbol, seeded from `seed`."""
+    return {f'SYM{index:03d}': generate_rates(bars, seed=seed + index, **kwargs) for index in range(symbols)}
+
+
+def resample(rates: np.ndarray, minutes: int) -> np.ndarray:
+    """Higher timeframe bars aggregated from generated M1 rates."""
+    return aggregate_rates(rates, minutes)
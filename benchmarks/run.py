@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, Optional
+import click
+import numpy as np
+import pandas as pd
+from benchmarks.cases import BENCHMARKS, Benchmark
+
+
+def measure(benchmark: Benchmark, seed: int, repeat: Optional[int] = None) -> Dict:
+    """Per-call times of `repeat` rounds of `number` calls, after one untimed warmup call."""
+    run = benchmark.setup(seed)
+    run()
+    rounds = []
+    for _ in range(repeat or benchmark.repeat):
+        started = time.perf_counter()
+        for _ in range(benchmark.number):
+            run()
+        rounds.append((time.perf_counter() - started) / benchmark.number * 1000)
+    rounds = np.array(rounds)
+    return {
+        'median_ms': float(np.median(rounds)),
+        'min_ms': float(rounds.min()),
+        'p95_ms': float(np.percentile(rounds, 95)),
+        'mean_ms': float(rounds.mean()),
+        'number': benchmark.number,
+        'repeat': len(rounds),
+    }
+
+
+def environment(seed: int) -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> Dict[str, Dict]:
+    """Median time of every benchmark relative to the baseline; a regression is a slowdown beyond threshold."""
+    comparison = {}
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+        status = 'regression' if ratio > 1 + threshold else 'improvement' if ratio < 1 - threshold else 'unchanged'
+        comparison[name] = {'baseline_ms': previous['median_ms'], 'ratio': ratio, 'status': status}
+    return comparison
+
+
+@click.command()
+@click.option('--output', 'output_path', type=click.Path(dir_okay=False), default='benchmark_results.json', help='JSON file the results are written to')
+@click.option('--baseline', 'baseline_path', type=click.Path(exists=True, dir_okay=False), default=None, help='Earlier results to compare against')
+@click.option('--threshold', type=float, default=0.10, help='Relative slowdown of the median that counts as a regression')
+@click.option('--filter', 'name_filter', default=None, help='Only run benchmarks whose name contains this text')
+@click.option('--repeat', type=int, default=None, help='Rounds per benchmark instead of each benchmark\'s own')
+@click.option('--seed', type=int, default=0, help='Seed of the synthetic market data')
+def main(output_path, baseline_path, threshold, name_filter, repeat, seed):
+    """Times the hot paths on seeded synthetic data. Exits with status 1 when a benchmark regressed against the baseline."""
+    # Log handlers and the cycle's progress prints would be measured along with the code
+    logging.disable(logging.CRITICAL)
+    results = {}
+    for benchmark in BENCHMARKS:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            results[benchmark.name] = measure(benchmark, seed, repeat)
+        result = results[benchmark.name]
+        click.echo(f"{benchmark.name:<40} {result['median_ms']:>10.3f} ms  (min {result['min_ms']:.3f}, p95 {result['p95_ms']:.3f})")
+
+    report = {'environment': environment(seed), 'results': results}
+    regressions = []
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        report['comparison'] = compare(results, baseline['results'], threshold)
+        click.echo(f"\nAgainst {baseline_path} (commit {baseline['environment'].get('commit')}), threshold {threshold:.0%}:")
+        for name, entry in report['comparison'].items():
+            click.echo(f"{name:<40} {entry['ratio']:>6.2f}x  {entry['status']}")
+            if entry['status'] == 'regression':
+                regressions.append(name)
+
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    click.echo(f"\nResults written to {output_path}")
+    if regressions:
+        click.echo(f"Regressions: {', '.join(regressions)}", err=True)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
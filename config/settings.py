@@ -21,23 +21,88 @@ CONFIG = {
     'MT5_SERVER': os.getenv('MT5_SERVER', 'XMGlobal-MT5-7'),
     'LLM_API_KEY': os.getenv('LLM_API_KEY'),
     'SYMBOL': os.getenv('SYMBOL', 'BTCUSD'),
+    'SYMBOLS': [symbol.strip() for symbol in os.getenv('SYMBOLS', os.getenv('SYMBOL', 'BTCUSD')).split(',') if symbol.strip()],
 
     'TIMEFRAME': 'M5',
     'LLM_API_URL': 'https://api.openai.com/v1/chat/completions',
+    'LLM_MODEL': os.getenv('LLM_MODEL', 'gpt-4o-mini'),
+    'LLM_STRUCTURED_OUTPUT': os.getenv('LLM_STRUCTURED_OUTPUT', 'true').lower() == 'true',  # json_schema answers instead of free text
+    'LLM_STREAMING': os.getenv('LLM_STREAMING', 'false').lower() == 'true',  # stream answers and stop once the decision is known
+    'LLM_LATENCY_BUDGET': 8.0,  # seconds per decision the rolling p95 should stay under, 0 disables hedging and degradation
+    'LLM_HEDGING': os.getenv('LLM_HEDGING', 'false').lower() == 'true',  # duplicate slow requests; hedged requests stream even with LLM_STREAMING off
+    'LLM_HEDGE_PERCENTILE': 90,  # a duplicate request is sent once the first one is slower than this latency percentile
+    'LLM_HEDGE_DEFAULT_DELAY': 4.0,  # seconds, used until enough latencies have been observed
+    'LLM_HEDGE_MODEL': os.getenv('LLM_HEDGE_MODEL'),  # model for hedged duplicates, the active model if unset
+    'LLM_HEDGE_API_URL': os.getenv('LLM_HEDGE_API_URL'),  # endpoint for hedged duplicates, LLM_API_URL if unset
+    'LLM_FALLBACK_MODEL': os.getenv('LLM_FALLBACK_MODEL'),  # faster model switched to when a smaller window is not enough
+    'LLM_DEGRADED_CANDLES': 25,  # candles per timeframe sent while over the latency budget
+    'PROMPT_ENCODING': 'compact',  # compact table or the original 'records' dict dump
+    'PROMPT_PRECISION': None,  # decimals written for prices in compact prompts, None for the quotes' own digits
+    'PROMPT_SIGNIFICANT_DIGITS': 4,  # significant digits of the other indicators in compact prompts
+    'PROMPT_RELATIVE_PRICES': False,  # write price columns as offsets from the last close
+    'PROMPT_TOKEN_BUDGET': 4000,  # shrink the candle window until the prompt fits, None to disable
+    'LLM_MAX_CONCURRENCY': 8,  # requests in flight at once for batch decision generation
+    'LLM_REQUESTS_PER_SECOND': 5,  # token bucket refill rate for batch requests
     'MAX_RETRIES': 3,
     'RETRY_DELAY': 5,
+    'DOWNLOAD_WORKERS': 4,  # history chunks fetched concurrently
+    'DOWNLOAD_BARS_PER_REQUEST': 10_000,  # target bars per history request, chunk spans adapt to the bar density
     'MAX_RISK_PER_TRADE': 0.01,
+    'MIN_REWARD_RATIO': 2,  # stops are tightened until take profit is at least this many times the risk
     'BACKTESTING_START_DATE': BACKTESTING_START_DATE,
     'BACKTESTING_END_DATE': BACKTESTING_END_DATE,
     'CYCLE_INTERVAL': 5, # time waiting until next trade
+    'MT5_HEALTH_CHECK_INTERVAL': 10,  # seconds after a successful terminal call during which no health check is run
+    'MT5_BACKOFF_BASE': 1,  # seconds, doubled after each failed connection attempt
+    'MT5_BACKOFF_MAX': 60,
+    'MT5_FAILURE_THRESHOLD': 5,  # consecutive failed attempts before the connection circuit opens
+    'MT5_CIRCUIT_COOLDOWN': 120,  # seconds the circuit stays open before a new attempt
+    'USE_SIGNAL_GATE': True,  # skip the LLM when the trend filter rules out both sides
+    'TREND_ADX_THRESHOLD': 25,  # minimum ADX for a trend to count as up or down
+    'MAX_DECISION_ATTEMPTS': 5,  # LLM calls per symbol and cycle until a valid decision is returned
+    'PAPER_INITIAL_BALANCE': 10000,
+    'PAPER_SPREAD_POINTS': None,  # None uses the spread stored with each candle
+    'PAPER_SLIPPAGE_POINTS': 2,  # maximum adverse slippage of simulated fills
+    'PAPER_LEVERAGE': 100,
+    'PAPER_WARMUP_BARS': 1000,  # M1 bars of history before the first simulated cycle
+    'SCHEDULER_MODE': 'bar_close',  # bar_close: wake at each TIMEFRAME bar close, poll: also wait until the broker has the new bar
+    'BAR_CLOSE_OFFSET_SECONDS': 0,  # shift of bar boundaries relative to UTC, for H4/D1 cycles on brokers with other session starts
     'MAX_DAILY_TRADES': 5,
     'MIN_MARGIN_LEVEL': 200,  # 200%
     'MAX_SIMULTANEOUS_POSITIONS': 3,
     'MAX_DRAWDOWN': 0.05,  # 5% maximum drawdown
+    'MAX_SYMBOL_DRAWDOWN': 0.02,  # floating loss of a single symbol's positions relative to balance
+    'MAX_PORTFOLIO_POSITIONS': 10,  # open positions across all symbols
+    'SYMBOL_WORKERS': 8,  # symbols processed concurrently by the trading service
     '5MIN_MAX_VOLATILITY': 0.003,  # 0.2% standard deviation in returns
     '1MIN_MAX_VOLATILITY': 0.005,  # 0.2% standard deviation in returns
     #'NO_TRADE_HOURS': [0, 1, 2, 3, 4, 5, 20, 21, 22, 23],  # Hours when no new trades should be opened
     'NO_TRADE_HOURS': [0, 1, 2, 3, 4, 5],  # Hours when no new trades should be opened
+    'INCREMENTAL_INDICATORS': True,  # update indicators bar by bar instead of recomputing the whole window
+    'INDICATOR_DTYPE': None,  # 'float32' stores indicator columns in half the memory, prices stay float64
+    'RESAMPLE_FROM_M1': True,  # derive M5 and higher live timeframes from one M1 series instead of one broker read each
+    'RESAMPLER_M1_HISTORY': 3000,  # M1 bars kept per symbol, bounds the history of resampled timeframes (3000 = 200 M15 bars)
+    'SESSION_OFFSET_MINUTES': 0,  # minutes after midnight UTC at which resampled bars (H4, D1) start
+    'COLLECT_TICKS': True,  # poll ticks in the background during live trading for the spread and volatility checks
+    'TICK_POLL_INTERVAL': 0.1,  # seconds between tick polls
+    'TICK_BUFFER_SIZE': 100_000,  # ticks kept per symbol (about 4 MB)
+    'TICK_WINDOW_SECONDS': 60,  # window the tick spread and volatility are measured over
+    'TICK_MAX_AGE_SECONDS': 5,  # trading pauses when a symbol's ticks have not been collected for this long
+    'MAX_SPREAD_RATIO': 0.002,  # maximum current spread as a fraction of the mid price
+    'TICK_MAX_VOLATILITY': 0.005,  # maximum realized volatility of the mid price over TICK_WINDOW_SECONDS
+    'USE_CANDLE_STORE': True,  # cache historical rates on disk and only download missing ranges
+    'CANDLE_STORE_DIR': os.getenv('CANDLE_STORE_DIR', 'data/candles'),
+    'BACKTEST_POINT': 0.01,  # price increment used to turn price moves into pips when sizing backtest trades
+    'BACKTEST_WARMUP_DAYS': 2,  # history loaded before the start date to warm up indicators
+    'LLM_CACHE_MODE': os.getenv('LLM_CACHE_MODE', 'read_through'),  # off, read_through, record_only or replay_only
+    'LLM_LIVE_CACHE_MODE': os.getenv('LLM_LIVE_CACHE_MODE', 'record_only'),  # live trading records answers for replays but never reuses them
+    'LLM_CACHE_PATH': os.getenv('LLM_CACHE_PATH', 'data/llm_cache.sqlite'),
+    'LLM_CACHE_MAX_BYTES': 256 * 1024 * 1024,  # least recently used responses are evicted past this size
+    'METRICS_ENABLED': True,  # per-stage latency histograms and counters of the trading cycle
+    'METRICS_EXPORT': os.getenv('METRICS_EXPORT'),  # None, prometheus (HTTP endpoint) or jsonl (periodic snapshot file)
+    'METRICS_PORT': 9108,  # port of the Prometheus /metrics endpoint
+    'METRICS_JSONL_PATH': os.getenv('METRICS_JSONL_PATH', 'data/metrics.jsonl'),
+    'METRICS_JSONL_INTERVAL': 60,  # seconds between snapshots appended to METRICS_JSONL_PATH
 }
 
 
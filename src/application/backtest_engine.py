@@ -0,0 +1,158 @@
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from types import SimpleNamespace
+from src.domain.entities.candle_series import CandleSeries
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import POSITION_TYPE_BUY, POSITION_TYPE_SELL
+from src.infrastructure.backtesting.exit_resolver import ExitResolver, SIDE_BUY, SIDE_SELL, SAME_BAR_STOP_LOSS
+from src.infrastructure.data_providers.mt5_data_provider import DataFetcher
+from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = [
+    'entry_time', 'exit_time', 'signal', 'entry_price', 'stop_loss', 'take_profit',
+    'exit_price', 'exit_reason', 'position_size', 'bars_held', 'pnl', 'balance',
+]
+
+
+class BacktestEngine:
+    """
+    Bar-replay backtester. Walks stored M1 candles, builds the same 1m/5m windows the live cycle sees,
+    applies the RiskManager rules and asks a decision source for trades. A decision source is anything
+    with TradingModule's generate_trading_decisions(one_minute_data, five_minute_data) signature.
+    """
+
+    def __init__(self, data_fetcher: DataFetcher, decision_source, risk_manager: RiskManager,
+                 initial_balance: float = 200, decision_interval: int = CONFIG['CYCLE_INTERVAL'],
+                 window: int = 50, point: float = CONFIG['BACKTEST_POINT'], same_bar: str = SAME_BAR_STOP_LOSS):
+        self.data_fetcher = data_fetcher
+        self.decision_source = decision_source
+        self.risk_manager = risk_manager
+        self.initial_balance = initial_balance
+        self.decision_interval = decision_interval
+        self.window = window
+        self.point = point
+        self.same_bar = same_bar
+
+    def run_backtest(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        # Load extra history before start_date so the first windows have warmed-up indicators
+        warmup_start = start_date - pd.Timedelta(days=CONFIG['BACKTEST_WARMUP_DAYS'])
+        one_minute_data = self.data_fetcher.fetch_historical_data(Timeframe.M1, warmup_start, end_date)
+        five_minute_data = self.data_fetcher.fetch_historical_data(Timeframe.M5, warmup_start, end_date)
+        return self.replay(one_minute_data, five_minute_data, start_date)
+
+    def replay(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
+        """Decisions are taken on bars from start_date up to, not including, end_date; trades still open then run to the end of the data."""
+        one_minute_data = self._positional(one_minute_data)
+        five_minute_data = self._positional(five_minute_data)
+
+        one_times = one_minute_data['time'].to_numpy()
+        # A 5m bar is visible to a decision once it has closed, i.e. time + 5 minutes <= decision time
+        five_close_times = (five_minute_data['time'] + pd.Timedelta(minutes=Timeframe.M5.value)).to_numpy()
+        closes = one_minute_data['close'].to_numpy()
+        resolver = ExitResolver(one_minute_data['high'].to_numpy(), one_minute_data['low'].to_numpy(), closes, one_minute_data['open'].to_numpy())
+        # Decision windows are views into these instead of a new DataFrame per step
+        one_minute_series = CandleSeries.from_frame(one_minute_data)
+        five_minute_series = CandleSeries.from_frame(five_minute_data)
+
+        first_index = self.window - 1
+        if start_date is not None:
+            first_index = max(first_index, int(np.searchsorted(one_times, np.datetime64(start_date), side='left')))
+        last_index = len(one_minute_data)
+        if end_date is not None:
+            last_index = int(np.searchsorted(one_times, np.datetime64(end_date), side='left'))
+
+        balance = self.initial_balance
+        open_trades = []
+        closed_trades = []
+
+        for i in range(first_index, last_index, self.decision_interval):
+            decision_time = one_times[i] + np.timedelta64(1, 'm')
+
+            # Realize trades whose exit bar has already closed
+            still_open = []
+            for trade in open_trades:
+                if trade['exit_index'] <= i:
+                    balance += trade['pnl']
+                    trade['balance'] = balance
+                    closed_trades.append(trade)
+                else:
+                    still_open.append(trade)
+            open_trades = still_open
+
+            five_count = int(np.searchsorted(five_close_times, decision_time, side='right'))
+            if five_count < self.window:
+                continue
+
+            one_window = one_minute_series[i - self.window + 1:i + 1]
+            five_window = five_minute_series[five_count - self.window:five_count]
+
+            unrealized = sum(trade['side'] * (closes[i] - trade['entry_price']) / self.point * trade['position_size'] for trade in open_trades)
+            account_info = SimpleNamespace(balance=balance, equity=balance + unrealized, margin=0.0)
+            positions = [SimpleNamespace(type=POSITION_TYPE_BUY if trade['side'] == SIDE_BUY else POSITION_TYPE_SELL) for trade in open_trades]
+            market_data = {'1m': one_window, '5m': five_window}
+            current_time = pd.Timestamp(decision_time).to_pydatetime()
+
+            if not self.risk_manager.can_open_more_trades(account_info, positions, market_data, current_time):
+                continue
+
+            trading_decisions, is_valid = self.decision_source.generate_trading_decisions(one_window, five_window)
+            if not is_valid:
+                continue
+
+            for decision in trading_decisions:
+                if not self.risk_manager.should_execute_trade(decision, positions):
+                    continue
+                trade = self._open_trade(resolver, i, closes[i], decision, balance)
+                if trade is not None:
+                    trade['entry_time'] = one_times[i]
+                    open_trades.append(trade)
+                    positions.append(SimpleNamespace(type=POSITION_TYPE_BUY if trade['side'] == SIDE_BUY else POSITION_TYPE_SELL))
+
+        for trade in sorted(open_trades, key=lambda t: t['exit_index']):
+            balance += trade['pnl']
+            trade['balance'] = balance
+            closed_trades.append(trade)
+
+        if not closed_trades:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+
+        results = pd.DataFrame(closed_trades)
+        results['exit_time'] = one_times[results['exit_index'].to_numpy()]
+        return results[RESULT_COLUMNS]
+
+    @staticmethod
+    def _positional(data: pd.DataFrame) -> pd.DataFrame:
+        # reset_index copies every column, which frames over shared arrays have no need for
+        if isinstance(data.index, pd.RangeIndex) and data.index.start == 0 and data.index.step == 1:
+            return data
+        return data.reset_index(drop=True)
+
+    def _open_trade(self, resolver: ExitResolver, index: int, price: float, decision, balance: float):
+        stop_loss = self.risk_manager.adjust_stop_loss(price, decision.stop_loss, decision.take_profit)
+        stop_loss_pips = abs(price - stop_loss) / self.point
+        if stop_loss_pips == 0:
+            return None
+        risk_amount = balance * self.risk_manager.max_risk_per_trade
+        position_size = self.risk_manager.calculate_position_size(balance, risk_amount, stop_loss_pips)
+
+        side = SIDE_BUY if decision.signal == 'buy' else SIDE_SELL
+        exit_price, exit_index, bars_held, exit_reason = resolver.resolve_one(index + 1, side, stop_loss, decision.take_profit, same_bar=self.same_bar)
+
+        return {
+            'signal': decision.signal,
+            'side': side,
+            'entry_price': price,
+            'stop_loss': stop_loss,
+            'take_profit': decision.take_profit,
+            'exit_price': exit_price,
+            'exit_index': exit_index,
+            'exit_reason': exit_reason,
+            'position_size': position_size,
+            'bars_held': bars_held,
+            'pnl': side * (exit_price - price) / self.point * position_size,
+        }
@@ -2,43 +2,66 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from src.infrastructure.data_providers.mt5_data_provider import DataFetcher
+from src.infrastructure.data_providers.candle_store import CandleStore
 from src.infrastructure.trading_strategies.llm_trading_strategy import TradingModule
+from src.infrastructure.trading_strategies.rule_based_trading_strategy import RuleBasedTradingModule
 from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
 from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.external_services.llm_response_cache import create_llm_response_cache
+from src.infrastructure.external_services.recorded_llm_api_client import RecordedLLMApiClient
+from src.application.backtest_engine import BacktestEngine
+from src.infrastructure.backtesting.exit_resolver import ExitResolver, ExitResult, SIDE_BUY, SIDE_SELL, SAME_BAR_STOP_LOSS
 from config.settings import CONFIG
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BacktestingService:
-    def __init__(self):
-        self.data_fetcher = DataFetcher(CONFIG['SYMBOL'], CONFIG['TIMEFRAME'])
-        llm_api_client = LLMApiClient(CONFIG['LLM_API_URL'], CONFIG['LLM_API_KEY'])
-        self.trading_module = TradingModule(llm_api_client)
+    def __init__(self, decision_source: str = 'llm', responses_path: str = None, cache_mode: str = CONFIG['LLM_CACHE_MODE']):
+        self.llm_cache = create_llm_response_cache(cache_mode) if decision_source == 'llm' else None
+        candle_store = CandleStore(CONFIG['CANDLE_STORE_DIR']) if CONFIG['USE_CANDLE_STORE'] else None
+        self.trading_module = self._build_decision_source(decision_source, responses_path)
+        self.data_fetcher = DataFetcher(CONFIG['SYMBOL'], candle_store=candle_store, indicator_columns=self.trading_module.required_columns())
         self.risk_manager = RiskManager()
         self.initial_balance = 200
+        self.backtester = BacktestEngine(self.data_fetcher, self.trading_module, self.risk_manager, self.initial_balance)
 
-    def run_backtest(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
-        start_date = datetime.strptime(CONFIG['BACKTESTING_START_DATE'], '%Y-%m-%d')
-        end_date = datetime.strptime(CONFIG['BACKTESTING_END_DATE'], '%Y-%m-%d')
+    def _build_decision_source(self, decision_source: str, responses_path: str = None):
+        if decision_source == 'rules':
+            return RuleBasedTradingModule()
+        if decision_source == 'recorded':
+            if responses_path is None:
+                raise ValueError("A responses file is required to replay recorded LLM decisions")
+            return TradingModule(RecordedLLMApiClient(responses_path))
+        if decision_source == 'llm':
+            # No latency budget: degrading prompts by wall-clock latency would make runs unrepeatable
+            llm_api_client = LLMApiClient(CONFIG['LLM_API_URL'], CONFIG['LLM_API_KEY'], cache=self.llm_cache, latency_budget=0)
+            # Record live responses so the same run can later be replayed offline
+            if responses_path is not None:
+                llm_api_client = RecordedLLMApiClient(responses_path, fallback=llm_api_client)
+            return TradingModule(llm_api_client)
+        raise ValueError(f"Unknown decision source: {decision_source}")
+
+    def run_backtest(self, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
+        start_date = start_date or datetime.strptime(CONFIG['BACKTESTING_START_DATE'], '%Y-%m-%d')
+        end_date = end_date or datetime.strptime(CONFIG['BACKTESTING_END_DATE'], '%Y-%m-%d')
         results = self.backtester.run_backtest(start_date, end_date)
-        self._analyze_backtest_results(results)
+        if self.llm_cache is not None:
+            logger.info(f"LLM cache: {self.llm_cache.stats()}")
+        if not isinstance(self.trading_module, RuleBasedTradingModule):
+            logger.info(f"Decisions: {self.trading_module.stats()}")
+        return results
 
     def _simulate_trade(self, future_data: pd.DataFrame, decision, entry_price: float, stop_loss: float, take_profit: float):
-        for _, candle in future_data.iterrows():
-            if decision.signal == 'buy':
-                if candle['low'] <= stop_loss:
-                    return stop_loss, candle.name
-                elif candle['high'] >= take_profit:
-                    return take_profit, candle.name
-            else:  # sell
-                if candle['high'] >= stop_loss:
-                    return stop_loss, candle.name
-                elif candle['low'] <= take_profit:
-                    return take_profit, candle.name
+        resolver = ExitResolver(future_data['high'].to_numpy(), future_data['low'].to_numpy(), future_data['close'].to_numpy())
+        side = SIDE_BUY if decision.signal == 'buy' else SIDE_SELL
+        exit_price, exit_index, _, _ = resolver.resolve_one(0, side, stop_loss, take_profit)
+        return exit_price, future_data.index[exit_index]
 
-        # If the trade hasn't been closed, close at the last available price
-        return future_data['close'].iloc[-1], future_data.index[-1]
+    def simulate_trades(self, data: pd.DataFrame, start_indices, sides, stop_losses, take_profits, same_bar: str = SAME_BAR_STOP_LOSS) -> ExitResult:
+        # Resolves every trade against the shared high/low arrays in one vectorized pass
+        resolver = ExitResolver(data['high'].to_numpy(), data['low'].to_numpy(), data['close'].to_numpy(), data['open'].to_numpy())
+        return resolver.resolve(start_indices, sides, stop_losses, take_profits, same_bar=same_bar)
 
     def analyze_results(self, results: pd.DataFrame):
         if results.empty:
@@ -0,0 +1,236 @@
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.settings import CONFIG
+from src.application.backtest_engine import BacktestEngine
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.backtesting.shared_frame import SharedFrame
+from src.infrastructure.data_providers.candle_store import CandleStore
+from src.infrastructure.data_providers.mt5_data_provider import DataFetcher, fetch_historical_batch
+from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
+from src.infrastructure.trading_strategies.rule_based_trading_strategy import RuleBasedTradingModule
+
+logger = logging.getLogger(__name__)
+
+# Tunable CONFIG keys and the constructor argument each one maps to
+RISK_PARAMETERS = {
+    'MAX_RISK_PER_TRADE': 'max_risk_per_trade',
+    'MAX_DRAWDOWN': 'max_drawdown',
+    '1MIN_MAX_VOLATILITY': 'one_minute_max_volatility',
+    '5MIN_MAX_VOLATILITY': 'five_minute_max_volatility',
+    'NO_TRADE_HOURS': 'no_trade_hours',
+    'MIN_REWARD_RATIO': 'min_reward_ratio',
+}
+STRATEGY_PARAMETERS = {
+    'TREND_ADX_THRESHOLD': 'adx_threshold',
+}
+OBJECTIVES = ['balance', 'pnl', 'profit_factor', 'sharpe', 'win_rate']
+
+
+def grid(space: Dict) -> List[Dict]:
+    """Every combination of the listed values."""
+    for name, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"A grid needs a list of values for {name}")
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def sample(space: Dict, samples: int, seed: int = 0) -> List[Dict]:
+    """`samples` random parameter sets: lists are drawn from, {"min": .., "max": ..} ranges sampled uniformly."""
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(samples):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, list):
+                params[name] = rng.choice(values)
+            elif isinstance(values['min'], int) and isinstance(values['max'], int):
+                params[name] = rng.randint(values['min'], values['max'])
+            else:
+                params[name] = rng.uniform(values['min'], values['max'])
+        trials.append(params)
+    return trials
+
+
+def summarize(results: pd.DataFrame, initial_balance: float) -> Dict:
+    """Headline numbers of a backtest, with the formulas of BacktestingService.analyze_results."""
+    pnl = results['pnl'].to_numpy(dtype=float) if len(results) else np.empty(0)
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    balance = initial_balance + np.cumsum(pnl)
+    peak = np.maximum.accumulate(balance) if len(balance) else balance
+    excess = pnl - 0.02 / 252
+    std = excess.std(ddof=1) if len(excess) > 1 else 0.0
+    return {
+        'trades': len(pnl),
+        'win_rate': len(wins) / len(pnl) if len(pnl) else 0.0,
+        'pnl': float(pnl.sum()),
+        'profit_factor': float(abs(wins.sum() / losses.sum())) if losses.sum() != 0 else float('inf'),
+        'sharpe': float(np.sqrt(252) * excess.mean() / std) if std else 0.0,
+        'max_drawdown': float(((peak - balance) / peak).max()) if len(balance) else 0.0,
+        'balance': float(balance[-1]) if len(balance) else float(initial_balance),
+    }
+
+
+def load_histories(symbols: List[str], start_date: datetime, end_date: datetime) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """M1 and M5 candles per symbol with the indicators the rule-based decisions read, warmup included."""
+    candle_store = CandleStore(CONFIG['CANDLE_STORE_DIR']) if CONFIG['USE_CANDLE_STORE'] else None
+    columns = RuleBasedTradingModule().required_columns()
+    data_fetchers = [DataFetcher(symbol, candle_store=candle_store, indicator_columns=columns) for symbol in symbols]
+    warmup_start = start_date - pd.Timedelta(days=CONFIG['BACKTEST_WARMUP_DAYS'])
+    # Indicators of every symbol are computed together, one batch per timeframe
+    one_minute = fetch_historical_batch(data_fetchers, Timeframe.M1, warmup_start, end_date)
+    five_minute = fetch_historical_batch(data_fetchers, Timeframe.M5, warmup_start, end_date)
+    return {symbol: (one_minute[symbol], five_minute[symbol]) for symbol in symbols}
+
+
+def load_history(start_date: datetime, end_date: datetime) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    return load_histories([CONFIG['SYMBOL']], start_date, end_date)[CONFIG['SYMBOL']]
+
+
+# Set in every worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(one_minute: Tuple, five_minute: Tuple, initial_balance: float):
+    # Risk checks log every rejected bar as an error, which would flood the output across thousands of trials
+    logging.disable(logging.ERROR)
+    shared = [SharedFrame.attach(one_minute), SharedFrame.attach(five_minute)]
+    _worker.update(shared=shared, one_minute=shared[0].frame(), five_minute=shared[1].frame(), initial_balance=initial_balance)
+
+
+def _run_trial(params: Dict, start_date: datetime, end_date: datetime) -> Dict:
+    started = time.perf_counter()
+    risk_manager = RiskManager(**{RISK_PARAMETERS[name]: value for name, value in params.items() if name in RISK_PARAMETERS})
+    trading_module = RuleBasedTradingModule(**{STRATEGY_PARAMETERS[name]: value for name, value in params.items() if name in STRATEGY_PARAMETERS})
+    engine = BacktestEngine(None, trading_module, risk_manager, _worker['initial_balance'])
+    results = engine.replay(_worker['one_minute'], _worker['five_minute'], start_date, end_date)
+    summary = summarize(results, _worker['initial_balance'])
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+class ParameterOptimizer:
+    """
+    Backtests parameter sets of the risk rules and the trend filter on a process pool. Candles are put in
+    shared memory once and every worker reads them in place. Each finished trial is appended to a
+    JSON-lines results file; trials already in it are not run again, so an interrupted sweep resumes.
+    """
+
+    def __init__(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame, results_path: str,
+                 workers: Optional[int] = None, initial_balance: float = 200, objective: str = 'balance'):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective}, expected one of {OBJECTIVES}")
+        self.one_minute_data = one_minute_data.reset_index(drop=True)
+        self.five_minute_data = five_minute_data.reset_index(drop=True)
+        self.results_path = results_path
+        self.workers = workers or os.cpu_count()
+        self.initial_balance = initial_balance
+        self.objective = objective
+        self.completed = self._load_results()
+        self._shared: List[SharedFrame] = []
+        self._executor = None
+
+    def _load_results(self) -> Dict[str, Dict]:
+        completed = {}
+        # The last line of an interrupted run may be cut short; the next record then starts on a new line
+        self._cut_short = False
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                content = f.read()
+            self._cut_short = bool(content) and not content.endswith('\n')
+            for line in content.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[record['key']] = record
+        if completed:
+            logger.info(f"Resuming with {len(completed)} finished trials from {self.results_path}")
+        return completed
+
+    @staticmethod
+    def trial_key(params: Dict, start_date: datetime, end_date: datetime) -> str:
+        return json.dumps({'params': params, 'start': str(start_date), 'end': str(end_date)}, sort_keys=True)
+
+    def evaluate(self, trials: List[Dict], start_date: datetime, end_date: datetime, **labels) -> List[Dict]:
+        """Backtests every parameter set on [start_date, end_date) and returns their records in trial order."""
+        for params in trials:
+            unknown = set(params) - set(RISK_PARAMETERS) - set(STRATEGY_PARAMETERS)
+            if unknown:
+                raise ValueError(f"Parameters {sorted(unknown)} cannot be optimized, expected {list(RISK_PARAMETERS) + list(STRATEGY_PARAMETERS)}")
+        keys = [self.trial_key(params, start_date, end_date) for params in trials]
+        pending = {key: params for key, params in zip(keys, trials) if key not in self.completed}
+        logger.info(f"{len(trials)} trials from {start_date} to {end_date}, {len(trials) - len(pending)} already done")
+        if pending:
+            self._run(pending, start_date, end_date, labels)
+        return [self.completed[key] for key in keys]
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Candles go to shared memory and workers attach once, for every evaluation of this optimizer
+        if self._executor is None:
+            self._shared = [SharedFrame.create(self.one_minute_data), SharedFrame.create(self.five_minute_data)]
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self._shared[0].descriptor, self._shared[1].descriptor, self.initial_balance))
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        for shared in self._shared:
+            shared.close()
+        self._shared = []
+
+    def _run(self, pending: Dict[str, Dict], start_date: datetime, end_date: datetime, labels: Dict):
+        executor = self._pool()
+        started = time.perf_counter()
+        with open(self.results_path, 'a') as results_file:
+            if self._cut_short:
+                results_file.write('\n')
+                self._cut_short = False
+            futures = {executor.submit(_run_trial, params, start_date, end_date): key for key, params in pending.items()}
+            for done, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                record = {'key': key, **labels, 'start': str(start_date), 'end': str(end_date), 'params': pending[key], **future.result()}
+                results_file.write(json.dumps(record) + '\n')
+                results_file.flush()
+                self.completed[key] = record
+                logger.info(f"Trial {done}/{len(pending)}: {record['params']} -> {self.objective} {record[self.objective]:.4f}")
+        elapsed = time.perf_counter() - started
+        logger.info(f"Ran {len(pending)} trials on {self.workers} workers in {elapsed:.1f}s ({len(pending) / elapsed:.2f} trials/s)")
+
+    def best(self, records: List[Dict]) -> Dict:
+        return max(records, key=lambda record: record[self.objective])
+
+    def search(self, trials: List[Dict], start_date: datetime, end_date: datetime) -> List[Dict]:
+        """Grid or random search: every trial over the whole period, best first."""
+        records = self.evaluate(trials, start_date, end_date, phase='search')
+        return sorted(records, key=lambda record: record[self.objective], reverse=True)
+
+    def walk_forward(self, trials: List[Dict], start_date: datetime, end_date: datetime, folds: int = 4) -> List[Dict]:
+        """
+        Splits the period into folds + 1 equal windows. Fold i searches the trials on window i and
+        backtests the best parameters on window i + 1, which they have not seen. Returns the test records.
+        """
+        bounds = pd.date_range(start_date, end_date, periods=folds + 2).to_pydatetime()
+        tests = []
+        for fold in range(folds):
+            train = self.evaluate(trials, bounds[fold], bounds[fold + 1], phase='train', fold=fold)
+            best = self.best(train)
+            test = self.evaluate([best['params']], bounds[fold + 1], bounds[fold + 2], phase='test', fold=fold)[0]
+            logger.info(f"Fold {fold}: best {best['params']} trained {self.objective} {best[self.objective]:.4f}, "
+                        f"tested {test[self.objective]:.4f}")
+            tests.append(test)
+        return tests
@@ -1,103 +1,262 @@
-import MetaTrader5 as mt5
-import sys
 import time
 import datetime
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from src.infrastructure.brokers.broker_gateway import BrokerGateway
+from src.infrastructure.brokers.mt5_session import MT5Session
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
 from src.infrastructure.data_providers.mt5_data_provider import DataFetcher
+from src.infrastructure.data_providers.timeframe_resampler import TimeframeResampler
+from src.infrastructure.data_providers.tick_collector import TickCollector
 from src.infrastructure.trading_strategies.llm_trading_strategy import TradingModule
 from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
 from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.external_services.llm_response_cache import create_llm_response_cache
+from src.infrastructure.indicators.incremental_indicator_engine import IncrementalIndicatorEngine
+from src.infrastructure.scheduling.bar_close_scheduler import BarCloseScheduler
+from src.infrastructure.monitoring.metrics import METRICS, Metrics
+from src.infrastructure.monitoring.metrics_exporter import create_metrics_exporter
+from src.infrastructure.monitoring.stage_timer import StageTimer, StageStats
 from config.settings import CONFIG
 from src.domain.value_objects.timeframe import Timeframe
 
 logger = logging.getLogger(__name__)
 
 class TradingService:
-    def __init__(self):
-        self.data_fetcher = DataFetcher(CONFIG['SYMBOL'])
-        llm_api_client = LLMApiClient(CONFIG['LLM_API_URL'], CONFIG['LLM_API_KEY'])
-        self.trading_module = TradingModule(llm_api_client)
+    def __init__(self, symbols: List[str] = None, broker: Optional[BrokerGateway] = None, trading_modules: Optional[Dict[str, TradingModule]] = None,
+                 metrics: Optional[Metrics] = None):
+        self.symbols = symbols or CONFIG['SYMBOLS']
+        self.metrics = metrics or METRICS
+        # One broker gateway shared by every symbol, the MT5 one serializes all terminal calls
+        self.broker = broker or MT5Session()
+        if trading_modules is None:
+            # A retried prompt is often identical to the invalid one, so the live loop must not replay cached answers
+            llm_cache = create_llm_response_cache(CONFIG['LLM_LIVE_CACHE_MODE'])
+            trading_modules = {
+                symbol: TradingModule(LLMApiClient(CONFIG['LLM_API_URL'], CONFIG['LLM_API_KEY'], cache=llm_cache, symbol=symbol, metrics=self.metrics),
+                                      metrics=self.metrics)
+                for symbol in self.symbols
+            }
+        self.trading_modules = trading_modules
+        indicator_columns = self._indicator_columns()
+        indicator_engine = IncrementalIndicatorEngine(columns=indicator_columns, dtype=CONFIG['INDICATOR_DTYPE']) if CONFIG['INCREMENTAL_INDICATORS'] else None
+        self.data_fetchers = {
+            symbol: DataFetcher(symbol, indicator_engine, broker=self.broker, resampler=self._create_resampler(),
+                                indicator_columns=indicator_columns, metrics=self.metrics)
+            for symbol in self.symbols
+        }
         self.risk_manager = RiskManager()
-        self.cooldown_period = CONFIG['CYCLE_INTERVAL'] * 60
+        # Started with the live loop only; paper trading quotes do not move between bars
+        self.tick_collector = TickCollector(self.broker, self.symbols) if CONFIG['COLLECT_TICKS'] else None
+        symbol_workers = min(CONFIG['SYMBOL_WORKERS'], len(self.symbols))
+        self.executor = ThreadPoolExecutor(max_workers=symbol_workers, thread_name_prefix='symbol')
+        # Separate pool for the reads a symbol cycle issues concurrently, so they never wait behind symbol cycles
+        self.io_executor = ThreadPoolExecutor(max_workers=3 * symbol_workers, thread_name_prefix='broker-io')
+        # Point and lot limits do not change while running
+        self._symbol_info_cache = {}
+        self.stage_stats = StageStats()
+        # Held from the final portfolio check until the order is sent so symbols cannot overshoot the limits together
+        self._portfolio_lock = threading.Lock()
+        cycle_timeframe = Timeframe[CONFIG['TIMEFRAME']]
+        self.scheduler = BarCloseScheduler(
+            cycle_timeframe,
+            mode=CONFIG['SCHEDULER_MODE'],
+            new_bar_probe=lambda: self.data_fetchers[self.symbols[0]].latest_bar_time(cycle_timeframe),
+        )
         self.last_trade_time = None
+        self._register_collectors()
+
+    def _register_collectors(self):
+        # Statistics the components keep themselves, read when the metrics are exported
+        self.metrics.register_collector('scheduler', self.scheduler.lag_stats)
+        self.metrics.register_collector('broker', self.broker.metrics)
+        if self.tick_collector is not None:
+            self.metrics.register_collector('ticks', self.tick_collector.stats)
+        for symbol, trading_module in self.trading_modules.items():
+            self.metrics.register_collector('decisions', trading_module.stats, symbol=symbol)
+            api_client = trading_module.api_client
+            if isinstance(api_client, LLMApiClient):
+                self.metrics.register_collector('llm_stream', api_client.streaming_stats, symbol=symbol)
+                if api_client.latency_slo is not None:
+                    self.metrics.register_collector('llm_latency', api_client.latency_slo.stats, symbol=symbol)
+        llm_caches = {id(module.api_client.cache): module.api_client.cache for module in self.trading_modules.values()
+                      if isinstance(module.api_client, LLMApiClient) and module.api_client.cache is not None}
+        for index, llm_cache in enumerate(llm_caches.values()):
+            self.metrics.register_collector('llm_cache', llm_cache.stats, cache=index)
+
+    def _indicator_columns(self) -> Optional[List[str]]:
+        # Union over the trading modules, which share the indicator engine; None when one needs them all
+        columns = []
+        for trading_module in self.trading_modules.values():
+            required = trading_module.required_columns()
+            if required is None:
+                return None
+            columns.extend(required)
+        return list(dict.fromkeys(columns))
+
+    @staticmethod
+    def _create_resampler() -> Optional[TimeframeResampler]:
+        if not CONFIG['RESAMPLE_FROM_M1']:
+            return None
+        return TimeframeResampler(CONFIG['RESAMPLER_M1_HISTORY'], CONFIG['SESSION_OFFSET_MINUTES'])
 
     def run(self):
+        if self.tick_collector is not None:
+            self.tick_collector.start()
+        metrics_exporter = create_metrics_exporter(self.metrics)
+        if metrics_exporter is not None:
+            metrics_exporter.start()
         while True:
             try:
-                self._trading_cycle()
-                logger.info(f"Sleeping for {self.cooldown_period} seconds until the next cycle")
-                self._start_countdown(CONFIG['CYCLE_INTERVAL'] * 60)
+                self.scheduler.wait_for_next_bar()
+                lag = self.scheduler.record_decision_start()
+                logger.info(f"Bar closed {lag * 1000:.0f} ms ago, starting trading cycle")
+                self._run_cycle()
             except Exception as e:
                 logger.error(f"An error occurred in the main loop: {e}")
                 time.sleep(60)
 
-    def _start_countdown(self, duration):
-        start_time = time.time()
-        while time.time() - start_time < duration:
-            elapsed = time.time() - start_time
-            remaining = max(0, duration - elapsed)
-            minutes, seconds = divmod(int(remaining), 60)
-            sys.stdout.write(f"\rCooldown: {minutes:02}:{seconds:02}")
-            sys.stdout.flush()
-            time.sleep(1)  # Update every second
-        sys.stdout.write("\rCooldown: 00:00\n")
-        sys.stdout.flush()
-
-
-    def _trading_cycle(self):
-        max_attempts = 5
+    def run_paper(self, bars_per_cycle: int = Timeframe[CONFIG['TIMEFRAME']].value) -> Dict:
+        # Runs the live cycle against a simulated broker as fast as possible, one cycle per bar close
+        if not isinstance(self.broker, SimulatedBroker):
+            raise ValueError("Paper trading needs a SimulatedBroker")
+        cycles = 0
+        started = time.perf_counter()
+        while True:
+            self._run_cycle()
+            cycles += 1
+            if not self.broker.advance(bars_per_cycle):
+                break
+        elapsed = time.perf_counter() - started
+        summary = {**self.broker.metrics(), 'cycles': cycles, 'cycles_per_second': cycles / elapsed if elapsed else 0.0,
+                   'stages': self.stage_stats.stats()}
+        logger.info(f"Paper trading finished: {summary}")
+        return summary
+
+    def _run_cycle(self):
+        # Data fetches and LLM calls of different symbols overlap; broker calls queue on the session lock
+        with self.metrics.timer('broker_connect_seconds'):
+            self.broker.ensure_connection()
+        futures = {symbol: self.executor.submit(self._trading_cycle, symbol) for symbol in self.symbols}
+        for symbol, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"[{symbol}] Trading cycle failed: {e}")
+                self.metrics.inc('trading_cycle_errors_total', symbol=symbol)
+
+    def _trading_cycle(self, symbol: str):
+        timer = StageTimer()
+        try:
+            with timer.stage('total'):
+                self._trading_cycle_attempts(symbol, timer)
+        finally:
+            self.stage_stats.add(timer)
+            self.metrics.observe_all('trading_stage_seconds', timer.timings, 'stage', symbol=symbol)
+            logger.info(f"[{symbol}] Cycle stages: {timer.summary()}")
+
+    def _trading_cycle_attempts(self, symbol: str, timer: StageTimer):
+        data_fetcher = self.data_fetchers[symbol]
+        trading_module = self.trading_modules[symbol]
+        max_attempts = CONFIG['MAX_DECISION_ATTEMPTS']
         attempt = 0
         while attempt < max_attempts:
             try:
-                self.data_fetcher.ensure_mt5_connection()
-
-                account_info = mt5.account_info()
-                if account_info is None:
-                    logger.error(f"Failed to get account info : {mt5.last_error()}")
+                # Account, positions and both timeframes are independent reads, issued together
+                with timer.stage('reads'):
+                    snapshot = self.io_executor.submit(timer.timed, 'snapshot', self._portfolio_snapshot)
+                    # With resampling this is the cycle's only rate read, both timeframes below are built from it
+                    timer.timed('sync_m1', data_fetcher.sync)
+                    fetch_1m = self.io_executor.submit(timer.timed, 'fetch_m1', data_fetcher.fetch_latest_data,
+                                                       timeframe=Timeframe["M1"], num_candles=50, extra_candles=100)
+                    fetch_5m = self.io_executor.submit(timer.timed, 'fetch_m5', data_fetcher.fetch_latest_data,
+                                                       timeframe=Timeframe["M5"], num_candles=50, extra_candles=100)
+                    account_info, all_positions = snapshot.result()
+                    latest_1m_data = fetch_1m.result()
+                    latest_5m_data = fetch_5m.result()
+                if account_info is None or all_positions is None:
                     return
+                open_positions = [position for position in all_positions if position.symbol == symbol]
 
-                open_positions = mt5.positions_get(symbol=CONFIG['SYMBOL'])
-                if open_positions is None:
-                    logger.error(f"Failed to get open positions for {CONFIG['SYMBOL']}  error : {mt5.last_error()}")
+                with timer.stage('risk'):
+                    within_limits = self.risk_manager.within_portfolio_limits(account_info, all_positions)
+                if not within_limits:
+                    logger.warning(f"[{symbol}] Skipping trading cycle due to portfolio risk constraints")
+                    self.metrics.inc('trading_skipped_cycles_total', symbol=symbol, reason='portfolio')
                     return
 
-                # Fetch the latest 1-minute and 5-minute data (last 50 candles each)
-                latest_1m_data = self.data_fetcher.fetch_latest_data(timeframe=Timeframe["M1"], num_candles=50, extra_candles = 100)
-                latest_5m_data = self.data_fetcher.fetch_latest_data(timeframe=Timeframe["M5"], num_candles=50, extra_candles = 100)
-
-                # Sort the data by time and reset the index
-                latest_1m_data = latest_1m_data.sort_values('time').reset_index(drop=True)
-                latest_5m_data = latest_5m_data.sort_values('time').reset_index(drop=True)
-
                 market_data = {
                         '1m': latest_1m_data,
                         '5m': latest_5m_data
                     }
 
-                if not self.risk_manager.can_open_more_trades(account_info, open_positions, market_data):
-                    logger.warning("Skipping trading cycle due to risk management constraints")
+                market_view = self.tick_collector.market_view(symbol) if self.tick_collector is not None else None
+                if market_view is None and self.tick_collector is not None and self.tick_collector.running:
+                    logger.warning(f"[{symbol}] Skipping trading cycle, no current tick data")
+                    self.metrics.inc('trading_skipped_cycles_total', symbol=symbol, reason='stale_ticks')
+                    return
+                with timer.stage('risk'):
+                    can_trade = self.risk_manager.can_open_more_trades(account_info, open_positions, market_data, self.broker.current_time(), market_view)
+                if not can_trade:
+                    logger.warning(f"[{symbol}] Skipping trading cycle due to risk management constraints")
+                    self.metrics.inc('trading_skipped_cycles_total', symbol=symbol, reason='risk')
                     return
 
-                logger.info("Generating trading decisions")
-                trading_decisions, is_valid = self.trading_module.generate_trading_decisions(latest_1m_data, latest_5m_data)
+                logger.info(f"[{symbol}] Generating trading decisions")
+                with timer.stage('decision'):
+                    # The snapshot trades are checked and sized against is refreshed while the LLM answers
+                    refresh = self.io_executor.submit(timer.timed, 'snapshot_refresh', self._portfolio_snapshot)
+                    trading_decisions, is_valid = trading_module.generate_trading_decisions(latest_1m_data, latest_5m_data)
+                    account_info, all_positions = refresh.result()
 
                 if is_valid:
+                    if account_info is None or all_positions is None:
+                        return
+                    open_positions = [position for position in all_positions if position.symbol == symbol]
                     for decision in trading_decisions:
                         if self.risk_manager.should_execute_trade(decision, open_positions):
-                            self._display_real_time_decisions(trading_decisions)
-                            self._execute_trade(decision)
+                            self._display_real_time_decisions(symbol, trading_decisions)
+                            with timer.stage('execute'):
+                                self._execute_trade(symbol, decision, account_info)
+                        else:
+                            self.metrics.inc('trading_rejected_trades_total', symbol=symbol, reason='risk')
                     return
                 else:
-                    logger.warning(f"Invalid trading decision on attempt {attempt + 1}. Retrying immediately...")
+                    logger.warning(f"[{symbol}] Invalid trading decision on attempt {attempt + 1}. Retrying immediately...")
+                    self.metrics.inc('trading_decision_retries_total', symbol=symbol)
                     attempt += 1
 
             except Exception as e:
-                logger.error(f"An error occurred in the trading cycle: {e}")
+                logger.error(f"[{symbol}] An error occurred in the trading cycle: {e}")
+                self.metrics.inc('trading_decision_retries_total', symbol=symbol)
+                attempt += 1
 
-        logger.warning(f"Max attempts ({max_attempts}) reached. Unable to generate valid trading decisions.")
+        logger.warning(f"[{symbol}] Max attempts ({max_attempts}) reached. Unable to generate valid trading decisions.")
 
-    def _display_real_time_decisions(self, decisions):
-        print("\nReal-time Trading Decisions:")
+    def _portfolio_snapshot(self):
+        account_info = self.broker.account_info()
+        if account_info is None:
+            logger.error(f"Failed to get account info : {self.broker.last_error()}")
+            return None, None
+
+        all_positions = self.broker.positions_get()
+        if all_positions is None:
+            logger.error(f"Failed to get open positions  error : {self.broker.last_error()}")
+            return account_info, None
+        return account_info, all_positions
+
+    def _symbol_info(self, symbol):
+        symbol_info = self._symbol_info_cache.get(symbol)
+        if symbol_info is None:
+            symbol_info = self.broker.symbol_info(symbol)
+            if symbol_info is not None:
+                self._symbol_info_cache[symbol] = symbol_info
+        return symbol_info
+
+    def _display_real_time_decisions(self, symbol, decisions):
+        print(f"\nReal-time Trading Decisions for {symbol}:")
         for i, decision in enumerate(decisions, 1):
             print(f"Decision {i}:")
             print(f"  Signal: {decision.signal}")
@@ -106,55 +265,65 @@ class TradingService:
             print(f"  Explanation: {decision.explanation}")
             print()
 
-    def _execute_trade(self, decision):
-        account_info = mt5.account_info()
-        if account_info is None:
-            logger.error("Failed to get account info")
-            return
-
-        symbol_info = mt5.symbol_info(CONFIG['SYMBOL'])
+    def _execute_trade(self, symbol, decision, account_info):
+        symbol_info = self._symbol_info(symbol)
         if symbol_info is None:
-            logger.error(f"Failed to get symbol info for {CONFIG['SYMBOL']}")
+            logger.error(f"Failed to get symbol info for {symbol}")
             return
 
-        point = symbol_info.point
-        price = mt5.symbol_info_tick(CONFIG['SYMBOL']).ask if decision.signal == 'buy' else mt5.symbol_info_tick(CONFIG['SYMBOL']).bid
+        with self._portfolio_lock:
+            # Final pre-trade snapshot: the quote and the positions other symbols may have just opened
+            tick_future = self.io_executor.submit(self.broker.symbol_info_tick, symbol)
+            all_positions = self.broker.positions_get()
+            tick = tick_future.result()
+            if tick is None:
+                logger.error(f"[{symbol}] Failed to get the current tick")
+                return
+            if all_positions is None or not self.risk_manager.within_portfolio_limits(account_info, all_positions):
+                logger.warning(f"[{symbol}] Order skipped, portfolio limits reached by another symbol")
+                self.metrics.inc('trading_rejected_trades_total', symbol=symbol, reason='portfolio')
+                return
 
-        stop_loss = self.risk_manager.adjust_stop_loss(price, decision.stop_loss, decision.take_profit)
-        stop_loss_pips = abs(price - stop_loss) / point
-        risk_amount = account_info.balance * CONFIG['MAX_RISK_PER_TRADE']
-        position_size = self.risk_manager.calculate_position_size(account_info.balance, risk_amount, stop_loss_pips)
+            point = symbol_info.point
+            price = tick.ask if decision.signal == 'buy' else tick.bid
 
-        # Ensure position size conforms to the symbol's lot requirements
-        min_lot = symbol_info.volume_min
-        max_lot = symbol_info.volume_max
-        lot_step = symbol_info.volume_step
+            stop_loss = self.risk_manager.adjust_stop_loss(price, decision.stop_loss, decision.take_profit)
+            stop_loss_pips = abs(price - stop_loss) / point
+            risk_amount = account_info.balance * self.risk_manager.max_risk_per_trade
+            position_size = self.risk_manager.calculate_position_size(account_info.balance, risk_amount, stop_loss_pips)
 
-        if position_size < min_lot:
-            position_size = min_lot
-        elif position_size > max_lot:
-            position_size = max_lot
-        else:
-            position_size = round(position_size / lot_step) * lot_step
-
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": CONFIG['SYMBOL'],
-            "volume": position_size,
-            "type": mt5.ORDER_TYPE_BUY if decision.signal == 'buy' else mt5.ORDER_TYPE_SELL,
-            "price": price,
-            "sl": stop_loss,
-            "tp": decision.take_profit,
-            "deviation": 20,
-            "magic": 234000,
-            "comment": "python script open",
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
-        }
+            # Ensure position size conforms to the symbol's lot requirements
+            min_lot = symbol_info.volume_min
+            max_lot = symbol_info.volume_max
+            lot_step = symbol_info.volume_step
 
-        result = mt5.order_send(request)
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            logger.error(f"Order failed, retcode={result.retcode} message : {result.comment}")
-        else:
-            logger.info(f"Order executed: {result.order}")
+            if position_size < min_lot:
+                position_size = min_lot
+            elif position_size > max_lot:
+                position_size = max_lot
+            else:
+                position_size = round(position_size / lot_step) * lot_step
+
+            request = {
+                "action": self.broker.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "volume": position_size,
+                "type": self.broker.ORDER_TYPE_BUY if decision.signal == 'buy' else self.broker.ORDER_TYPE_SELL,
+                "price": price,
+                "sl": stop_loss,
+                "tp": decision.take_profit,
+                "deviation": 20,
+                "magic": 234000,
+                "comment": "python script open",
+                "type_time": self.broker.ORDER_TIME_GTC,
+                "type_filling": self.broker.ORDER_FILLING_IOC,
+            }
+            with self.metrics.timer('trading_stage_seconds', stage='order_send', symbol=symbol):
+                result = self.broker.order_send(request)
 
+        if result.retcode != self.broker.TRADE_RETCODE_DONE:
+            logger.error(f"[{symbol}] Order failed, retcode={result.retcode} message : {result.comment}")
+            self.metrics.inc('trading_rejected_trades_total', symbol=symbol, reason='broker')
+        else:
+            logger.info(f"[{symbol}] Order executed: {result.order}")
+            self.metrics.inc('trading_orders_total', symbol=symbol)
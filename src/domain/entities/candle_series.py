@@ -0,0 +1,136 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from src.domain.entities.candle import Candle
+
+TIME_DTYPE = np.dtype('datetime64[ns]')
+
+
+class CandleSeries:
+    """
+    Candles and their indicator columns, oldest first, stored column by column in contiguous NumPy
+    arrays. Slices and tail() are views sharing those arrays. append() writes into spare room and, when
+    the room runs out, moves the newest rows to new arrays, so a view handed out earlier never changes.
+    With a capacity only the newest `capacity` rows are kept.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], capacity: Optional[int] = None, _start: int = 0, _end: Optional[int] = None, _owner: bool = True):
+        self._buffers = columns
+        self.capacity = capacity
+        self._start = _start
+        if _end is None:
+            _end = len(next(iter(columns.values()))) if columns else 0
+        self._end = _end
+        # Views share their parent's arrays and copy them before their first append
+        self._owner = _owner
+
+    @classmethod
+    def empty(cls, dtypes: Dict[str, np.dtype], capacity: Optional[int] = None) -> 'CandleSeries':
+        return cls({column: np.empty(0, dtype=dtype) for column, dtype in dtypes.items()}, capacity)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'CandleSeries':
+        return cls({column: frame[column].to_numpy() for column in frame.columns})
+
+    @classmethod
+    def from_rates(cls, rates: np.ndarray) -> 'CandleSeries':
+        """From MT5-style structured rates, with epoch-second times."""
+        columns = {name: np.ascontiguousarray(rates[name]) for name in rates.dtype.names}
+        columns['time'] = (rates['time'] * 1_000_000_000).astype(TIME_DTYPE)
+        return cls(columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+    def to_records(self) -> List[Dict]:
+        """One dict per candle with Python scalars and Timestamp times, as DataFrame.to_dict(orient='records') gives."""
+        values = {column: list(pd.DatetimeIndex(self[column])) if column == 'time' else self[column].tolist() for column in self.columns}
+        return [dict(zip(values, row)) for row in zip(*values.values())]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._buffers)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self[column].nbytes for column in self.columns)
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._buffers[key][self._start:self._end]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("CandleSeries slices must be contiguous")
+            stop = max(start, stop)
+            return CandleSeries(self._buffers, None, self._start + start, self._start + stop, _owner=False)
+        raise TypeError(f"CandleSeries indices must be column names or slices, not {type(key).__name__}")
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._buffers
+
+    def tail(self, n: int) -> 'CandleSeries':
+        return self[max(len(self) - n, 0):] if n > 0 else self[:0]
+
+    def last(self, column: str):
+        return self._buffers[column][self._end - 1]
+
+    def candle(self, index: int) -> Candle:
+        """The row as a Candle, built on request. Volume is the real volume, or the tick volume where there is none."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("candle index out of range")
+        i = self._start + index
+        buffers = self._buffers
+        volume = float(buffers['real_volume'][i]) if 'real_volume' in buffers else 0.0
+        if volume == 0 and 'tick_volume' in buffers:
+            volume = float(buffers['tick_volume'][i])
+        return Candle(
+            time=pd.Timestamp(buffers['time'][i]).to_pydatetime(),
+            open=float(buffers['open'][i]), high=float(buffers['high'][i]),
+            low=float(buffers['low'][i]), close=float(buffers['close'][i]),
+            volume=volume,
+        )
+
+    def candles(self) -> Iterator[Candle]:
+        return (self.candle(index) for index in range(len(self)))
+
+    def append(self, row: Dict):
+        """Adds a row with a value for every column, dropping the oldest row beyond capacity."""
+        if not self._owner or self._end == len(next(iter(self._buffers.values()))):
+            self._reallocate()
+        for column, buffer in self._buffers.items():
+            value = row[column]
+            buffer[self._end] = np.datetime64(pd.Timestamp(value).value, 'ns') if column == 'time' else value
+        self._end += 1
+        if self.capacity is not None and len(self) > self.capacity:
+            self._start += 1
+
+    def _reallocate(self):
+        keep = len(self) if self.capacity is None else min(len(self), self.capacity)
+        size = max(2 * keep, 16) if self.capacity is None else 2 * self.capacity
+        buffers = {}
+        for column, buffer in self._buffers.items():
+            new = np.empty(size, dtype=buffer.dtype)
+            new[:keep] = buffer[self._end - keep:self._end]
+            buffers[column] = new
+        self._buffers = buffers
+        self._start, self._end = 0, keep
+        self._owner = True
+
+    def with_row(self, row: Dict) -> 'CandleSeries':
+        """A copy of this series with one more row, e.g. the forming bar; this series is left as it is."""
+        series = CandleSeries({column: np.empty(len(self) + 1, dtype=buffer.dtype) for column, buffer in self._buffers.items()})
+        for column in self.columns:
+            series._buffers[column][:-1] = self[column]
+        series._end = len(self)
+        series.append(row)
+        return series
+
+    def extend(self, rows: Iterable[Dict]):
+        for row in rows:
+            self.append(row)
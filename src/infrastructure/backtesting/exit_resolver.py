@@ -0,0 +1,152 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+SIDE_BUY = 1
+SIDE_SELL = -1
+
+EXIT_STOP_LOSS = 0
+EXIT_TAKE_PROFIT = 1
+EXIT_END_OF_DATA = 2
+
+# How to resolve a bar whose range touches both the stop loss and the take profit
+SAME_BAR_STOP_LOSS = 'stop_loss'          # pessimistic, assume the stop was hit first
+SAME_BAR_TAKE_PROFIT = 'take_profit'      # optimistic, assume the target was hit first
+SAME_BAR_OPEN_DISTANCE = 'open_distance'  # whichever level is closer to the bar open was hit first
+
+
+@dataclass
+class ExitResult:
+    exit_price: np.ndarray
+    exit_index: np.ndarray
+    bars_held: np.ndarray
+    exit_reason: np.ndarray
+
+
+class ExitResolver:
+    """
+    Finds the first stop loss / take profit hit for many trades at once. Sparse tables of range minima
+    of `low` and maxima of `high` are built once, then every trade is resolved by binary lifting in
+    O(log bars) vectorized steps instead of walking candles one by one.
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, open_: Optional[np.ndarray] = None):
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.open = None if open_ is None else np.asarray(open_, dtype=np.float64)
+        self.size = len(self.close)
+        self._low_min = self._sparse_table(self.low, np.minimum)
+        self._high_max = self._sparse_table(self.high, np.maximum)
+
+    @staticmethod
+    def _sparse_table(values: np.ndarray, reduce) -> list:
+        # table[k][i] = reduce(values[i:i + 2**k]), padded so every position can be indexed
+        table = [values]
+        span = 1
+        while span * 2 <= len(values):
+            previous = table[-1]
+            level = previous.copy()
+            level[:len(values) - span] = reduce(previous[:len(values) - span], previous[span:])
+            table.append(level)
+            span *= 2
+        return table
+
+    def _first_reaching(self, start: np.ndarray, end: np.ndarray, threshold: np.ndarray, below: bool) -> np.ndarray:
+        # First index j in [start, end) with low[j] <= threshold (below) or high[j] >= threshold, else end
+        table = self._low_min if below else self._high_max
+        position = start.copy()
+        for k in range(len(table) - 1, -1, -1):
+            step = 1 << k
+            inside = position + step <= end
+            values = table[k][np.minimum(position, self.size - 1)]
+            not_reached = values > threshold if below else values < threshold
+            position = np.where(inside & not_reached, position + step, position)
+        return position
+
+    def _first_reaching_one(self, start: int, end: int, threshold: float, below: bool) -> int:
+        # Scalar version of _first_reaching, cheaper than array operations for a single trade
+        table = self._low_min if below else self._high_max
+        position = start
+        for k in range(len(table) - 1, -1, -1):
+            step = 1 << k
+            if position + step <= end:
+                value = table[k][position]
+                if (value > threshold) if below else (value < threshold):
+                    position += step
+        return position
+
+    def resolve_one(self, start_index: int, side: int, stop_loss: float, take_profit: float, end_index: int = None, same_bar: str = SAME_BAR_STOP_LOSS):
+        """Single-trade resolve returning (exit_price, exit_index, bars_held, exit_reason)."""
+        end = self.size if end_index is None else min(end_index, self.size)
+        buy = side == SIDE_BUY
+        sl_index = self._first_reaching_one(start_index, end, stop_loss, below=buy)
+        tp_index = self._first_reaching_one(start_index, end, take_profit, below=not buy)
+
+        if sl_index >= end and tp_index >= end:
+            exit_index = max(end - 1, 0)
+            return float(self.close[exit_index]), exit_index, max(exit_index - start_index + 1, 0), EXIT_END_OF_DATA
+
+        if sl_index == tp_index:
+            if same_bar == SAME_BAR_STOP_LOSS:
+                sl_first = True
+            elif same_bar == SAME_BAR_TAKE_PROFIT:
+                sl_first = False
+            elif same_bar == SAME_BAR_OPEN_DISTANCE:
+                if self.open is None:
+                    raise ValueError("open prices are required for the 'open_distance' same-bar policy")
+                bar_open = self.open[sl_index]
+                sl_first = abs(bar_open - stop_loss) <= abs(bar_open - take_profit)
+            else:
+                raise ValueError(f"Unknown same-bar policy: {same_bar}")
+        else:
+            sl_first = sl_index < tp_index
+
+        if sl_first:
+            return stop_loss, sl_index, sl_index - start_index + 1, EXIT_STOP_LOSS
+        return take_profit, tp_index, tp_index - start_index + 1, EXIT_TAKE_PROFIT
+
+    def resolve(self, start_index, side, stop_loss, take_profit, end_index=None, same_bar: str = SAME_BAR_STOP_LOSS) -> ExitResult:
+        """
+        start_index is the first bar that may close each trade, side is SIDE_BUY or SIDE_SELL.
+        Trades not closed before end_index (exclusive, defaults to the end of data) exit at that bar's close.
+        """
+        start = np.asarray(start_index, dtype=np.int64)
+        side = np.asarray(side, dtype=np.int64)
+        stop_loss = np.asarray(stop_loss, dtype=np.float64)
+        take_profit = np.asarray(take_profit, dtype=np.float64)
+        end = np.full(len(start), self.size, dtype=np.int64) if end_index is None else np.minimum(np.asarray(end_index, dtype=np.int64), self.size)
+
+        buy = side == SIDE_BUY
+        # Buys stop out on the low and take profit on the high, sells the other way around
+        sl_low = self._first_reaching(start, end, stop_loss, below=True)
+        sl_high = self._first_reaching(start, end, stop_loss, below=False)
+        tp_low = self._first_reaching(start, end, take_profit, below=True)
+        tp_high = self._first_reaching(start, end, take_profit, below=False)
+        sl_index = np.where(buy, sl_low, sl_high)
+        tp_index = np.where(buy, tp_high, tp_low)
+
+        sl_first = sl_index < tp_index
+        same = (sl_index == tp_index) & (sl_index < end)
+        if same_bar == SAME_BAR_STOP_LOSS:
+            sl_first |= same
+        elif same_bar == SAME_BAR_OPEN_DISTANCE:
+            if self.open is None:
+                raise ValueError("open prices are required for the 'open_distance' same-bar policy")
+            bar_open = self.open[np.minimum(sl_index, self.size - 1)]
+            sl_first |= same & (np.abs(bar_open - stop_loss) <= np.abs(bar_open - take_profit))
+        elif same_bar != SAME_BAR_TAKE_PROFIT:
+            raise ValueError(f"Unknown same-bar policy: {same_bar}")
+
+        exit_index = np.minimum(sl_index, tp_index)
+        hit = exit_index < end
+        last_index = np.maximum(end - 1, 0)
+        exit_index = np.where(hit, exit_index, last_index)
+
+        exit_reason = np.where(sl_first, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+        exit_reason = np.where(hit, exit_reason, EXIT_END_OF_DATA).astype(np.int8)
+        exit_price = np.where(sl_first, stop_loss, take_profit)
+        exit_price = np.where(hit, exit_price, self.close[last_index])
+        bars_held = np.maximum(exit_index - start + 1, 0)
+
+        return ExitResult(exit_price=exit_price, exit_index=exit_index, bars_held=bars_held, exit_reason=exit_reason)
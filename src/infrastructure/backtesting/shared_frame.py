@@ -0,0 +1,61 @@
+from multiprocessing import shared_memory
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+# (column, dtype, byte offset) of every column in the block
+Layout = List[Tuple[str, str, int]]
+
+
+class SharedFrame:
+    """
+    The columns of a DataFrame copied once into a single shared memory block. Other processes attach by
+    name and read the columns in place instead of receiving a pickled copy of the frame. Columns are
+    read-only, and the process that created the block unlinks it when done.
+    """
+
+    def __init__(self, block: shared_memory.SharedMemory, layout: Layout, length: int, owner: bool):
+        self.block = block
+        self.layout = layout
+        self.length = length
+        self.owner = owner
+
+    @classmethod
+    def create(cls, frame: pd.DataFrame) -> 'SharedFrame':
+        layout, offset = [], 0
+        for column in frame.columns:
+            dtype = frame[column].to_numpy().dtype
+            layout.append((column, dtype.str, offset))
+            # Keep every column 8-byte aligned
+            offset += -(-len(frame) * dtype.itemsize // 8) * 8
+        block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        shared = cls(block, layout, len(frame), owner=True)
+        for column, array in shared._arrays():
+            array[:] = frame[column].to_numpy()
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor: Tuple[str, Layout, int]) -> 'SharedFrame':
+        name, layout, length = descriptor
+        return cls(shared_memory.SharedMemory(name=name), layout, length, owner=False)
+
+    @property
+    def descriptor(self) -> Tuple[str, Layout, int]:
+        """What another process needs to attach, small enough to pass as a task argument."""
+        return self.block.name, self.layout, self.length
+
+    def _arrays(self):
+        for column, dtype, offset in self.layout:
+            yield column, np.ndarray(self.length, dtype=np.dtype(dtype), buffer=self.block.buf, offset=offset)
+
+    def frame(self) -> pd.DataFrame:
+        columns = {}
+        for column, array in self._arrays():
+            array.flags.writeable = False
+            columns[column] = array
+        return pd.DataFrame(columns, copy=False)
+
+    def close(self):
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from src.domain.value_objects.timeframe import Timeframe
+
+# Same values as the MetaTrader5 constants, so requests and positions are interchangeable between gateways
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+TRADE_ACTION_DEAL = 1
+ORDER_TIME_GTC = 0
+ORDER_FILLING_IOC = 1
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_NO_MONEY = 10019
+COPY_TICKS_ALL = -1
+TICK_FLAG_VOLUME = 16
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+# copy_rates_* take these constants, not minutes: only the minute timeframes coincide
+TIMEFRAMES = {
+    Timeframe.M1: TIMEFRAME_M1,
+    Timeframe.M5: TIMEFRAME_M5,
+    Timeframe.M15: TIMEFRAME_M15,
+    Timeframe.M30: TIMEFRAME_M30,
+    Timeframe.H1: TIMEFRAME_H1,
+    Timeframe.H4: TIMEFRAME_H4,
+    Timeframe.D1: TIMEFRAME_D1,
+}
+# Layout of the tick arrays returned by copy_ticks_from
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8'),
+])
+
+
+class BrokerGateway:
+    """
+    Broker operations used by the trading loop, shaped like the MetaTrader5 module API: the same
+    function names and arguments, results with the same attribute names, and the order and position
+    constants as class attributes.
+    """
+
+    POSITION_TYPE_BUY = POSITION_TYPE_BUY
+    POSITION_TYPE_SELL = POSITION_TYPE_SELL
+    ORDER_TYPE_BUY = ORDER_TYPE_BUY
+    ORDER_TYPE_SELL = ORDER_TYPE_SELL
+    TRADE_ACTION_DEAL = TRADE_ACTION_DEAL
+    ORDER_TIME_GTC = ORDER_TIME_GTC
+    ORDER_FILLING_IOC = ORDER_FILLING_IOC
+    TRADE_RETCODE_REQUOTE = TRADE_RETCODE_REQUOTE
+    TRADE_RETCODE_REJECT = TRADE_RETCODE_REJECT
+    TRADE_RETCODE_DONE = TRADE_RETCODE_DONE
+    TRADE_RETCODE_INVALID_VOLUME = TRADE_RETCODE_INVALID_VOLUME
+    TRADE_RETCODE_NO_MONEY = TRADE_RETCODE_NO_MONEY
+    COPY_TICKS_ALL = COPY_TICKS_ALL
+    TICK_FLAG_VOLUME = TICK_FLAG_VOLUME
+
+    @staticmethod
+    def timeframe(timeframe: Timeframe) -> int:
+        """The MetaTrader5 TIMEFRAME_* constant copy_rates_* expect for a Timeframe."""
+        return TIMEFRAMES[timeframe]
+
+    def ensure_connection(self):
+        raise NotImplementedError
+
+    def current_time(self) -> datetime:
+        # Clock the trading rules run on; simulated brokers return their replay time
+        return datetime.now()
+
+    def last_error(self):
+        raise NotImplementedError
+
+    def account_info(self):
+        raise NotImplementedError
+
+    def positions_get(self, symbol: Optional[str] = None) -> Optional[List]:
+        raise NotImplementedError
+
+    def symbol_info(self, symbol: str):
+        raise NotImplementedError
+
+    def symbol_info_tick(self, symbol: str):
+        raise NotImplementedError
+
+    def copy_ticks_from(self, symbol: str, date_from: int, count: int, flags: int) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from: datetime, date_to: datetime) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def order_send(self, request: Dict):
+        raise NotImplementedError
+
+    def metrics(self) -> Dict:
+        return {}
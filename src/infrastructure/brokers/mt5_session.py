@@ -0,0 +1,205 @@
+import threading
+import time
+import logging
+from typing import Callable, Dict
+from config.settings import CONFIG
+from src.infrastructure.brokers.broker_gateway import BrokerGateway
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:  # only available on Windows with a terminal installed; the simulated broker works without it
+    mt5 = None
+
+logger = logging.getLogger(__name__)
+
+STATE_DISCONNECTED = 'disconnected'
+STATE_CONNECTED = 'connected'
+STATE_CIRCUIT_OPEN = 'circuit_open'
+
+
+class BrokerConnectionError(Exception):
+    pass
+
+
+class MT5Session(BrokerGateway):
+    """
+    BrokerGateway for the MetaTrader5 terminal, shared by every symbol. The MetaTrader5 package is
+    not thread-safe, so every call goes through one lock. Functions without a gateway method are
+    still reachable under their module names.
+
+    The terminal is initialized and logged in once. ensure_connection() only runs a cheap health
+    check (terminal_info) when no call has succeeded recently, and reconnects with exponential
+    backoff on failure. The backoff waits without the lock, so other threads' calls return at once
+    (with the terminal's failure result) and their ensure_connection() raises instead of queueing
+    behind the reconnect. After `failure_threshold` consecutive failed attempts the circuit opens and
+    calls fail fast until `circuit_cooldown` seconds have passed.
+    """
+
+    def __init__(self, mt5_module=None, login: int = CONFIG['MT5_LOGIN'], password: str = CONFIG['MT5_PASSWORD'],
+                 server: str = CONFIG['MT5_SERVER'], max_attempts: int = CONFIG['MAX_RETRIES'],
+                 backoff_base: float = CONFIG['MT5_BACKOFF_BASE'], backoff_max: float = CONFIG['MT5_BACKOFF_MAX'],
+                 failure_threshold: int = CONFIG['MT5_FAILURE_THRESHOLD'], circuit_cooldown: float = CONFIG['MT5_CIRCUIT_COOLDOWN'],
+                 health_check_interval: float = CONFIG['MT5_HEALTH_CHECK_INTERVAL'],
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._lock = threading.RLock()
+        self.mt5 = mt5_module or mt5
+        if self.mt5 is None:
+            raise ImportError("The MetaTrader5 package is required for the MT5 broker gateway")
+        self.login = login
+        self.password = password
+        self.server = server
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.circuit_cooldown = circuit_cooldown
+        self.health_check_interval = health_check_interval
+        self.clock = clock
+        self.sleep = sleep
+
+        self.state = STATE_DISCONNECTED
+        self.connects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.consecutive_failures = 0
+        self.health_checks = 0
+        self._circuit_opened_at = None
+        self._last_ok = None
+        # Set while one thread runs the reconnect attempts
+        self._reconnecting = False
+
+    def ensure_connection(self):
+        with self._lock:
+            if self.state == STATE_CONNECTED:
+                if self._last_ok is not None and self.clock() - self._last_ok < self.health_check_interval:
+                    return
+                if self._is_healthy():
+                    return
+                logger.warning("MetaTrader5 health check failed, reconnecting")
+                self.state = STATE_DISCONNECTED
+
+            if self._reconnecting:
+                raise BrokerConnectionError("MetaTrader5 reconnection in progress")
+            if self.state == STATE_CIRCUIT_OPEN:
+                remaining = self.circuit_cooldown - (self.clock() - self._circuit_opened_at)
+                if remaining > 0:
+                    raise BrokerConnectionError(f"MetaTrader5 circuit open, next connection attempt in {remaining:.0f}s")
+                # Half-open: allow a single attempt through
+                max_attempts = 1
+            else:
+                max_attempts = self.max_attempts
+            self._reconnecting = True
+        try:
+            self._connect_with_backoff(max_attempts)
+        finally:
+            with self._lock:
+                self._reconnecting = False
+
+    def _is_healthy(self) -> bool:
+        self.health_checks += 1
+        terminal = self.mt5.terminal_info()
+        if terminal is None or not getattr(terminal, 'connected', True):
+            return False
+        self._last_ok = self.clock()
+        return True
+
+    def _connect_with_backoff(self, max_attempts: int):
+        for attempt in range(max_attempts):
+            with self._lock:
+                error = self._connect()
+                if error is None:
+                    return
+                self.failed_attempts += 1
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    self.state = STATE_CIRCUIT_OPEN
+                    self._circuit_opened_at = self.clock()
+                    logger.error(f"MetaTrader5 circuit opened after {self.consecutive_failures} failed attempts: {error}")
+                    raise BrokerConnectionError(error)
+                self.state = STATE_DISCONNECTED
+            if attempt + 1 < max_attempts:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                logger.warning(f"{error}, retrying in {delay:.1f}s")
+                self.sleep(delay)
+        raise BrokerConnectionError(f"MetaTrader5 connection failed after {max_attempts} attempts: {self.last_error()}")
+
+    def _connect(self):
+        # Returns None on success, otherwise the error message
+        self.mt5.shutdown()
+        if not self.mt5.initialize():
+            return f"MetaTrader5 initialization failed: {self.mt5.last_error()}"
+        if not self.mt5.login(self.login, self.password, self.server):
+            error = f"MetaTrader5 login failed: {self.mt5.last_error()}"
+            self.mt5.shutdown()
+            return error
+
+        if self.connects:
+            self.reconnects += 1
+            logger.info(f"Reconnected to MetaTrader5 (reconnect #{self.reconnects})")
+        self.connects += 1
+        self.consecutive_failures = 0
+        self._circuit_opened_at = None
+        self.state = STATE_CONNECTED
+        self._last_ok = self.clock()
+        return None
+
+    def mark_disconnected(self):
+        # Forces a health check on the next ensure_connection, e.g. after a broker call failed
+        with self._lock:
+            self._last_ok = None
+
+    def metrics(self) -> Dict:
+        return {
+            'state': self.state,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'failed_attempts': self.failed_attempts,
+            'consecutive_failures': self.consecutive_failures,
+            'health_checks': self.health_checks,
+        }
+
+    def last_error(self):
+        with self._lock:
+            return self.mt5.last_error()
+
+    def account_info(self):
+        return self._call('account_info')
+
+    def positions_get(self, symbol=None):
+        return self._call('positions_get') if symbol is None else self._call('positions_get', symbol=symbol)
+
+    def symbol_info(self, symbol):
+        return self._call('symbol_info', symbol)
+
+    def symbol_info_tick(self, symbol):
+        return self._call('symbol_info_tick', symbol)
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        return self._call('copy_ticks_from', symbol, date_from, count, flags)
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        return self._call('copy_rates_from_pos', symbol, timeframe, start_pos, count)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        return self._call('copy_rates_range', symbol, timeframe, date_from, date_to)
+
+    def order_send(self, request):
+        return self._call('order_send', request)
+
+    def _call(self, name, *args, **kwargs):
+        with self._lock:
+            result = getattr(self.mt5, name)(*args, **kwargs)
+            # A None result is how the MetaTrader5 API reports failures, so it invalidates the health cache
+            if result is None:
+                self._last_ok = None
+            else:
+                self._last_ok = self.clock()
+            return result
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'mt5':
+            raise AttributeError(name)
+        attribute = getattr(self.mt5, name)
+        if not callable(attribute):
+            return attribute
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
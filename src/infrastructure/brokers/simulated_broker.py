@@ -0,0 +1,345 @@
+import threading
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config.settings import CONFIG
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import BrokerGateway, TICK_DTYPE, TIMEFRAMES
+from src.infrastructure.data_providers.candle_store import CandleStore, RATE_DTYPE, to_epoch
+from src.infrastructure.data_providers.timeframe_resampler import aggregate_rates
+
+logger = logging.getLogger(__name__)
+
+# Bar length of each MetaTrader5 timeframe constant
+TIMEFRAME_MINUTES = {constant: timeframe.value for timeframe, constant in TIMEFRAMES.items()}
+
+
+@dataclass
+class SimulatedPosition:
+    ticket: int
+    symbol: str
+    type: int
+    volume: float
+    price_open: float
+    sl: float
+    tp: float
+    time: int
+    magic: int = 0
+    comment: str = ''
+    price_current: float = 0.0
+    profit: float = 0.0
+
+
+class SimulatedBroker(BrokerGateway):
+    """
+    In-process paper broker replaying stored M1 candles. Simulated time moves one M1 bar per advance()
+    step and the bar starting at the current time is the forming one, of which only the open is known.
+    Orders fill at that open's bid/ask plus adverse slippage, positions are marked to the current bid/ask,
+    and stop loss / take profit are triggered against each bar's high/low as it closes.
+
+    contract_size defaults to 1 / point, i.e. one account unit per point per lot, which is what the
+    RiskManager position sizing assumes.
+    """
+
+    def __init__(self, rates: Dict[str, np.ndarray], initial_balance: float = CONFIG['PAPER_INITIAL_BALANCE'],
+                 spread_points: Optional[float] = CONFIG['PAPER_SPREAD_POINTS'], slippage_points: float = CONFIG['PAPER_SLIPPAGE_POINTS'],
+                 point: float = CONFIG['BACKTEST_POINT'], contract_size: float = None, leverage: float = CONFIG['PAPER_LEVERAGE'],
+                 volume_min: float = 0.01, volume_max: float = 100.0, volume_step: float = 0.01,
+                 warmup_bars: int = CONFIG['PAPER_WARMUP_BARS'], seed: Optional[int] = None):
+        if not rates:
+            raise ValueError("The simulated broker needs candles for at least one symbol")
+        self._lock = threading.RLock()
+        self.rates = {symbol: np.asarray(symbol_rates, dtype=RATE_DTYPE) for symbol, symbol_rates in rates.items()}
+        self._times = {symbol: np.ascontiguousarray(symbol_rates['time']) for symbol, symbol_rates in self.rates.items()}
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+        # None uses the spread recorded with each candle
+        self.spread_points = spread_points
+        self.slippage_points = slippage_points
+        self.point = point
+        self.contract_size = contract_size if contract_size is not None else 1 / point
+        self.leverage = leverage
+        self.volume_min = volume_min
+        self.volume_max = volume_max
+        self.volume_step = volume_step
+        self.rng = np.random.default_rng(seed)
+
+        self.positions: Dict[int, SimulatedPosition] = {}
+        self.closed_positions: List[Dict] = []
+        self.orders = 0
+        self.rejected_orders = 0
+        self.steps = 0
+        self._next_ticket = 1
+        self._aggregates = {}
+
+        self.now = max(int(r['time'][min(warmup_bars, len(r) - 1)]) for r in self.rates.values())
+        self.end = min(int(r['time'][-1]) for r in self.rates.values())
+        self._cursors = {symbol: int(np.searchsorted(times, self.now, side='right')) - 1 for symbol, times in self._times.items()}
+
+    @classmethod
+    def from_candle_store(cls, store: CandleStore, symbols: List[str], start_date: datetime, end_date: datetime, **kwargs) -> 'SimulatedBroker':
+        rates = {}
+        for symbol in symbols:
+            columns = store.read(symbol, Timeframe.M1, start_date, end_date)
+            symbol_rates = np.empty(len(columns['time']), dtype=RATE_DTYPE)
+            for name in RATE_DTYPE.names:
+                symbol_rates[name] = columns[name]
+            rates[symbol] = symbol_rates
+        return cls(rates, **kwargs)
+
+    def _move_cursors(self):
+        # Index of the forming M1 bar per symbol: the last bar starting at or before now
+        for symbol, times in self._times.items():
+            index = self._cursors[symbol]
+            while index + 1 < len(times) and times[index + 1] <= self.now:
+                index += 1
+            self._cursors[symbol] = index
+
+    def advance(self, bars: int = 1) -> bool:
+        """Closes the forming bar(s), triggering stop losses and take profits. False once the data runs out."""
+        with self._lock:
+            for _ in range(bars):
+                if self.now + 60 > self.end:
+                    return False
+                for symbol, index in self._cursors.items():
+                    if self._times[symbol][index] == self.now:
+                        self._check_exits(symbol, self.rates[symbol][index])
+                self.now += 60
+                self.steps += 1
+                self._move_cursors()
+            return True
+
+    def _spread(self, symbol: str, index: int) -> float:
+        spread_points = self.spread_points if self.spread_points is not None else self.rates[symbol]['spread'][index]
+        return float(spread_points) * self.point
+
+    def _check_exits(self, symbol: str, bar):
+        positions = [p for p in self.positions.values() if p.symbol == symbol]
+        if not positions:
+            return
+        spread = self._spread(symbol, self._cursors[symbol])
+        open_, high, low = float(bar['open']), float(bar['high']), float(bar['low'])
+        for position in positions:
+            # Buy positions close on the bid (the candle prices), sell positions on the ask
+            if position.type == self.POSITION_TYPE_BUY:
+                stop_hit = position.sl and low <= position.sl
+                target_hit = position.tp and high >= position.tp
+                gap = open_
+            else:
+                stop_hit = position.sl and high + spread >= position.sl
+                target_hit = position.tp and low + spread <= position.tp
+                gap = open_ + spread
+            # When both levels are inside one bar the stop loss is assumed to be hit first
+            if stop_hit:
+                worse = min if position.type == self.POSITION_TYPE_BUY else max
+                self._close(position, worse(gap, position.sl), 'sl')
+            elif target_hit:
+                better = max if position.type == self.POSITION_TYPE_BUY else min
+                self._close(position, better(gap, position.tp), 'tp')
+
+    def _close(self, position: SimulatedPosition, price: float, reason: str):
+        profit = self._profit(position, price)
+        self.balance += profit
+        del self.positions[position.ticket]
+        self.closed_positions.append({
+            'ticket': position.ticket,
+            'symbol': position.symbol,
+            'type': position.type,
+            'volume': position.volume,
+            'price_open': position.price_open,
+            'price_close': price,
+            'time_open': position.time,
+            'time_close': self.now,
+            'reason': reason,
+            'profit': profit,
+        })
+
+    def _profit(self, position: SimulatedPosition, price: float) -> float:
+        direction = 1 if position.type == self.POSITION_TYPE_BUY else -1
+        return direction * (price - position.price_open) * position.volume * self.contract_size
+
+    def _quote(self, symbol: str):
+        index = self._cursors[symbol]
+        bid = float(self.rates[symbol]['open'][index])
+        return bid, bid + self._spread(symbol, index)
+
+    def _mark(self, position: SimulatedPosition) -> SimulatedPosition:
+        bid, ask = self._quote(position.symbol)
+        price = bid if position.type == self.POSITION_TYPE_BUY else ask
+        return replace(position, price_current=price, profit=self._profit(position, price))
+
+    def ensure_connection(self):
+        pass
+
+    def last_error(self):
+        return (1, 'Success')
+
+    def current_time(self) -> datetime:
+        return pd.Timestamp(self.now, unit='s').to_pydatetime()
+
+    def account_info(self):
+        with self._lock:
+            positions = [self._mark(position) for position in self.positions.values()]
+            equity = self.balance + sum(position.profit for position in positions)
+            margin = sum(position.volume * self.contract_size * position.price_open / self.leverage for position in positions)
+            return SimpleNamespace(
+                login=0, currency='USD', leverage=self.leverage, balance=self.balance, equity=equity,
+                profit=equity - self.balance, margin=margin, margin_free=equity - margin,
+                margin_level=equity / margin * 100 if margin > 0 else 0.0,
+            )
+
+    def positions_get(self, symbol: Optional[str] = None):
+        with self._lock:
+            return tuple(self._mark(position) for position in self.positions.values() if symbol is None or position.symbol == symbol)
+
+    def symbol_info(self, symbol: str):
+        if symbol not in self.rates:
+            return None
+        with self._lock:
+            bid, ask = self._quote(symbol)
+            return SimpleNamespace(
+                name=symbol, point=self.point, spread=round((ask - bid) / self.point), bid=bid, ask=ask, time=self.now,
+                trade_contract_size=self.contract_size, volume_min=self.volume_min, volume_max=self.volume_max, volume_step=self.volume_step,
+            )
+
+    def symbol_info_tick(self, symbol: str):
+        if symbol not in self.rates:
+            return None
+        with self._lock:
+            bid, ask = self._quote(symbol)
+            return SimpleNamespace(time=self.now, time_msc=self.now * 1000, bid=bid, ask=ask, last=bid, volume=0, volume_real=0.0)
+
+    def copy_ticks_from(self, symbol: str, date_from: int, count: int, flags: int) -> Optional[np.ndarray]:
+        # The replay has no tick history: the current quote is the only tick
+        tick = self.symbol_info_tick(symbol)
+        if tick is None:
+            return None
+        if tick.time < date_from or count <= 0:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.array([(tick.time, tick.bid, tick.ask, tick.last, 0, tick.time_msc, 0, 0.0)], dtype=TICK_DTYPE)
+
+    def _aggregate(self, symbol: str, minutes: int):
+        # Closed bars of a higher timeframe built from the M1 candles, computed once per symbol/timeframe
+        key = (symbol, minutes)
+        if key not in self._aggregates:
+            m1 = self.rates[symbol]
+            bars = aggregate_rates(m1, minutes)
+            # Higher timeframe bar of every M1 bar, and the M1 index each higher timeframe bar starts at
+            bar_index = np.searchsorted(bars['time'], m1['time'], side='right') - 1
+            starts = np.searchsorted(bar_index, np.arange(len(bars)), side='left')
+            self._aggregates[key] = (bars, starts, bar_index)
+        return self._aggregates[key]
+
+    def _forming(self, symbol: str, minutes: int):
+        """Closed bars of the timeframe plus the forming bar, as far as it is known at the current time."""
+        index = self._cursors[symbol]
+        m1 = self.rates[symbol]
+        forming = np.zeros(1, dtype=RATE_DTYPE)
+        opening_price = m1['open'][index]
+        if minutes == 1:
+            closed = m1[:index]
+            forming[0] = (m1['time'][index], opening_price, opening_price, opening_price, opening_price, 0, m1['spread'][index], 0)
+            return closed, forming
+        bars, starts, bar_index = self._aggregate(symbol, minutes)
+        k = bar_index[index]
+        so_far = m1[starts[k]:index]
+        forming[0] = (
+            bars['time'][k], m1['open'][starts[k]],
+            max(so_far['high'].max(), opening_price) if len(so_far) else opening_price,
+            min(so_far['low'].min(), opening_price) if len(so_far) else opening_price,
+            opening_price, so_far['tick_volume'].sum(), m1['spread'][index], so_far['real_volume'].sum(),
+        )
+        return bars[:k], forming
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int):
+        if symbol not in self.rates or timeframe not in TIMEFRAME_MINUTES:
+            return None
+        with self._lock:
+            closed, forming = self._forming(symbol, TIMEFRAME_MINUTES[timeframe])
+            # Position 0 is the forming bar, higher positions go back in time
+            total = len(closed) + 1
+            hi = total - start_pos
+            lo = max(0, hi - count)
+            if hi <= 0:
+                return np.empty(0, dtype=RATE_DTYPE)
+            if hi == total:
+                return np.concatenate([closed[lo:], forming])
+            return closed[lo:hi].copy()
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from: datetime, date_to: datetime):
+        if symbol not in self.rates or timeframe not in TIMEFRAME_MINUTES:
+            return None
+        with self._lock:
+            closed, _ = self._forming(symbol, TIMEFRAME_MINUTES[timeframe])
+            times = closed['time']
+            lo = np.searchsorted(times, to_epoch(date_from), side='left')
+            hi = np.searchsorted(times, to_epoch(date_to), side='right')
+            return closed[lo:hi].copy()
+
+    def order_send(self, request: Dict):
+        with self._lock:
+            self.orders += 1
+            result = self._execute(request)
+            if result.retcode != self.TRADE_RETCODE_DONE:
+                self.rejected_orders += 1
+            return result
+
+    def _execute(self, request: Dict):
+        symbol = request.get('symbol')
+        volume = request.get('volume', 0)
+        if request.get('action') != self.TRADE_ACTION_DEAL or symbol not in self.rates:
+            return self._result(self.TRADE_RETCODE_REJECT, 'Unsupported request', request)
+        if not self.volume_min <= volume <= self.volume_max:
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, 'Invalid volume', request)
+
+        bid, ask = self._quote(symbol)
+        slippage = self.rng.uniform(0, self.slippage_points) * self.point if self.slippage_points else 0.0
+        is_buy = request.get('type') == self.ORDER_TYPE_BUY
+        price = ask + slippage if is_buy else bid - slippage
+
+        requested = request.get('price')
+        if requested and abs(price - requested) / self.point > request.get('deviation', float('inf')):
+            return self._result(self.TRADE_RETCODE_REQUOTE, 'Requote', request, bid, ask)
+
+        if 'position' in request:
+            position = self.positions.get(request['position'])
+            if position is None or position.type == (self.POSITION_TYPE_BUY if is_buy else self.POSITION_TYPE_SELL):
+                return self._result(self.TRADE_RETCODE_REJECT, 'Position not found', request, bid, ask)
+            self._close(position, price, 'client')
+            return self._result(self.TRADE_RETCODE_DONE, 'Request executed', request, bid, ask, price, position.ticket)
+
+        margin_free = self.account_info().margin_free
+        if volume * self.contract_size * price / self.leverage > margin_free:
+            return self._result(self.TRADE_RETCODE_NO_MONEY, 'No money', request, bid, ask)
+
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        self.positions[ticket] = SimulatedPosition(
+            ticket=ticket, symbol=symbol, type=self.POSITION_TYPE_BUY if is_buy else self.POSITION_TYPE_SELL,
+            volume=volume, price_open=price, sl=request.get('sl', 0.0), tp=request.get('tp', 0.0), time=self.now,
+            magic=request.get('magic', 0), comment=request.get('comment', ''),
+        )
+        return self._result(self.TRADE_RETCODE_DONE, 'Request executed', request, bid, ask, price, ticket)
+
+    @staticmethod
+    def _result(retcode: int, comment: str, request: Dict, bid: float = 0.0, ask: float = 0.0, price: float = 0.0, order: int = 0):
+        return SimpleNamespace(retcode=retcode, deal=order, order=order, volume=request.get('volume', 0) if order else 0,
+                               price=price, bid=bid, ask=ask, comment=comment, request=request)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            account = self.account_info()
+            return {
+                'time': self.now,
+                'steps': self.steps,
+                'balance': account.balance,
+                'equity': account.equity,
+                'open_positions': len(self.positions),
+                'closed_positions': len(self.closed_positions),
+                'orders': self.orders,
+                'rejected_orders': self.rejected_orders,
+            }
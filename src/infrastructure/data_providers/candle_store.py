@@ -0,0 +1,124 @@
+import json
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Tuple
+from config.settings import CONFIG
+from src.domain.value_objects.timeframe import Timeframe
+
+logger = logging.getLogger(__name__)
+
+# Column layout of MetaTrader5 copy_rates_* results
+RATE_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+def to_epoch(moment: datetime) -> int:
+    # Naive datetimes are read as UTC, the same convention as pd.to_datetime(..., unit='s')
+    return int(pd.Timestamp(moment).timestamp())
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class CandleStore:
+    """
+    On-disk columnar candle cache, one directory per symbol/timeframe holding a .npy file per column
+    and ranges.json with the [start, end] epoch intervals already downloaded, both ends included as in
+    copy_rates_range and read(). Reads are memory-mapped.
+    """
+
+    def __init__(self, root_dir: str = CONFIG['CANDLE_STORE_DIR']):
+        self.root_dir = root_dir
+
+    def _directory(self, symbol: str, timeframe: Timeframe) -> str:
+        return os.path.join(self.root_dir, symbol, timeframe.name)
+
+    def covered_ranges(self, symbol: str, timeframe: Timeframe) -> List[Tuple[int, int]]:
+        path = os.path.join(self._directory(symbol, timeframe), 'ranges.json')
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def missing_ranges(self, symbol: str, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> List[Tuple[datetime, datetime]]:
+        start, end = to_epoch(start_date), to_epoch(end_date)
+        missing = []
+        cursor = start
+        for covered_start, covered_end in self.covered_ranges(symbol, timeframe):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return [(pd.Timestamp(s, unit='s').to_pydatetime(), pd.Timestamp(e, unit='s').to_pydatetime()) for s, e in missing]
+
+    def _load_columns(self, symbol: str, timeframe: Timeframe, mmap_mode=None) -> Dict[str, np.ndarray]:
+        directory = self._directory(symbol, timeframe)
+        if not os.path.exists(os.path.join(directory, 'time.npy')):
+            return {name: np.empty(0, dtype=RATE_DTYPE[name]) for name in RATE_DTYPE.names}
+        return {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in RATE_DTYPE.names}
+
+    def write(self, symbol: str, timeframe: Timeframe, rates: np.ndarray, covered: List[Tuple[datetime, datetime]]):
+        """Merge downloaded rates into the store and mark `covered` periods as fully fetched."""
+        directory = self._directory(symbol, timeframe)
+        os.makedirs(directory, exist_ok=True)
+
+        if rates is not None and len(rates) > 0:
+            existing = self._load_columns(symbol, timeframe)
+            combined = {name: np.concatenate([existing[name], np.asarray(rates[name], dtype=RATE_DTYPE[name])]) for name in RATE_DTYPE.names}
+
+            # Keep the newest copy of any bar fetched twice, sorted by time
+            times = combined['time']
+            order = np.argsort(times, kind='stable')
+            sorted_times = times[order]
+            keep = np.ones(len(order), dtype=bool)
+            keep[:-1] = sorted_times[1:] != sorted_times[:-1]
+            order = order[keep]
+
+            for name, column in combined.items():
+                tmp_path = os.path.join(directory, f'{name}.tmp.npy')
+                np.save(tmp_path, column[order])
+                os.replace(tmp_path, os.path.join(directory, f'{name}.npy'))
+
+        # Ranges are written last so an interrupted write never claims data it does not hold
+        ranges = self.covered_ranges(symbol, timeframe) + [(to_epoch(s), to_epoch(e)) for s, e in covered if s < e]
+        tmp_path = os.path.join(directory, 'ranges.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(merge_ranges(ranges), f)
+        os.replace(tmp_path, os.path.join(directory, 'ranges.json'))
+
+    def read(self, symbol: str, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> Dict[str, np.ndarray]:
+        # Zero-copy slices of the memory-mapped columns for bars with start_date <= time <= end_date
+        columns = self._load_columns(symbol, timeframe, mmap_mode='r')
+        times = columns['time']
+        lo = np.searchsorted(times, to_epoch(start_date), side='left')
+        hi = np.searchsorted(times, to_epoch(end_date), side='right')
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    def read_frame(self, symbol: str, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        columns = self.read(symbol, timeframe, start_date, end_date)
+        data = pd.DataFrame({name: np.asarray(column) for name, column in columns.items()})
+        data['time'] = pd.to_datetime(data['time'], unit='s')
+        return data
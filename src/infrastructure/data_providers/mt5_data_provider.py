@@ -1,99 +1,215 @@
-import MetaTrader5 as mt5
 import numpy as np
 import pandas as pd
 import time
 import logging
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from config.settings import CONFIG
+from src.domain.entities.candle_series import CandleSeries
 from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.data_providers.candle_store import CandleStore
+from src.infrastructure.data_providers.rate_downloader import RateDownloader
+from src.infrastructure.data_providers.timeframe_resampler import TimeframeResampler
+from src.infrastructure.data_providers.tick_collector import tick_price
+from src.infrastructure.brokers.broker_gateway import BrokerGateway
+from src.infrastructure.brokers.mt5_session import MT5Session
+from src.infrastructure.indicators.batch_indicators import add_technical_indicators_batch
+from src.infrastructure.indicators.indicator_registry import compute_indicators
+from src.infrastructure.indicators.incremental_indicator_engine import IncrementalIndicatorEngine
+from src.infrastructure.monitoring.metrics import METRICS, Metrics
 
 
 logger = logging.getLogger(__name__)
 
-class DataFetcher:
-    def __init__(self, symbol: str):
-        self.symbol = symbol
 
-    def ensure_mt5_connection(self):
-        if not mt5.initialize():
-            logger.error(f"MetaTrader5 initialization failed: {mt5.last_error()}")
-            raise Exception(f"MetaTrader5 initialization failed: {mt5.last_error()}")
+def fetch_historical_batch(data_fetchers: List['DataFetcher'], timeframe: Timeframe, start_date: datetime, end_date: datetime) -> Dict[str, pd.DataFrame]:
+    """
+    Historical candles of several symbols with their indicators computed in one batch across symbols.
+    The indicator columns and dtype are those of the first fetcher.
+    """
+    frames = {data_fetcher.symbol: data_fetcher.fetch_historical_rates(timeframe, start_date, end_date) for data_fetcher in data_fetchers}
+    first = data_fetchers[0]
+    return add_technical_indicators_batch(frames, first.indicator_columns, first.indicator_dtype)
 
-        if not mt5.login(CONFIG['MT5_LOGIN'], CONFIG['MT5_PASSWORD'], CONFIG['MT5_SERVER']):
-            logger.error(f"MetaTrader5 login failed: {mt5.last_error()}")
-            mt5.shutdown()
-            raise Exception(f"MetaTrader5 login failed: {mt5.last_error()}")
 
-    def fetch_historical_data(self, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> pd.DataFrame:
-            self.ensure_mt5_connection()
-            all_data = pd.DataFrame()
-
-            chunk_size = pd.DateOffset(weeks=1)
-            current_start_date = start_date
-
-            while current_start_date < end_date:
-                current_end_date = min(current_start_date + chunk_size, end_date)
-                for attempt in range(CONFIG['MAX_RETRIES']):
-                    try:
-                        rates = pd.DataFrame(mt5.copy_rates_range(self.symbol, timeframe.value, current_start_date, current_end_date))
-                        if not rates.empty:
-                            rates["time"] = pd.to_datetime(rates["time"], unit="s")
-                            all_data = pd.concat([all_data, rates], ignore_index=True)
-                            break
-                    except Exception as e:
-                        logger.error(f"Attempt {attempt + 1}: {e}")
-                    time.sleep(CONFIG['RETRY_DELAY'])
-                else:
-                    logger.error(f"Failed to fetch rates for period {current_start_date} to {current_end_date} after {CONFIG['MAX_RETRIES']} attempts")
+class DataFetcher:
+    # Bars requested per live call once the indicator state is warm (forming bar + newly closed ones)
+    INCREMENTAL_FETCH_SIZE = 3
 
-                current_start_date = current_end_date + pd.Timedelta(minutes=5)
+    def __init__(self, symbol: str, indicator_engine: Optional[IncrementalIndicatorEngine] = None, candle_store: Optional[CandleStore] = None,
+                 broker: Optional[BrokerGateway] = None, resampler: Optional[TimeframeResampler] = None,
+                 indicator_columns: Optional[List[str]] = None, indicator_dtype: Optional[str] = CONFIG['INDICATOR_DTYPE'],
+                 downloader: Optional[RateDownloader] = None, metrics: Optional[Metrics] = None):
+        self.symbol = symbol
+        self.indicator_engine = indicator_engine
+        self.candle_store = candle_store
+        self.broker = broker or MT5Session()
+        # When set, latest data of every timeframe is derived from one M1 series refreshed by sync()
+        self.resampler = resampler
+        # Indicators the consumers read (all when None), computed as indicator_dtype
+        self.indicator_columns = indicator_columns
+        self.indicator_dtype = indicator_dtype
+        self.downloader = downloader or RateDownloader(self.broker.copy_rates_range)
+        self.metrics = metrics or METRICS
 
-            if all_data.empty:
-                raise Exception("Failed to fetch rates after multiple attempts")
+    def ensure_mt5_connection(self):
+        self.broker.ensure_connection()
 
-            return self._add_technical_indicators(all_data)
+    def fetch_historical_data(self, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        return fetch_historical_batch([self], timeframe, start_date, end_date)[self.symbol]
 
-    def fetch_latest_data(self, timeframe: Timeframe, num_candles: int = 50 , extra_candles: int = 100) -> pd.DataFrame:
+    def fetch_historical_rates(self, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Stored or downloaded candles of the range, without indicators."""
+        if self.candle_store is None:
+            self.ensure_mt5_connection()
+            rates, _ = self._download_rates(timeframe, start_date, end_date)
+            data = pd.DataFrame(rates)
+            if not data.empty:
+                data['time'] = pd.to_datetime(data['time'], unit='s')
+        else:
+            missing = self.candle_store.missing_ranges(self.symbol, timeframe, start_date, end_date)
+            if missing:
+                self.ensure_mt5_connection()
+                # Never mark the still-forming bar as covered
+                horizon = self._coverage_horizon(timeframe)
+                for gap_start, gap_end in missing:
+                    logger.info(f"Downloading {self.symbol} {timeframe.name} rates from {gap_start} to {gap_end}")
+                    rates, failed = self._download_rates(timeframe, gap_start, gap_end)
+                    covered = [] if failed or horizon is None else [(gap_start, min(gap_end, horizon))]
+                    self.candle_store.write(self.symbol, timeframe, rates, covered)
+            data = self.candle_store.read_frame(self.symbol, timeframe, start_date, end_date)
+
+        if data.empty:
+            raise Exception("Failed to fetch rates after multiple attempts")
+        return data
+
+    def _coverage_horizon(self, timeframe: Timeframe) -> Optional[datetime]:
+        # Last second before the forming bar opened, on the broker's clock the stored epochs are in
+        latest = self.latest_bar_time(timeframe)
+        if latest is None:
+            return None
+        return pd.Timestamp(latest - 1, unit='s').to_pydatetime()
+
+    def _download_rates(self, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> Tuple[np.ndarray, bool]:
+        return self.downloader.download(self.symbol, timeframe, start_date, end_date)
+
+    def fetch_latest_data(self, timeframe: Timeframe, num_candles: int = 50 , extra_candles: int = 100) -> CandleSeries:
         self.ensure_mt5_connection()
 
         for attempt in range(CONFIG['MAX_RETRIES']):
             try:
+                if self.indicator_engine is not None:
+                    df = self._fetch_latest_incremental(timeframe, num_candles, extra_candles)
+                    if df is not None:
+                        return df
+                    logger.warning(f"No {self.symbol} {timeframe.name} data received from MetaTrader 5")
+                    self.metrics.inc('data_fetch_retries_total', symbol=self.symbol, timeframe=timeframe.name)
+                    time.sleep(CONFIG['RETRY_DELAY'])
+                    continue
+
                 # Fetch the most recent completed candles
                 total_candles = num_candles + extra_candles
-                rates = mt5.copy_rates_from_pos(self.symbol, timeframe.value, 0, total_candles)
+                rates = self._latest_rates(timeframe, total_candles)
                 if rates is not None and len(rates) > 0:
                     df = pd.DataFrame(rates)
                     df['time'] = pd.to_datetime(df['time'], unit='s')
-
-                    print(f"1.Current time: {datetime.now()} -- 2.MetaTrader server time: {mt5.symbol_info(self.symbol).time}")
+                    logger.debug(f"{self.symbol} {timeframe.name} data up to {df['time'].iloc[-1]}")
 
                     # Calculate indicators using all fetched data
-                    df_with_indicators = self._add_technical_indicators(df)
+                    with self.metrics.timer('trading_stage_seconds', stage='indicators', symbol=self.symbol):
+                        df_with_indicators = self._add_technical_indicators(df)
 
                     # Return only the required number of candles
-                    return df_with_indicators.tail(num_candles)
+                    return CandleSeries.from_frame(df_with_indicators.tail(num_candles))
                 else:
-                    print("No data received from MetaTrader 5")
+                    logger.warning(f"No {self.symbol} {timeframe.name} data received from MetaTrader 5")
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} to fetch latest data failed: {e}")
+            self.metrics.inc('data_fetch_retries_total', symbol=self.symbol, timeframe=timeframe.name)
             time.sleep(CONFIG['RETRY_DELAY'])
 
         raise Exception(f"Failed to fetch latest data after {CONFIG['MAX_RETRIES']} attempts")
 
+    def _fetch_latest_incremental(self, timeframe: Timeframe, num_candles: int, extra_candles: int) -> Optional[CandleSeries]:
+        state = self.indicator_engine.state(self.symbol, timeframe)
+        warmup_candles = num_candles + extra_candles
+        count = warmup_candles if state.last_time is None else self.INCREMENTAL_FETCH_SIZE
+
+        # Grow the request until it overlaps the last bar already folded into the state
+        while True:
+            rates = self._latest_rates(timeframe, count)
+            if rates is None or len(rates) == 0:
+                return None
+            bars = [self._rate_to_bar(rate, rates.dtype.names) for rate in rates]
+            if state.last_time is None or bars[0]['time'] <= state.last_time or count >= warmup_candles:
+                break
+            count = min(count * 4, warmup_candles)
+
+        if state.last_time is not None and bars[0]['time'] > state.last_time:
+            logger.warning(f"Gap in {self.symbol} {timeframe.name} data since {state.last_time}, rebuilding indicator state")
+            state.reset()
+
+        # The last bar (newest, position 0 in MT5 terms) is still forming: evaluate it without committing it to the state
+        with self.metrics.timer('trading_stage_seconds', stage='indicators', symbol=self.symbol):
+            for bar in bars[:-1]:
+                if state.last_time is None or bar['time'] > state.last_time:
+                    state.update(bar)
+            series = state.series(num_candles, forming_bar=bars[-1])
+        logger.debug(f"{self.symbol} {timeframe.name} data up to {bars[-1]['time']}")
+        return series
+
+    def sync(self):
+        """Pulls the latest M1 rates into the resampler, fixing the snapshot all timeframes are read at."""
+        if self.resampler is None:
+            return
+        self.ensure_mt5_connection()
+        history = self.resampler.history_size
+        count = history if self.resampler.last_closed_time is None else self.INCREMENTAL_FETCH_SIZE
+        while True:
+            rates = self.broker.copy_rates_from_pos(self.symbol, self.broker.timeframe(Timeframe.M1), 0, count)
+            if rates is None or len(rates) == 0:
+                raise Exception(f"No M1 data received for {self.symbol}")
+            if self.resampler.overlaps(rates) or count >= history:
+                break
+            count = min(count * 4, history)
+        self.resampler.update(rates)
+
+    def _latest_rates(self, timeframe: Timeframe, count: int):
+        if self.resampler is None:
+            return self.broker.copy_rates_from_pos(self.symbol, self.broker.timeframe(timeframe), 0, count)
+        if self.resampler.snapshot_time is None:
+            self.sync()
+        return self.resampler.latest(timeframe, count)
+
+    @staticmethod
+    def _rate_to_bar(rate, names) -> Dict:
+        bar = dict(zip(names, rate.tolist()))
+        bar['time'] = pd.Timestamp(bar['time'], unit='s')
+        return bar
+
+    def latest_bar_time(self, timeframe: Timeframe) -> Optional[int]:
+        # Open time (epoch seconds) of the newest bar, used to detect that a new bar has started
+        self.ensure_mt5_connection()
+        rates = self.broker.copy_rates_from_pos(self.symbol, self.broker.timeframe(timeframe), 0, 1)
+        if rates is None or len(rates) == 0:
+            return None
+        return int(rates['time'][-1])
+
     def fetch_current_tick(self) -> pd.Series:
         self.ensure_mt5_connection()
 
         for attempt in range(CONFIG['MAX_RETRIES']):
             try:
-                tick = mt5.symbol_info_tick(self.symbol)
+                tick = self.broker.symbol_info_tick(self.symbol)
                 if tick is not None:
                     spread = tick.ask - tick.bid
+                    price = tick_price(tick.bid, tick.last)
                     return pd.Series({
                         'time': datetime.now(),
-                        'open': tick.last,
-                        'high': tick.last,
-                        'low': tick.last,
-                        'close': tick.last,
+                        'open': price,
+                        'high': price,
+                        'low': price,
+                        'close': price,
                         'tick_volume': tick.volume,
                         'spread': spread,
                         'real_volume': tick.volume_real
@@ -105,76 +221,4 @@ class DataFetcher:
         raise Exception(f"Failed to fetch latest tick after {CONFIG['MAX_RETRIES']} attempts")
 
     def _add_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
-        # Ensure data is sorted by time
-        data = data.sort_values('time')
-
-        # Calculate returns
-        data['returns'] = data['close'].pct_change()
-
-        # SMA and EMA
-        data['SMA_20'] = data['close'].rolling(window=20).mean()
-        data['EMA_50'] = data['close'].ewm(span=50, adjust=False).mean()
-
-        # RSI
-        delta = data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        data['RSI'] = 100 - (100 / (1 + rs))
-
-        # MACD
-        exp1 = data['close'].ewm(span=12, adjust=False).mean()
-        exp2 = data['close'].ewm(span=26, adjust=False).mean()
-        data['MACD'] = exp1 - exp2
-        data['Signal_Line'] = data['MACD'].ewm(span=9, adjust=False).mean()
-        data['MACD_Histogram'] = data['MACD'] - data['Signal_Line']
-
-        # Bollinger Bands
-        data['BB_Middle'] = data['close'].rolling(window=20).mean()
-        data['BB_Std'] = data['close'].rolling(window=20).std()
-        data['BB_Upper'] = data['BB_Middle'] + (data['BB_Std'] * 2)
-        data['BB_Lower'] = data['BB_Middle'] - (data['BB_Std'] * 2)
-        data['BB_Width'] = (data['BB_Upper'] - data['BB_Lower']) / data['BB_Middle']
-
-        # Stochastic Oscillator
-        low_14 = data['low'].rolling(window=14).min()
-        high_14 = data['high'].rolling(window=14).max()
-        data['%K'] = ((data['close'] - low_14) / (high_14 - low_14)) * 100
-        data['%D'] = data['%K'].rolling(window=3).mean()
-
-        # ATR (Average True Range)
-        data['TR'] = np.maximum(
-            data['high'] - data['low'],
-            np.maximum(
-                abs(data['high'] - data['close'].shift()),
-                abs(data['low'] - data['close'].shift())
-            )
-        )
-        data['ATR'] = data['TR'].rolling(window=14).mean()
-
-        # ADX (Average Directional Index)
-        plus_dm = np.maximum(data['high'] - data['high'].shift(), 0)
-        minus_dm = np.maximum(data['low'].shift() - data['low'], 0)
-        plus_dm[(plus_dm < minus_dm) | (plus_dm == minus_dm)] = 0
-        minus_dm[(minus_dm < plus_dm) | (minus_dm == plus_dm)] = 0
-
-        tr = data['TR']
-        plus_di = 100 * (plus_dm.rolling(window=14).sum() / tr.rolling(window=14).sum())
-        minus_di = 100 * (minus_dm.rolling(window=14).sum() / tr.rolling(window=14).sum())
-        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-        data['ADX'] = dx.rolling(window=14).mean()
-
-        # Momentum
-        data['Momentum'] = data['close'] - data['close'].shift(4)
-
-        # Rate of Change
-        data['ROC'] = data['close'].pct_change(periods=12) * 100
-
-        # On-Balance Volume (OBV)
-        volume = data['real_volume'].where(data['real_volume'] != 0, data['tick_volume'])
-        data['OBV'] = (np.sign(data['close'].diff()) * volume).cumsum()
-
-        # Volume Rate of Change
-        data['Volume_ROC'] = volume.pct_change(periods=1) * 100
-
-        return data
\ No newline at end of file
+        return compute_indicators(data, self.indicator_columns, self.indicator_dtype)
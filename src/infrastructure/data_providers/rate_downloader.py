@@ -0,0 +1,156 @@
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config.settings import CONFIG
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import TIMEFRAMES
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE, to_epoch
+
+logger = logging.getLogger(__name__)
+
+# copy_rates_range(symbol, timeframe, date_from, date_to) with an MT5 TIMEFRAME_* constant, both dates inclusive
+FetchFn = Callable[[str, int, datetime, datetime], Optional[np.ndarray]]
+
+
+def to_datetime(epoch: int) -> datetime:
+    # Inverse of to_epoch: naive datetimes are UTC
+    return pd.Timestamp(epoch, unit='s').to_pydatetime()
+
+
+@dataclass
+class DownloadReport:
+    bars: int = 0
+    chunks: int = 0
+    requests: int = 0
+    retries: int = 0
+    failed_chunks: int = 0
+    duplicates: int = 0
+    seconds: float = 0.0
+
+    @property
+    def bars_per_second(self) -> float:
+        return self.bars / self.seconds if self.seconds > 0 else 0.0
+
+
+class RateDownloader:
+    """
+    Downloads a date range of rates as chunks fetched by a bounded pool of workers. Chunks start on bar
+    boundaries of the timeframe and are sized from the bar density seen so far, so each request returns
+    about `bars_per_request` bars whether the range is dense or full of weekends. Bars are written into a
+    preallocated array at the slot of their open time, which orders them and drops duplicates. An empty
+    chunk is a valid answer (market closed); only errors and None results are retried.
+
+    Requests only overlap when `fetch_fn` can run concurrently. MT5Session serializes every terminal call
+    on one lock (the MetaTrader5 package is not thread-safe), so against a live terminal the chunks are
+    fetched one after another and the workers only overlap placing a chunk with fetching the next.
+    """
+
+    # A chunk spans at most this many times bars_per_request bar slots, however sparse the data
+    MAX_STRETCH = 8
+
+    def __init__(self, fetch_fn: FetchFn, workers: int = CONFIG['DOWNLOAD_WORKERS'], bars_per_request: int = CONFIG['DOWNLOAD_BARS_PER_REQUEST'],
+                 max_retries: int = CONFIG['MAX_RETRIES'], retry_delay: float = CONFIG['RETRY_DELAY'],
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.perf_counter):
+        self.fetch_fn = fetch_fn
+        self.workers = max(1, workers)
+        self.bars_per_request = max(1, bars_per_request)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sleep = sleep
+        self.clock = clock
+        self.last_report = DownloadReport()
+
+    def download(self, symbol: str, timeframe: Timeframe, start_date: datetime, end_date: datetime) -> Tuple[np.ndarray, bool]:
+        """Rates with open times in [start_date, end_date] ordered by time, and whether any chunk failed."""
+        report = DownloadReport()
+        started = self.clock()
+        period = timeframe.value * 60
+        start, end = to_epoch(start_date), to_epoch(end_date)
+        if end < start:
+            self.last_report = report
+            return np.empty(0, dtype=RATE_DTYPE), False
+
+        origin = start // period * period
+        slots = (end - origin) // period + 1
+        rates = np.empty(slots, dtype=RATE_DTYPE)
+        filled = np.zeros(slots, dtype=bool)
+        # Bars per slot seen so far, starting from dense data
+        seen_bars, seen_slots = 0, 0
+        cursor = start
+        pending = {}
+
+        def next_chunk() -> Optional[Tuple[int, int, int]]:
+            nonlocal cursor
+            if cursor > end:
+                return None
+            density = seen_bars / seen_slots if seen_slots else 1.0
+            width = int(min(self.bars_per_request / max(density, 1e-9), self.bars_per_request * self.MAX_STRETCH))
+            boundary = (cursor // period + max(width, 1)) * period
+            chunk = (cursor, min(boundary - 1, end), (min(boundary, end + 1) - cursor + period - 1) // period)
+            cursor = boundary
+            return chunk
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rate-download') as executor:
+            while True:
+                while len(pending) < self.workers:
+                    chunk = next_chunk()
+                    if chunk is None:
+                        break
+                    future = executor.submit(self._fetch_chunk, symbol, timeframe, chunk[0], chunk[1])
+                    pending[future] = chunk
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_start, chunk_end, chunk_slots = pending.pop(future)
+                    chunk, attempts = future.result()
+                    report.chunks += 1
+                    report.requests += attempts
+                    report.retries += attempts - 1
+                    if chunk is None:
+                        report.failed_chunks += 1
+                        logger.error(f"Failed to fetch rates for period {to_datetime(chunk_start)} to {to_datetime(chunk_end)} after {attempts} attempts")
+                        continue
+                    seen_slots += chunk_slots
+                    seen_bars += len(chunk)
+                    report.duplicates += self._place(chunk, rates, filled, origin, period, start, end)
+
+        rates = rates[filled]
+        report.bars = len(rates)
+        report.seconds = self.clock() - started
+        self.last_report = report
+        logger.info(f"Downloaded {report.bars} {symbol} {timeframe.name} bars in {report.chunks} chunks and {report.seconds:.2f}s "
+                    f"({report.bars_per_second:.0f} bars/s, {report.retries} retries, {report.failed_chunks} failed)")
+        return rates, report.failed_chunks > 0
+
+    def _fetch_chunk(self, symbol: str, timeframe: Timeframe, chunk_start: int, chunk_end: int) -> Tuple[Optional[np.ndarray], int]:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                rates = self.fetch_fn(symbol, TIMEFRAMES[timeframe], to_datetime(chunk_start), to_datetime(chunk_end))
+                if rates is not None:
+                    return rates, attempt
+                logger.warning(f"Attempt {attempt}: no rates returned for {symbol} from {to_datetime(chunk_start)}")
+            except Exception as e:
+                logger.error(f"Attempt {attempt}: {e}")
+            if attempt < self.max_retries:
+                self.sleep(self.retry_delay)
+        return None, self.max_retries
+
+    @staticmethod
+    def _place(chunk: np.ndarray, rates: np.ndarray, filled: np.ndarray, origin: int, period: int, start: int, end: int) -> int:
+        # Writes bars into their time slot and returns how many were already there
+        times = chunk['time'].astype(np.int64)
+        inside = (times >= start) & (times <= end)
+        chunk, times = chunk[inside], times[inside]
+        slots = (times - origin) // period
+        duplicates = int(filled[slots].sum()) + len(slots) - len(np.unique(slots))
+        for name in RATE_DTYPE.names:
+            rates[name][slots] = chunk[name]
+        filled[slots] = True
+        return duplicates
@@ -0,0 +1,303 @@
+import math
+import time
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config.settings import CONFIG
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import BrokerGateway
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+def tick_price(bid: float, last: float) -> float:
+    # Symbols without exchange deals (most FX and CFDs) report last as 0; their bars are built from the bid
+    return last if last > 0 else bid
+
+
+@dataclass(frozen=True)
+class MarketView:
+    """Spread and volatility of one symbol over the last `window_seconds` of ticks."""
+    time_msc: int
+    spread: float
+    mean_spread: float
+    relative_spread: float
+    volatility: float
+    ticks: int
+    window_seconds: float
+
+
+class TickBuffer:
+    """Fixed-capacity ring of ticks in preallocated arrays; appending never allocates and drops repeats of the latest tick."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.time_msc = np.zeros(capacity, dtype=np.int64)
+        self.bid = np.zeros(capacity)
+        self.ask = np.zeros(capacity)
+        self.last = np.zeros(capacity)
+        self.volume = np.zeros(capacity)
+        self.count = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, time_msc: int, bid: float, ask: float, last: float, volume: float) -> bool:
+        if self.count:
+            i = (self.count - 1) % self.capacity
+            latest = self.time_msc[i]
+            if time_msc < latest or (time_msc == latest and bid == self.bid[i] and ask == self.ask[i]
+                                     and last == self.last[i] and volume == self.volume[i]):
+                self.duplicates += 1
+                return False
+        i = self.count % self.capacity
+        self.time_msc[i] = time_msc
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.last[i] = last
+        self.volume[i] = volume
+        self.count += 1
+        return True
+
+    def latest(self, field: str, n: int) -> np.ndarray:
+        """The newest n values of a field, oldest first."""
+        values = getattr(self, field)
+        n = min(n, len(self))
+        end = self.count % self.capacity
+        start = end - n
+        if start >= 0:
+            return values[start:end]
+        return np.concatenate([values[start:], values[:end]])
+
+
+class TickBarBuilder:
+    """Builds bars of one timeframe tick by tick into a preallocated ring of closed bars."""
+
+    def __init__(self, timeframe: Timeframe, capacity: int = 500, offset_minutes: int = 0):
+        self.period_msc = timeframe.value * 60_000
+        self.offset_msc = offset_minutes * 60_000
+        self.bars = np.zeros(capacity, dtype=RATE_DTYPE)
+        self.count = 0
+        self._start = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._ticks = 0
+        self._volume = 0.0
+        self._spread = 0
+
+    def update(self, time_msc: int, price: float, spread_points: int, volume: float):
+        start = (time_msc - self.offset_msc) // self.period_msc * self.period_msc + self.offset_msc
+        if self._start is not None and start > self._start:
+            self._close_bar()
+        if self._start is None or start > self._start:
+            self._start = start
+            self._open = self._high = self._low = price
+            self._ticks = 0
+            self._volume = 0.0
+            self._spread = spread_points
+        elif start < self._start:
+            # A late tick of a bar that already closed
+            return
+        self._high = max(self._high, price)
+        self._low = min(self._low, price)
+        self._close = price
+        self._ticks += 1
+        self._volume += volume
+        self._spread = min(self._spread, spread_points)
+
+    def _close_bar(self):
+        bar = self.bars[self.count % len(self.bars)]
+        bar['time'] = self._start // 1000
+        bar['open'] = self._open
+        bar['high'] = self._high
+        bar['low'] = self._low
+        bar['close'] = self._close
+        bar['tick_volume'] = self._ticks
+        bar['spread'] = self._spread
+        bar['real_volume'] = self._volume
+        self.count += 1
+
+    def latest(self, count: int) -> np.ndarray:
+        """The last `count` bars with the forming bar last, laid out like copy_rates_from_pos."""
+        if self._start is None or count <= 0:
+            return np.empty(0, dtype=RATE_DTYPE)
+        closed_count = min(count - 1, self.count, len(self.bars))
+        end = self.count % len(self.bars)
+        indices = (np.arange(end - closed_count, end)) % len(self.bars)
+        forming = np.array([(self._start // 1000, self._open, self._high, self._low, self._close,
+                             self._ticks, self._spread, self._volume)], dtype=RATE_DTYPE)
+        return np.concatenate([self.bars[indices], forming])
+
+
+class SymbolTicks:
+    """Tick buffer and bar builders of one symbol, guarded by a lock shared with readers."""
+
+    def __init__(self, timeframes: Iterable[Timeframe], capacity: int, bar_capacity: int, offset_minutes: int, point: float):
+        self.buffer = TickBuffer(capacity)
+        self.builders = {timeframe: TickBarBuilder(timeframe, bar_capacity, offset_minutes) for timeframe in timeframes}
+        self.point = point
+        self.lock = threading.Lock()
+
+    def ingest(self, time_msc: int, bid: float, ask: float, last: float, volume: float) -> bool:
+        with self.lock:
+            if not self.buffer.append(time_msc, bid, ask, last, volume):
+                return False
+            price = tick_price(bid, last)
+            spread_points = round((ask - bid) / self.point) if self.point else 0
+            for builder in self.builders.values():
+                builder.update(time_msc, price, spread_points, volume)
+            return True
+
+    def market_view(self, window_seconds: float) -> Optional[MarketView]:
+        with self.lock:
+            if not len(self.buffer):
+                return None
+            times = self.buffer.latest('time_msc', len(self.buffer))
+            start = int(np.searchsorted(times, times[-1] - window_seconds * 1000, side='left'))
+            n = len(times) - start
+            bid = self.buffer.latest('bid', n)
+            ask = self.buffer.latest('ask', n)
+            time_msc = int(times[-1])
+        spreads = ask - bid
+        mid = (ask + bid) / 2
+        returns = np.diff(np.log(mid)) if n > 1 else np.empty(0)
+        return MarketView(
+            time_msc=time_msc,
+            spread=float(spreads[-1]),
+            mean_spread=float(spreads.mean()),
+            relative_spread=float(spreads[-1] / mid[-1]) if mid[-1] else math.nan,
+            # Realized volatility of the mid price across the window
+            volatility=float(np.sqrt(np.sum(returns * returns))) if len(returns) else math.nan,
+            ticks=n,
+            window_seconds=window_seconds,
+        )
+
+
+class TickCollector:
+    """
+    Fetches every tick of each symbol since the last one seen on a background thread into per-symbol
+    ring buffers, building bars of the requested timeframes as ticks arrive. Memory per symbol is fixed
+    by the buffer sizes. Views of symbols not polled successfully within `max_age` seconds are withheld.
+    """
+
+    # Ticks requested per symbol and poll; a backlog beyond it is caught up over the next polls
+    MAX_TICKS_PER_POLL = 10_000
+
+    def __init__(self, broker: BrokerGateway, symbols: List[str], timeframes: Iterable[Timeframe] = (Timeframe.M1, Timeframe.M5),
+                 capacity: int = CONFIG['TICK_BUFFER_SIZE'], bar_capacity: int = 500, poll_interval: float = CONFIG['TICK_POLL_INTERVAL'],
+                 window_seconds: float = CONFIG['TICK_WINDOW_SECONDS'], offset_minutes: int = CONFIG['SESSION_OFFSET_MINUTES'],
+                 max_age: float = CONFIG['TICK_MAX_AGE_SECONDS'], clock: Callable[[], float] = time.monotonic):
+        self.broker = broker
+        self.symbols = symbols
+        self.timeframes = list(timeframes)
+        self.capacity = capacity
+        self.bar_capacity = bar_capacity
+        self.poll_interval = poll_interval
+        self.window_seconds = window_seconds
+        self.offset_minutes = offset_minutes
+        self.max_age = max_age
+        self.clock = clock
+        self._symbols: Dict[str, SymbolTicks] = {}
+        # (time_msc of the newest tick ingested, ticks ingested at that millisecond) per symbol
+        self._cursors: Dict[str, Tuple[int, int]] = {}
+        # Clock reading of the last successful poll per symbol
+        self._polled_at: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ticks', daemon=True)
+        self._thread.start()
+        logger.info(f"Collecting ticks for {', '.join(self.symbols)} every {self.poll_interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self):
+        self.polls += 1
+        for symbol in self.symbols:
+            try:
+                self._poll_symbol(symbol)
+                self._polled_at[symbol] = self.clock()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"[{symbol}] Failed to collect ticks: {e}")
+
+    def _poll_symbol(self, symbol: str):
+        cursor = self._cursors.get(symbol)
+        if cursor is None:
+            # The first poll backfills one measurement window before the current tick
+            tick = self.broker.symbol_info_tick(symbol)
+            if tick is None:
+                raise Exception(f"No tick received, error: {self.broker.last_error()}")
+            cursor = (int(tick.time_msc - self.window_seconds * 1000), 0)
+        since_msc, seen = cursor
+        ticks = self.broker.copy_ticks_from(symbol, since_msc // 1000, self.MAX_TICKS_PER_POLL, self.broker.COPY_TICKS_ALL)
+        if ticks is None:
+            raise Exception(f"No ticks received, error: {self.broker.last_error()}")
+        # Requests start at a whole second: drop what precedes the cursor and what was ingested at it
+        ticks = ticks[ticks['time_msc'] >= since_msc]
+        if not len(ticks):
+            self._cursors[symbol] = cursor
+            return
+        at_cursor = int(np.count_nonzero(ticks['time_msc'] == since_msc))
+        for tick in ticks[min(seen, at_cursor):]:
+            self.ingest(symbol, tick)
+        last_msc = int(ticks['time_msc'][-1])
+        self._cursors[symbol] = (last_msc, int(np.count_nonzero(ticks['time_msc'] == last_msc)))
+
+    def ingest(self, symbol: str, tick) -> bool:
+        ticks = self._symbols.get(symbol)
+        if ticks is None:
+            symbol_info = self.broker.symbol_info(symbol)
+            point = symbol_info.point if symbol_info is not None else 0.0
+            ticks = self._symbols[symbol] = SymbolTicks(self.timeframes, self.capacity, self.bar_capacity, self.offset_minutes, point)
+        # Only ticks flagged as deals carry a volume; on the others it repeats the last deal's
+        volume = 0.0
+        if int(tick['flags']) & self.broker.TICK_FLAG_VOLUME:
+            volume = float(tick['volume_real']) if tick['volume_real'] else float(tick['volume'])
+        return ticks.ingest(int(tick['time_msc']), float(tick['bid']), float(tick['ask']), float(tick['last']), volume)
+
+    def market_view(self, symbol: str) -> Optional[MarketView]:
+        ticks = self._symbols.get(symbol)
+        if ticks is None:
+            return None
+        polled_at = self._polled_at.get(symbol)
+        if polled_at is None or self.clock() - polled_at > self.max_age:
+            logger.warning(f"[{symbol}] Ticks not collected for more than {self.max_age}s, market view withheld")
+            return None
+        return ticks.market_view(self.window_seconds)
+
+    def bars(self, symbol: str, timeframe: Timeframe, count: int) -> np.ndarray:
+        ticks = self._symbols.get(symbol)
+        if ticks is None or timeframe not in ticks.builders:
+            return np.empty(0, dtype=RATE_DTYPE)
+        with ticks.lock:
+            return ticks.builders[timeframe].latest(count)
+
+    def stats(self) -> Dict:
+        return {
+            'polls': self.polls,
+            'errors': self.errors,
+            'ticks': {symbol: ticks.buffer.count for symbol, ticks in self._symbols.items()},
+            'duplicates': {symbol: ticks.buffer.duplicates for symbol, ticks in self._symbols.items()},
+        }
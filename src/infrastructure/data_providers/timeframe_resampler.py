@@ -0,0 +1,108 @@
+import logging
+from typing import Dict, Optional, Tuple
+import numpy as np
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+def aggregate_rates(m1: np.ndarray, minutes: int, offset_seconds: int = 0) -> np.ndarray:
+    """
+    Aggregates consecutive M1 rates into `minutes` bars aligned to `offset_seconds` past midnight UTC:
+    first open, highest high, lowest low, last close, summed volumes and the lowest spread.
+    """
+    if len(m1) == 0:
+        return np.empty(0, dtype=RATE_DTYPE)
+    period = minutes * 60
+    buckets = (m1['time'] - offset_seconds) // period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(m1)]
+    bars = np.empty(len(starts), dtype=RATE_DTYPE)
+    bars['time'] = buckets[starts] * period + offset_seconds
+    bars['open'] = m1['open'][starts]
+    bars['high'] = np.maximum.reduceat(m1['high'], starts)
+    bars['low'] = np.minimum.reduceat(m1['low'], starts)
+    bars['close'] = m1['close'][ends - 1]
+    bars['tick_volume'] = np.add.reduceat(m1['tick_volume'], starts)
+    bars['spread'] = np.minimum.reduceat(m1['spread'], starts)
+    bars['real_volume'] = np.add.reduceat(m1['real_volume'], starts)
+    return bars
+
+
+class TimeframeResampler:
+    """
+    One symbol's M1 series, from which every higher timeframe is derived. `update` folds in the latest
+    M1 rates (the last one still forming) and fixes the snapshot all timeframes are read at; a higher
+    timeframe bar counts as closed only once the forming M1 bar lies past it, before that it is the
+    forming bar. `offset_minutes` shifts bar boundaries to the trading session, e.g. for H4 and D1.
+    """
+
+    def __init__(self, history_size: int = 3000, offset_minutes: int = 0):
+        self.history_size = history_size
+        self.offset_seconds = offset_minutes * 60
+        self.reset()
+
+    def reset(self):
+        self._closed = np.empty(0, dtype=RATE_DTYPE)
+        self._forming = None
+        # Closed bars per timeframe, valid for the M1 history they were built from
+        self._aggregates: Dict[int, Tuple[int, np.ndarray]] = {}
+
+    @property
+    def last_closed_time(self) -> Optional[int]:
+        return int(self._closed['time'][-1]) if len(self._closed) else None
+
+    @property
+    def snapshot_time(self) -> Optional[int]:
+        """Open time of the forming M1 bar, the instant every timeframe is currently read at."""
+        return int(self._forming['time'][0]) if self._forming is not None else None
+
+    def overlaps(self, rates: np.ndarray) -> bool:
+        # Whether freshly fetched rates join the known history without a gap; starting at the forming bar is enough
+        return self.snapshot_time is None or int(rates['time'][0]) <= self.snapshot_time
+
+    def update(self, rates: np.ndarray):
+        """Merges M1 rates ordered by time; the last one is the forming bar."""
+        if len(rates) == 0:
+            return
+        if not self.overlaps(rates):
+            logger.warning(f"Gap in M1 data since {self.last_closed_time}, rebuilding the resampled history")
+            self.reset()
+
+        closed = rates[:-1]
+        last_time = self.last_closed_time
+        if last_time is not None:
+            closed = closed[closed['time'] > last_time]
+        if len(closed):
+            self._closed = np.concatenate([self._closed, closed])[-self.history_size:]
+        self._forming = rates[-1:].copy()
+
+    def latest(self, timeframe: Timeframe, count: int) -> np.ndarray:
+        """The last `count` bars of `timeframe` with the forming bar last, laid out like copy_rates_from_pos."""
+        if self._forming is None or count <= 0:
+            return np.empty(0, dtype=RATE_DTYPE)
+        if timeframe == Timeframe.M1:
+            return np.concatenate([self._closed[-(count - 1):] if count > 1 else self._closed[:0], self._forming])
+
+        closed = self._closed_bars(timeframe.value)
+        period = timeframe.value * 60
+        forming_start = (self.snapshot_time - self.offset_seconds) // period * period + self.offset_seconds
+        # Closed bars are only final when the forming M1 bar starts a later bar
+        if len(closed) and closed['time'][-1] >= forming_start:
+            closed = closed[:-1]
+        forming_m1 = np.concatenate([self._closed[self._closed['time'] >= forming_start], self._forming])
+        forming = aggregate_rates(forming_m1, timeframe.value, self.offset_seconds)[-1:]
+        return np.concatenate([closed[-(count - 1):] if count > 1 else closed[:0], forming])
+
+    def _closed_bars(self, minutes: int) -> np.ndarray:
+        key = self.last_closed_time
+        cached = self._aggregates.get(minutes)
+        if cached is None or cached[0] != key:
+            bars = aggregate_rates(self._closed, minutes, self.offset_seconds)
+            # The oldest bar is partial when the history starts inside it
+            if len(bars) and bars['time'][0] < self._closed['time'][0]:
+                bars = bars[1:]
+            cached = (key, bars)
+            self._aggregates[minutes] = cached
+        return cached[1]
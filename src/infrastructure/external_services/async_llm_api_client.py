@@ -0,0 +1,160 @@
+import asyncio
+import random
+import time
+import logging
+import weakref
+from typing import Dict, Optional, Tuple
+import openai
+from openai import AsyncOpenAI
+from config.settings import CONFIG
+from src.infrastructure.external_services.decision_parser import STREAM_PENDING, StreamingDecisionParser
+from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.external_services.llm_response_cache import LLMResponseCache
+from src.infrastructure.external_services.prompt_encoder import CandleWindow, PromptEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Asyncio token bucket: `rate` tokens per second refilled up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        # asyncio locks belong to the loop they are first used on, so each loop gets its own
+        self._locks = weakref.WeakKeyDictionary()
+
+    async def acquire(self, tokens: float = 1.0):
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        async with lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class AsyncLLMApiClient(LLMApiClient):
+    """
+    asyncio variant of LLMApiClient for batch decision generation. At most `max_concurrency` requests
+    are in flight, request starts are paced by a token bucket, and 429/5xx/connection errors are
+    retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str = CONFIG['LLM_MODEL'], cache: Optional[LLMResponseCache] = None,
+                 max_concurrency: int = CONFIG['LLM_MAX_CONCURRENCY'], requests_per_second: float = CONFIG['LLM_REQUESTS_PER_SECOND'],
+                 max_retries: int = CONFIG['MAX_RETRIES'], backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 prompt_encoder: Optional[PromptEncoder] = None, token_budget: Optional[int] = CONFIG['PROMPT_TOKEN_BUDGET'],
+                 symbol: str = CONFIG['SYMBOL'], structured_output: bool = CONFIG['LLM_STRUCTURED_OUTPUT'],
+                 streaming: bool = CONFIG['LLM_STREAMING']):
+        # Batches pace themselves with the token bucket and retries, so the latency SLO (hedging and degradation) is off
+        super().__init__(api_url, api_key, model=model, cache=cache, prompt_encoder=prompt_encoder, token_budget=token_budget,
+                         symbol=symbol, structured_output=structured_output, streaming=streaming, latency_budget=0, hedging=False)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self.retries = 0
+        # Client and semaphore per event loop: both are bound to the loop they were created on, and every
+        # asyncio.run() of a batch starts a new one
+        self._loop_state = weakref.WeakKeyDictionary()
+
+    def _for_running_loop(self) -> Tuple[AsyncOpenAI, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        state = self._loop_state.get(loop)
+        if state is None:
+            # Retries are handled here so they share the rate limiter and backoff policy
+            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            state = self._loop_state[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+        return state
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return self._for_running_loop()[0]
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        return self._for_running_loop()[1]
+
+    async def get_trading_decision_async(self, one_minute_data: CandleWindow, five_minute_data: CandleWindow, allowed_side: Optional[str] = None) -> str:
+        prompt = self._generate_prompt(one_minute_data, five_minute_data, allowed_side)
+        params = self._request_params(allowed_side)
+        if self.cache is None:
+            return await self._request_async(prompt, params, allowed_side)
+        return await self.cache.get_or_call_async(self.model, prompt, params, lambda: self._request_async(prompt, params, allowed_side))
+
+    async def _stream_async(self, prompt: str, params: Optional[Dict] = None, allowed_side: Optional[str] = None) -> str:
+        started = time.perf_counter()
+        first_token_at = None
+        parser = StreamingDecisionParser(allowed_side)
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **(params if params is not None else self.request_params)
+        )
+        try:
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if parser.feed(text) != STREAM_PENDING:
+                    break
+        finally:
+            await stream.close()
+        self._record_stream_timing(started, first_token_at, time.perf_counter(), parser)
+        return parser.response()
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+            return True
+        return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = None
+        if isinstance(error, openai.APIStatusError):
+            retry_after = error.response.headers.get('retry-after')
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _request_async(self, prompt: str, params: Optional[Dict] = None, allowed_side: Optional[str] = None) -> str:
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            try:
+                async with self.semaphore:
+                    if self.streaming:
+                        return await self._stream_async(prompt, params, allowed_side)
+                    response = await self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        stream=False,
+                        **(params if params is not None else self.request_params)
+                    )
+                return response.choices[0].message.content
+            except Exception as e:
+                if not self._is_retryable(e) or attempt >= self.max_retries:
+                    logger.error(f"OpenAI API request failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                logger.warning(f"OpenAI API request failed ({e}), retrying in {delay:.2f}s")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
@@ -0,0 +1,249 @@
+import json
+import re
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INSUFFICIENT_DATA_TEXT = "Insufficient data to make a trading decision"
+# Signal value the structured output uses for "insufficient data"
+NO_SIGNAL = 'none'
+
+_NUMBER = r'(-?[\d,]*\.?\d+)'
+# Price keys open a line (after markdown) or are a JSON key, so prices quoted in an explanation never match
+_KEY_START = r'(?:^|(?<="))[^\w\n]*?'
+_SIGNAL_PATTERN = re.compile(r'signal\W*?\s*[:=\-]\s*\W*?(buy|sell)\b', re.IGNORECASE)
+_STOP_LOSS_PATTERN = re.compile(_KEY_START + r'stop[\s_\-]*loss\W*?\s*[:=\-]\s*[^\d\-\n]*?' + _NUMBER, re.IGNORECASE | re.MULTILINE)
+_TAKE_PROFIT_PATTERN = re.compile(_KEY_START + r'take[\s_\-]*profit\W*?\s*[:=\-]\s*[^\d\-\n]*?' + _NUMBER, re.IGNORECASE | re.MULTILINE)
+# A JSON string (escapes included) or the rest of the line
+_EXPLANATION_PATTERN = re.compile(r'explanation\W*?\s*[:=\-]\s*\**\s*(?:"((?:[^"\\\n]|\\.)*)"|([^\n]+))', re.IGNORECASE)
+_JSON_OBJECT_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+# Value of a JSON explanation string, up to the end of the text while it is still being streamed
+_JSON_EXPLANATION_PATTERN = re.compile(r'"explanation"\s*:\s*"((?:[^"\\]|\\.)*)', re.IGNORECASE)
+
+
+def mask_explanation(text: str) -> str:
+    """The text with a JSON explanation's value blanked out, keeping every other field at its position."""
+    match = _JSON_EXPLANATION_PATTERN.search(text)
+    if match is None:
+        return text
+    start, end = match.span(1)
+    return text[:start] + ' ' * (end - start) + text[end:]
+
+
+def read_explanation(text: str) -> str:
+    match = _EXPLANATION_PATTERN.search(text)
+    if match is None:
+        return ''
+    if match.group(1) is not None:
+        try:
+            return json.loads(f'"{match.group(1)}"')
+        except ValueError:
+            return match.group(1)
+    return match.group(2).strip().strip('*').strip()
+
+
+def decision_response_format(allowed_side: Optional[str] = None) -> Dict:
+    """OpenAI json_schema response format mapping one-to-one onto TradingDecision."""
+    signals = [allowed_side] if allowed_side else ['buy', 'sell']
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': 'trading_decision',
+            'strict': True,
+            'schema': {
+                'type': 'object',
+                # Properties are generated in this order; the explanation comes before the prices so it has
+                # arrived when a streamed answer is cut off after them
+                'properties': {
+                    'signal': {'type': 'string', 'enum': signals + [NO_SIGNAL]},
+                    'explanation': {'type': 'string'},
+                    'stop_loss': {'type': ['number', 'null']},
+                    'take_profit': {'type': ['number', 'null']},
+                },
+                'required': ['signal', 'explanation', 'stop_loss', 'take_profit'],
+                'additionalProperties': False,
+            },
+        },
+    }
+
+
+class DecisionParser:
+    """
+    Turns an LLM answer into a decision dict. JSON (structured output, possibly wrapped in a code
+    fence) is read directly; anything else goes through tolerant regexes that accept markdown,
+    currency signs, thousands separators and a missing explanation.
+    """
+
+    def __init__(self):
+        self.responses = 0
+        self.json_parsed = 0
+        self.text_parsed = 0
+        self.insufficient = 0
+        self.failures = 0
+
+    def parse(self, response: str) -> Dict:
+        """Returns the decision dict, or {} when there is no usable decision."""
+        self.responses += 1
+        if response is None:
+            self.failures += 1
+            return {}
+
+        decision = self._parse_json(response)
+        if decision is not None:
+            if decision.get('signal') == NO_SIGNAL:
+                self.insufficient += 1
+                logger.info("LLM reported insufficient data for a decision")
+                return {}
+            if self._is_complete(decision):
+                self.json_parsed += 1
+                return decision
+
+        if INSUFFICIENT_DATA_TEXT.lower() in response.lower():
+            self.insufficient += 1
+            logger.info("LLM reported insufficient data for a decision")
+            return {}
+
+        decision = self._parse_text(response)
+        if self._is_complete(decision):
+            self.text_parsed += 1
+            return decision
+
+        self.failures += 1
+        logger.error("Incomplete decision data received from LLM")
+        return {}
+
+    @classmethod
+    def is_usable(cls, response: Optional[str], allowed_side: Optional[str] = None) -> bool:
+        """Whether parse() would return a decision on the allowed side, without counting the response."""
+        if not response:
+            return False
+        decision = cls._parse_json(response)
+        if decision is None or not cls._is_complete(decision):
+            if (decision is not None and decision.get('signal') == NO_SIGNAL) or INSUFFICIENT_DATA_TEXT.lower() in response.lower():
+                return False
+            decision = cls._parse_text(response)
+        return cls._is_complete(decision) and (allowed_side is None or decision['signal'] == allowed_side)
+
+    @staticmethod
+    def _parse_json(response: str) -> Optional[Dict]:
+        match = _JSON_OBJECT_PATTERN.search(response)
+        if match is None:
+            return None
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        decision = {'signal': str(data.get('signal', '')).strip().lower(), 'explanation': str(data.get('explanation') or '')}
+        for key in ['stop_loss', 'take_profit']:
+            value = data.get(key)
+            try:
+                decision[key] = float(str(value).replace(',', '').lstrip('$')) if value is not None else None
+            except ValueError:
+                decision[key] = None
+        return decision
+
+    @staticmethod
+    def _parse_text(response: str) -> Dict:
+        decision = {}
+        fields = mask_explanation(response)
+        signal = _SIGNAL_PATTERN.search(fields)
+        if signal:
+            decision['signal'] = signal.group(1).lower()
+        for key, pattern in [('stop_loss', _STOP_LOSS_PATTERN), ('take_profit', _TAKE_PROFIT_PATTERN)]:
+            match = pattern.search(fields)
+            if match:
+                decision[key] = float(match.group(1).replace(',', ''))
+        decision['explanation'] = read_explanation(response)
+        return decision
+
+    @staticmethod
+    def _is_complete(decision: Dict) -> bool:
+        return decision.get('signal') in ['buy', 'sell'] and all(isinstance(decision.get(key), float) for key in ['stop_loss', 'take_profit'])
+
+    def stats(self) -> Dict:
+        return {
+            'responses': self.responses,
+            'json_parsed': self.json_parsed,
+            'text_parsed': self.text_parsed,
+            'insufficient': self.insufficient,
+            'parse_failures': self.failures,
+            'parse_failure_rate': self.failures / self.responses if self.responses else 0.0,
+        }
+
+
+# Streamed fields only count once the next character shows the value has ended
+_STREAM_SIGNAL_PATTERN = re.compile(r'signal\W*?\s*[:=\-]\s*\W*?([a-z]+)(?=[^a-z])', re.IGNORECASE)
+_STREAM_NUMBER = r'(-?[\d,]*\.?\d+)(?=[^\d.,]|,\D)'
+_STREAM_PRICE_PATTERNS = {
+    'stop_loss': re.compile(_KEY_START + r'stop[\s_\-]*loss\W*?\s*[:=\-]\s*[^\d\-\n]*?' + _STREAM_NUMBER, re.IGNORECASE | re.MULTILINE),
+    'take_profit': re.compile(_KEY_START + r'take[\s_\-]*profit\W*?\s*[:=\-]\s*[^\d\-\n]*?' + _STREAM_NUMBER, re.IGNORECASE | re.MULTILINE),
+}
+
+STREAM_PENDING = 'pending'
+STREAM_COMPLETE = 'complete'
+STREAM_UNUSABLE = 'unusable'
+
+
+class StreamingDecisionParser:
+    """
+    Reads a streamed answer (JSON or the line format) chunk by chunk. The status becomes complete once
+    signal, stop loss and take profit have arrived, and unusable as soon as the answer is insufficient
+    data or a signal the signal gate ruled out.
+    """
+
+    def __init__(self, allowed_side: Optional[str] = None):
+        self.allowed_side = allowed_side
+        self.buffer = ''
+        self.decision = {}
+        self.status = STREAM_PENDING
+        self.reason = None
+
+    def feed(self, text: str) -> str:
+        if self.status == STREAM_PENDING and text:
+            self.buffer += text
+            self._evaluate()
+        return self.status
+
+    def _evaluate(self):
+        if INSUFFICIENT_DATA_TEXT.lower() in self.buffer.lower():
+            self._unusable('insufficient data')
+            return
+
+        fields = mask_explanation(self.buffer)
+        if 'signal' not in self.decision:
+            match = _STREAM_SIGNAL_PATTERN.search(fields)
+            if match:
+                signal = match.group(1).lower()
+                if signal not in ['buy', 'sell']:
+                    self._unusable(f"signal '{signal}'")
+                    return
+                if self.allowed_side is not None and signal != self.allowed_side:
+                    self._unusable(f"signal '{signal}' outside the admissible side '{self.allowed_side}'")
+                    return
+                self.decision['signal'] = signal
+
+        for key, pattern in _STREAM_PRICE_PATTERNS.items():
+            if key not in self.decision:
+                match = pattern.search(fields)
+                if match:
+                    self.decision[key] = float(match.group(1).replace(',', ''))
+
+        if all(key in self.decision for key in ['signal', 'stop_loss', 'take_profit']):
+            self.decision['explanation'] = read_explanation(self.buffer)
+            self.status = STREAM_COMPLETE
+
+    def _unusable(self, reason: str):
+        self.status = STREAM_UNUSABLE
+        self.reason = reason
+
+    def response(self) -> str:
+        """Answer text to hand on once streaming stopped: a normalized JSON decision, or the raw text if undecided."""
+        if self.status == STREAM_COMPLETE:
+            return json.dumps(self.decision)
+        if self.status == STREAM_UNUSABLE:
+            return json.dumps({'signal': NO_SIGNAL, 'stop_loss': None, 'take_profit': None, 'explanation': f"Aborted: {self.reason}"})
+        return self.buffer
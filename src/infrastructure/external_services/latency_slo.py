@@ -0,0 +1,74 @@
+import threading
+import logging
+from collections import deque
+from typing import Dict, Optional
+import numpy as np
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class LatencySLO:
+    """
+    Rolling LLM latency statistics against a per-decision latency budget. Request latencies set the
+    hedge delay (a percentile of how long single requests take); decision latencies, including any
+    hedge, drive the degradation level: 0 is normal, each level above trades quality for speed.
+    The level goes up while the rolling p95 is over budget and back down once it is well under it.
+    """
+
+    def __init__(self, budget: float = CONFIG['LLM_LATENCY_BUDGET'], hedge_percentile: float = CONFIG['LLM_HEDGE_PERCENTILE'],
+                 default_hedge_delay: float = CONFIG['LLM_HEDGE_DEFAULT_DELAY'], max_level: int = 1,
+                 window: int = 200, min_samples: int = 20, recover_ratio: float = 0.6):
+        self.budget = budget
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.max_level = max_level
+        self.min_samples = min_samples
+        self.recover_ratio = recover_ratio
+        self.level = 0
+        self.level_changes = 0
+        self._request_latencies = deque(maxlen=window)
+        self._decision_latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe_request(self, latency: float):
+        with self._lock:
+            self._request_latencies.append(latency)
+
+    def observe_decision(self, latency: float) -> Optional[int]:
+        """Records a decision latency and returns the new level if it changed."""
+        with self._lock:
+            self._decision_latencies.append(latency)
+            if len(self._decision_latencies) < self.min_samples:
+                return None
+            p95 = float(np.percentile(self._decision_latencies, 95))
+            if p95 > self.budget and self.level < self.max_level:
+                self.level += 1
+            elif p95 < self.budget * self.recover_ratio and self.level > 0:
+                self.level -= 1
+            else:
+                return None
+            # The new level is judged on its own latencies
+            self._decision_latencies.clear()
+            self.level_changes += 1
+            logger.warning(f"LLM decision p95 {p95:.2f}s against a {self.budget:.2f}s budget, degradation level now {self.level}")
+            return self.level
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self._request_latencies) < self.min_samples:
+                return self.default_hedge_delay
+            return float(np.percentile(self._request_latencies, self.hedge_percentile))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            decisions = np.array(self._decision_latencies) * 1000
+            return {
+                'level': self.level,
+                'level_changes': self.level_changes,
+                'hedge_delay_ms': (float(np.percentile(self._request_latencies, self.hedge_percentile)) * 1000
+                                   if len(self._request_latencies) >= self.min_samples else self.default_hedge_delay * 1000),
+                'decision_p50_ms': float(np.percentile(decisions, 50)) if len(decisions) else None,
+                'decision_p95_ms': float(np.percentile(decisions, 95)) if len(decisions) else None,
+                'decision_p99_ms': float(np.percentile(decisions, 99)) if len(decisions) else None,
+            }
@@ -1,60 +1,356 @@
 import requests
 import logging
-from typing import List, Dict
+import textwrap
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
 from config.settings import CONFIG
 from openai import OpenAI
+from src.infrastructure.external_services.decision_parser import STREAM_PENDING, DecisionParser, StreamingDecisionParser, decision_response_format
+from src.infrastructure.external_services.latency_slo import LatencySLO
+from src.infrastructure.external_services.llm_response_cache import LLMResponseCache
+from src.infrastructure.external_services.prompt_encoder import CandleWindow, PromptEncoder, count_tokens, create_prompt_encoder, to_window
+from src.infrastructure.monitoring.metrics import METRICS, Metrics
 
 logger = logging.getLogger(__name__)
 
+# Smallest candle window the token budget may shrink a prompt to
+MIN_PROMPT_CANDLES = 10
+
+PROMPT_TEMPLATE = textwrap.dedent("""
+    Analyze the {symbol} data provided for 1-minute and 5-minute timeframes.
+
+    1-minute chart data (last {one_minute_count} candles{format_description}):
+    {one_minute_data}
+
+    5-minute chart data (last {five_minute_count} candles{format_description}):
+    {five_minute_data}
+
+    Based on this data, provide ONE precise trading decision following these rules:
+
+    1. {signal_rule}
+    2. Stop Loss and Take Profit must be specific numerical values.
+    3. For 'buy': Stop Loss < current price < Take Profit
+    4. For 'sell': Take Profit < current price < Stop Loss
+    5. Stop Loss should be at least 1 ATR away from the current price.
+    6. The decision should align with the overall trend visible in both timeframes.
+    7. Consider recent price action, key technical indicators, and significant support/resistance levels.
+
+    {answer_format}
+
+    Your strict adherence to these guidelines is crucial for accurate trading decisions.
+""").strip()
+
+TEXT_ANSWER_FORMAT = textwrap.dedent("""
+    Provide your decision in this exact format:
+
+    Signal: [{signal_choices}]
+    Explanation: [1-2 sentences explaining the primary reason for the decision]
+    Stop Loss: [exact price]
+    Take Profit: [exact price]
+
+    If the data is insufficient or unclear, respond only with: "Insufficient data to make a trading decision."
+""").strip()
+
+JSON_ANSWER_FORMAT = textwrap.dedent("""
+    Answer with a JSON object: signal ({signal_choices}), explanation (1-2 sentences explaining the primary
+    reason for the decision), then stop_loss and take_profit as exact prices.
+
+    If the data is insufficient or unclear, set signal to "none" and both prices to null.
+""").strip()
+
 class LLMApiClient:
-    def __init__(self, api_url: str, api_key: str):
+    def __init__(self, api_url: str, api_key: str, model: str = CONFIG['LLM_MODEL'], cache: Optional[LLMResponseCache] = None,
+                 prompt_encoder: Optional[PromptEncoder] = None, token_budget: Optional[int] = CONFIG['PROMPT_TOKEN_BUDGET'],
+                 symbol: str = CONFIG['SYMBOL'], structured_output: bool = CONFIG['LLM_STRUCTURED_OUTPUT'],
+                 streaming: bool = CONFIG['LLM_STREAMING'], latency_budget: float = CONFIG['LLM_LATENCY_BUDGET'],
+                 hedging: bool = CONFIG['LLM_HEDGING'], hedge_model: Optional[str] = CONFIG['LLM_HEDGE_MODEL'],
+                 hedge_api_url: Optional[str] = CONFIG['LLM_HEDGE_API_URL'], fallback_model: Optional[str] = CONFIG['LLM_FALLBACK_MODEL'],
+                 degraded_candles: int = CONFIG['LLM_DEGRADED_CANDLES'], metrics: Optional[Metrics] = None):
         self.api_url = api_url
         self.api_key = api_key
-        self.client = OpenAI(api_key=self.api_key)
+        # The OpenAI SDK appends the endpoint path itself, so strip it from the configured URL
+        self.base_url = self._base_url(api_url)
+        self.model = model
+        self.symbol = symbol
+        self.cache = cache
+        self.metrics = metrics or METRICS
+        self.prompt_encoder = prompt_encoder or create_prompt_encoder()
+        self.token_budget = token_budget
+        self.last_prompt_tokens = None
+        # Ask for JSON matching TradingDecision instead of free text, for models that support json_schema output
+        self.structured_output = structured_output
+        # Stream answers and stop reading as soon as the decision is known
+        self.streaming = streaming
+        self.stream_timings = deque(maxlen=1000)
+        self.request_params = {}
+        self._client = None
+
+        # Latency budget: hedge slow requests and degrade (smaller window, then fallback model) while p95 is over budget
+        self.hedging = hedging
+        self.hedge_model = hedge_model
+        self.hedge_base_url = self._base_url(hedge_api_url) if hedge_api_url else None
+        self.fallback_model = fallback_model
+        self.degraded_candles = degraded_candles
+        self.latency_slo = LatencySLO(latency_budget, max_level=2 if fallback_model else 1) if latency_budget else None
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._hedge_client = None
+        self._executor = None
+
+    @staticmethod
+    def _base_url(api_url: str) -> str:
+        return api_url[:-len('/chat/completions')] if api_url.endswith('/chat/completions') else api_url
+
+    @property
+    def client(self) -> OpenAI:
+        # Created on first use so replay-only runs work without credentials
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    @property
+    def hedge_client(self) -> OpenAI:
+        if self.hedge_base_url is None:
+            return self.client
+        if self._hedge_client is None:
+            self._hedge_client = OpenAI(api_key=self.api_key, base_url=self.hedge_base_url)
+        return self._hedge_client
+
+    @property
+    def degradation_level(self) -> int:
+        return self.latency_slo.level if self.latency_slo is not None else 0
 
-    def get_trading_decision(self, one_minute_data: List[Dict], five_minute_data: List[Dict]) -> str:
-        prompt = self._generate_prompt(one_minute_data, five_minute_data)
+    @property
+    def active_model(self) -> str:
+        if self.degradation_level >= 2 and self.fallback_model:
+            return self.fallback_model
+        return self.model
+
+    def prompt_columns(self) -> Optional[List[str]]:
+        """Candle and indicator columns the prompt shows, None for all of them."""
+        return self.prompt_encoder.columns
+
+    def get_trading_decision(self, one_minute_data: CandleWindow, five_minute_data: CandleWindow, allowed_side: Optional[str] = None) -> str:
+        with self.metrics.timer('trading_stage_seconds', stage='prompt', symbol=self.symbol):
+            prompt = self._generate_prompt(one_minute_data, five_minute_data, allowed_side)
+        params = self._request_params(allowed_side)
+        with self.metrics.timer('trading_stage_seconds', stage='llm_call', symbol=self.symbol):
+            if self.cache is None:
+                return self._request(prompt, params, allowed_side)[0]
+            response = self.cache.lookup(self.active_model, prompt, params)
+            if response is None:
+                # A hedge answered by another model is cached under that model, not the one asked
+                response, answered_by = self._request(prompt, params, allowed_side)
+                self.cache.store(answered_by, prompt, params, response)
+            return response
+
+    def _request_params(self, allowed_side: Optional[str] = None) -> Dict:
+        if not self.structured_output:
+            return self.request_params
+        return {'response_format': decision_response_format(allowed_side), **self.request_params}
+
+    def _request(self, prompt: str, params: Optional[Dict] = None, allowed_side: Optional[str] = None) -> Tuple[str, str]:
+        """The answer and the model that gave it."""
+        model = self.active_model
+        if self.latency_slo is None:
+            return self._call_model(self.client, model, prompt, params, allowed_side), model
+
+        started = time.perf_counter()
+        if self.hedging:
+            response, model = self._request_hedged(prompt, params, allowed_side)
+        else:
+            response = self._timed_call(self.client, model, prompt, params, allowed_side)
+        self.latency_slo.observe_decision(time.perf_counter() - started)
+        return response, model
+
+    def _request_hedged(self, prompt: str, params: Optional[Dict], allowed_side: Optional[str]) -> Tuple[str, str]:
+        # Send a duplicate once the first request is slower than the hedge percentile and keep the first valid reply
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='llm-hedge')
+        model = self.active_model
+        cancels = {}
+        models = {}
+
+        def submit(client: OpenAI, request_model: str):
+            cancel = threading.Event()
+            future = self._executor.submit(self._timed_call, client, request_model, prompt, params, allowed_side, cancel)
+            cancels[future] = cancel
+            models[future] = request_model
+            return future
+
+        primary = submit(self.client, model)
+        done, _ = wait([primary], timeout=self.latency_slo.hedge_delay())
+        if primary in done and primary.exception() is None and primary.result():
+            return primary.result(), model
+
+        self.hedges += 1
+        hedge_model = self.hedge_model or model
+        logger.info(f"Hedging LLM request to {hedge_model} after {self.latency_slo.hedge_delay():.2f}s")
+        hedge = submit(self.hedge_client, hedge_model)
+        pending = {primary, hedge}
+        error = None
+        fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                response = future.result()
+                if DecisionParser.is_usable(response, allowed_side):
+                    # The slower request stops at its next chunk, which closes its stream
+                    for other in pending:
+                        cancels[other].set()
+                        other.cancel()
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    return response, models[future]
+                # An unusable answer only counts when the other request has nothing better
+                if response and fallback is None:
+                    fallback = (response, models[future])
+        if fallback:
+            return fallback
+        raise error or Exception("Both hedged LLM requests returned an empty answer")
+
+    def _timed_call(self, client: OpenAI, model: str, prompt: str, params: Optional[Dict], allowed_side: Optional[str],
+                    cancel: Optional[threading.Event] = None) -> str:
+        started = time.perf_counter()
+        if cancel is None:
+            response = self._call_model(client, model, prompt, params, allowed_side)
+        else:
+            # Hedged requests always stream, so the losing one can be dropped mid-answer
+            response = self._request_streaming(prompt, params, allowed_side, client, model, cancel)
+        if cancel is None or not cancel.is_set():
+            self.latency_slo.observe_request(time.perf_counter() - started)
+        return response
+
+    def _call_model(self, client: OpenAI, model: str, prompt: str, params: Optional[Dict] = None, allowed_side: Optional[str] = None) -> str:
+        if self.streaming:
+            return self._request_streaming(prompt, params, allowed_side, client, model)
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = client.chat.completions.create(
+                model=model,
                 messages=[{"role": "user", "content": prompt}],
-                stream=False
+                stream=False,
+                **(params if params is not None else self.request_params)
             )
             return response.choices[0].message.content
 
         except Exception as e:
             logger.error(f"OpenAI API request failed: {e}")
+            self.metrics.inc('llm_request_errors_total', symbol=self.symbol, model=model)
             raise
 
-    def _generate_prompt(self, one_minute_data: List[Dict], five_minute_data: List[Dict]) -> str:
-        prompt = f"""
-        Analyze the {CONFIG['SYMBOL']} data provided for 1-minute and 5-minute timeframes.
-
-        1-minute chart data (last 50 candles):
-        {one_minute_data}
+    def _request_streaming(self, prompt: str, params: Optional[Dict] = None, allowed_side: Optional[str] = None,
+                           client: Optional[OpenAI] = None, model: Optional[str] = None, cancel: Optional[threading.Event] = None) -> str:
+        started = time.perf_counter()
+        first_token_at = None
+        parser = StreamingDecisionParser(allowed_side)
+        try:
+            stream = (client or self.client).chat.completions.create(
+                model=model or self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                **(params if params is not None else self.request_params)
+            )
+            try:
+                for chunk in stream:
+                    if cancel is not None and cancel.is_set():
+                        return parser.response()
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    if parser.feed(text) != STREAM_PENDING:
+                        break
+            finally:
+                # Closing the response cancels the rest of the generation when we stopped early
+                stream.close()
+        except Exception as e:
+            logger.error(f"OpenAI API streaming request failed: {e}")
+            self.metrics.inc('llm_request_errors_total', symbol=self.symbol, model=model or self.model)
+            raise
 
-        5-minute chart data (last 50 candles):
-        {five_minute_data}
+        self._record_stream_timing(started, first_token_at, time.perf_counter(), parser)
+        return parser.response()
 
-        Based on this data, provide ONE precise trading decision following these rules:
+    def _record_stream_timing(self, started: float, first_token_at: Optional[float], decided_at: float, parser: StreamingDecisionParser):
+        timing = {
+            'ttft': first_token_at - started if first_token_at is not None else None,
+            'time_to_decision': decided_at - started,
+            'status': parser.status,
+            'reason': parser.reason,
+        }
+        self.stream_timings.append(timing)
+        logger.debug(f"LLM stream: {timing}")
 
-        1. Signal must be either 'buy' or 'sell'.
-        2. Stop Loss and Take Profit must be specific numerical values.
-        3. For 'buy': Stop Loss < current price < Take Profit
-        4. For 'sell': Take Profit < current price < Stop Loss
-        5. Stop Loss should be at least 1 ATR away from the current price.
-        6. The decision should align with the overall trend visible in both timeframes.
-        7. Consider recent price action, key technical indicators, and significant support/resistance levels.
+    def streaming_stats(self) -> Dict:
+        timings = list(self.stream_timings)
+        if not timings:
+            return {'calls': 0}
+        ttft = np.array([t['ttft'] for t in timings if t['ttft'] is not None]) * 1000
+        decision = np.array([t['time_to_decision'] for t in timings]) * 1000
+        statuses = [t['status'] for t in timings]
+        return {
+            'calls': len(timings),
+            'complete_early': statuses.count('complete'),
+            'aborted': statuses.count('unusable'),
+            'ttft_p50_ms': float(np.percentile(ttft, 50)) if len(ttft) else None,
+            'ttft_p95_ms': float(np.percentile(ttft, 95)) if len(ttft) else None,
+            'time_to_decision_p50_ms': float(np.percentile(decision, 50)),
+            'time_to_decision_p95_ms': float(np.percentile(decision, 95)),
+        }
 
-        Provide your decision in this exact format:
+    def _generate_prompt(self, one_minute_data: CandleWindow, five_minute_data: CandleWindow, allowed_side: Optional[str] = None) -> str:
+        one_minute_data, five_minute_data = to_window(one_minute_data), to_window(five_minute_data)
+        if self.degradation_level >= 1:
+            one_minute_data, five_minute_data = one_minute_data.tail(self.degraded_candles), five_minute_data.tail(self.degraded_candles)
+        prompt = self._render_prompt(one_minute_data, five_minute_data, allowed_side)
+        tokens = count_tokens(prompt, self.model)
 
-        Signal: [buy/sell]
-        Stop Loss: [exact price]
-        Take Profit: [exact price]
-        Explanation: [1-2 sentences explaining the primary reason for the decision]
+        if self.token_budget and tokens > self.token_budget:
+            # Largest window (same number of candles per timeframe) that fits the budget
+            low, high = MIN_PROMPT_CANDLES, max(len(one_minute_data), len(five_minute_data)) - 1
+            fitted = None
+            while low <= high:
+                candles = (low + high) // 2
+                candidate = self._render_prompt(one_minute_data.tail(candles), five_minute_data.tail(candles), allowed_side)
+                candidate_tokens = count_tokens(candidate, self.model)
+                if candidate_tokens <= self.token_budget:
+                    fitted = (candidate, candidate_tokens)
+                    low = candles + 1
+                else:
+                    high = candles - 1
+            if fitted is None:
+                logger.warning(f"Prompt exceeds the {self.token_budget} token budget even with {MIN_PROMPT_CANDLES} candles")
+                smallest = self._render_prompt(one_minute_data.tail(MIN_PROMPT_CANDLES), five_minute_data.tail(MIN_PROMPT_CANDLES), allowed_side)
+                fitted = (smallest, count_tokens(smallest, self.model))
+            prompt, tokens = fitted
 
-        If the data is insufficient or unclear, respond only with: "Insufficient data to make a trading decision."
+        self.last_prompt_tokens = tokens
+        logger.debug(f"Prompt size: {tokens} tokens")
+        return prompt
 
-        Your strict adherence to these guidelines is crucial for accurate trading decisions.
-        """
-        return prompt
\ No newline at end of file
+    def _render_prompt(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame, allowed_side: Optional[str] = None) -> str:
+        description = self.prompt_encoder.description
+        if allowed_side is None:
+            signal_rule, signal_choices = "Signal must be either 'buy' or 'sell'.", 'buy/sell'
+        else:
+            signal_rule, signal_choices = f"Signal must be '{allowed_side}', the trend filter rules out the other side.", allowed_side
+        answer_format = JSON_ANSWER_FORMAT if self.structured_output else TEXT_ANSWER_FORMAT
+        return PROMPT_TEMPLATE.format(
+            symbol=self.symbol,
+            signal_rule=signal_rule,
+            answer_format=answer_format.format(signal_choices=signal_choices),
+            one_minute_count=len(one_minute_data),
+            five_minute_count=len(five_minute_data),
+            format_description=f", {description}" if description else '',
+            one_minute_data=self.prompt_encoder.encode(one_minute_data),
+            five_minute_data=self.prompt_encoder.encode(five_minute_data),
+        )
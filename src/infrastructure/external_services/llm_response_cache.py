@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODE_READ_THROUGH = 'read_through'  # serve hits from disk, call the API on misses and store the answer
+CACHE_MODE_RECORD_ONLY = 'record_only'    # always call the API and store every answer
+CACHE_MODE_REPLAY_ONLY = 'replay_only'    # never call the API, misses raise CacheMissError
+CACHE_MODES = [CACHE_MODE_READ_THROUGH, CACHE_MODE_RECORD_ONLY, CACHE_MODE_REPLAY_ONLY]
+
+
+class CacheMissError(Exception):
+    pass
+
+
+class LLMResponseCache:
+    """
+    Disk-backed LLM response cache keyed by a SHA-256 of (model, prompt, request parameters).
+    Entries live in a SQLite file and the least recently used ones are evicted past max_bytes.
+    """
+
+    def __init__(self, path: str = CONFIG['LLM_CACHE_PATH'], max_bytes: int = CONFIG['LLM_CACHE_MAX_BYTES'], mode: str = CONFIG['LLM_CACHE_MODE']):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}. Expected one of {CACHE_MODES}")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, last_access INTEGER NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._connection.commit()
+        self.total_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Dict) -> str:
+        payload = json.dumps({'model': model, 'prompt': prompt, 'params': params}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time_ns(), key))
+            self._connection.commit()
+            return row[0]
+
+    def put(self, key: str, response: str):
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            previous = self._connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time_ns()),
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            row = self._connection.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+
+    def _lookup(self, key: str) -> Optional[str]:
+        if self.mode == CACHE_MODE_RECORD_ONLY:
+            with self._lock:
+                self.misses += 1
+            return None
+        response = self.get(key)
+        if response is None and self.mode == CACHE_MODE_REPLAY_ONLY:
+            raise CacheMissError(f"No cached LLM response for key {key[:12]} in replay-only mode")
+        return response
+
+    def lookup(self, model: str, prompt: str, params: Dict) -> Optional[str]:
+        return self._lookup(self.make_key(model, prompt, params))
+
+    def store(self, model: str, prompt: str, params: Dict, response: Optional[str]):
+        if response is not None:
+            self.put(self.make_key(model, prompt, params), response)
+
+    def get_or_call(self, model: str, prompt: str, params: Dict, call: Callable[[], str]) -> str:
+        response = self.lookup(model, prompt, params)
+        if response is not None:
+            return response
+
+        response = call()
+        self.store(model, prompt, params, response)
+        return response
+
+    async def get_or_call_async(self, model: str, prompt: str, params: Dict, call: Callable[[], Awaitable[str]]) -> str:
+        response = self.lookup(model, prompt, params)
+        if response is not None:
+            return response
+
+        response = await call()
+        self.store(model, prompt, params, response)
+        return response
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'mode': self.mode,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes': self.total_bytes,
+        }
+
+
+def create_llm_response_cache(mode: str = CONFIG['LLM_CACHE_MODE']) -> Optional[LLMResponseCache]:
+    if mode == 'off':
+        return None
+    return LLMResponseCache(CONFIG['LLM_CACHE_PATH'], CONFIG['LLM_CACHE_MAX_BYTES'], mode)
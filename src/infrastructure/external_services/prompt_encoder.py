@@ -0,0 +1,135 @@
+import math
+import logging
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+from config.settings import CONFIG
+from src.domain.entities.candle_series import CandleSeries
+
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a character based estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+CandleWindow = Union[CandleSeries, pd.DataFrame, List[Dict]]
+
+DEFAULT_COLUMNS = [
+    'time', 'open', 'high', 'low', 'close', 'tick_volume',
+    'SMA_20', 'EMA_50', 'RSI', 'MACD', 'Signal_Line', 'BB_Upper', 'BB_Lower', 'ATR', 'ADX', '%K', '%D',
+]
+# Columns expressed in price units, which can be written as offsets from the last close
+PRICE_COLUMNS = {'open', 'high', 'low', 'close', 'SMA_20', 'EMA_50', 'BB_Middle', 'BB_Upper', 'BB_Lower'}
+# Quote columns the price precision is read from
+QUOTE_COLUMNS = ['open', 'high', 'low', 'close']
+MAX_PRICE_DECIMALS = 8
+
+
+def count_tokens(text: str, model: str = CONFIG['LLM_MODEL']) -> int:
+    if tiktoken is not None:
+        try:
+            return len(tiktoken.encoding_for_model(model).encode(text))
+        except KeyError:
+            return len(tiktoken.get_encoding('cl100k_base').encode(text))
+    # Roughly four characters per token for English text and numbers
+    return math.ceil(len(text) / 4)
+
+
+def price_decimals(prices: np.ndarray) -> int:
+    """Fewest decimals that write every quote exactly: the symbol's digits, 5 for EURUSD, 2 for BTCUSD."""
+    prices = np.asarray(prices, dtype=np.float64)
+    prices = prices[np.isfinite(prices)]
+    tolerance = 1e-9 * np.maximum(np.abs(prices), 1.0)
+    for decimals in range(MAX_PRICE_DECIMALS):
+        if np.all(np.abs(np.round(prices, decimals) - prices) <= tolerance):
+            return decimals
+    return MAX_PRICE_DECIMALS
+
+
+def to_window(data: CandleWindow) -> Union[CandleSeries, pd.DataFrame]:
+    # Lists of row dicts are the only form without columns and tail()
+    return pd.DataFrame.from_records(data) if isinstance(data, list) else data
+
+
+class PromptEncoder:
+    description = ''
+    # Columns the encoding reads, None for all of them
+    columns: Optional[List[str]] = None
+
+    def encode(self, data: Union[CandleSeries, pd.DataFrame]) -> str:
+        raise NotImplementedError
+
+
+class RecordsPromptEncoder(PromptEncoder):
+    """The original encoding: the Python repr of one dict per candle with every column."""
+
+    def encode(self, data: Union[CandleSeries, pd.DataFrame]) -> str:
+        records = data.to_records() if isinstance(data, CandleSeries) else data.to_dict(orient='records')
+        return str(records)
+
+
+class CompactTablePromptEncoder(PromptEncoder):
+    """
+    Comma separated table: header once, selected columns only. Price columns are written with the
+    quotes' own decimals (or a fixed `precision`), other indicators with `significant_digits` so small
+    values such as an FX ATR never round to zero. With relative_prices, price columns are written as
+    offsets from the last close, which is stated once above the table.
+    """
+
+    def __init__(self, columns: List[str] = None, precision: Optional[int] = CONFIG['PROMPT_PRECISION'],
+                 significant_digits: int = CONFIG['PROMPT_SIGNIFICANT_DIGITS'], relative_prices: bool = CONFIG['PROMPT_RELATIVE_PRICES']):
+        self.columns = columns or DEFAULT_COLUMNS
+        self.precision = precision
+        self.significant_digits = significant_digits
+        self.relative_prices = relative_prices
+
+    @property
+    def description(self) -> str:
+        if self.relative_prices:
+            return "CSV, oldest first; price columns are offsets from the last close"
+        return "CSV, oldest first"
+
+    def encode(self, data: Union[CandleSeries, pd.DataFrame]) -> str:
+        columns = [column for column in self.columns if column in data.columns]
+        last_close = float(np.asarray(data['close'])[-1]) if len(data) else 0.0
+        precision = self.precision
+        if precision is None:
+            quotes = [np.asarray(data[column]) for column in QUOTE_COLUMNS if column in data.columns]
+            precision = price_decimals(np.concatenate(quotes)) if quotes else MAX_PRICE_DECIMALS
+        lines = []
+        if self.relative_prices:
+            lines.append(f"last_close={last_close:.{precision}f}")
+        lines.append(','.join(columns))
+
+        formatted = {}
+        for column in columns:
+            values = data[column]
+            if column == 'time':
+                formatted[column] = pd.DatetimeIndex(values).strftime('%m-%d %H:%M').tolist()
+            elif column in PRICE_COLUMNS:
+                offset = last_close if self.relative_prices else 0.0
+                sign = '+' if self.relative_prices else ''
+                formatted[column] = [self._number(value - offset, f'{sign}.{precision}f') for value in values.tolist()]
+            elif pd.api.types.is_integer_dtype(values):
+                formatted[column] = [str(value) for value in values.tolist()]
+            else:
+                formatted[column] = [self._number(value, f'.{self.significant_digits}g') for value in values.tolist()]
+
+        for row in zip(*(formatted[column] for column in columns)):
+            lines.append(','.join(row))
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _number(value: float, number_format: str) -> str:
+        if value != value:
+            return ''
+        return format(value, number_format)
+
+
+def create_prompt_encoder(encoding: str = CONFIG['PROMPT_ENCODING']) -> PromptEncoder:
+    if encoding == 'records':
+        return RecordsPromptEncoder()
+    if encoding == 'compact':
+        return CompactTablePromptEncoder()
+    raise ValueError(f"Unknown prompt encoding: {encoding}")
@@ -0,0 +1,52 @@
+import json
+import os
+import logging
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.external_services.prompt_encoder import CandleWindow
+
+logger = logging.getLogger(__name__)
+
+INSUFFICIENT_DATA_RESPONSE = "Insufficient data to make a trading decision."
+
+class RecordedLLMApiClient:
+    """
+    Replays LLM responses from a JSON-lines file keyed by the time of the last 1-minute candle.
+    With a fallback client, missing responses are requested live and appended to the file.
+    """
+
+    def __init__(self, responses_path: str, fallback: Optional[LLMApiClient] = None):
+        self.responses_path = responses_path
+        self.fallback = fallback
+        self.responses = {}
+        if os.path.exists(responses_path):
+            with open(responses_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record['time']] = record['response']
+        logger.info(f"Loaded {len(self.responses)} recorded LLM responses from {responses_path}")
+
+    def prompt_columns(self) -> Optional[List[str]]:
+        # Replayed answers need no prompt, only the fallback builds one
+        return self.fallback.prompt_columns() if self.fallback is not None else []
+
+    @staticmethod
+    def _key(one_minute_data: CandleWindow) -> str:
+        last_time = one_minute_data[-1]['time'] if isinstance(one_minute_data, list) else np.asarray(one_minute_data['time'])[-1]
+        return pd.Timestamp(last_time).isoformat()
+
+    def get_trading_decision(self, one_minute_data: CandleWindow, five_minute_data: CandleWindow, allowed_side: Optional[str] = None) -> str:
+        key = self._key(one_minute_data)
+        if key in self.responses:
+            return self.responses[key]
+        if self.fallback is None:
+            return INSUFFICIENT_DATA_RESPONSE
+
+        response = self.fallback.get_trading_decision(one_minute_data, five_minute_data, allowed_side)
+        self.responses[key] = response
+        with open(self.responses_path, 'a') as f:
+            f.write(json.dumps({'time': key, 'response': response}) + '\n')
+        return response
@@ -0,0 +1,228 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.infrastructure.indicators.incremental_indicator_engine import INDICATOR_COLUMNS
+
+# Bars per pass of the rolling kernels, bounds the temporaries to symbols x CHUNK x window
+CHUNK = 4096
+# Bars per matrix product of the EWM kernel
+EWM_BLOCK = 256
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'tick_volume', 'real_volume']
+
+
+def stack_frames(frames: Dict[str, pd.DataFrame]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    (symbols x bars) float64 matrices of the OHLCV columns. Histories of different lengths are aligned
+    on their last bar and padded with NaN in front.
+    """
+    symbols = list(frames)
+    bars = max((len(frame) for frame in frames.values()), default=0)
+    ohlcv = {column: np.full((len(symbols), bars), np.nan) for column in OHLCV_COLUMNS}
+    for row, symbol in enumerate(symbols):
+        frame = frames[symbol]
+        for column in OHLCV_COLUMNS:
+            ohlcv[column][row, bars - len(frame):] = frame[column].to_numpy(dtype=np.float64)
+    return symbols, ohlcv
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    shifted = np.full_like(values, np.nan)
+    shifted[:, periods:] = values[:, :-periods]
+    return shifted
+
+
+def _window_sums(segment: np.ndarray, window: int) -> np.ndarray:
+    # Sums of every full window in the segment, NaN where a window contains a NaN
+    missing = np.isnan(segment)
+    sums = np.cumsum(np.where(missing, 0.0, segment), axis=1)
+    sums[:, window:] -= sums[:, :-window].copy()
+    gaps = np.cumsum(missing, axis=1)
+    gaps[:, window:] -= gaps[:, :-window].copy()
+    sums = sums[:, window - 1:]
+    sums[gaps[:, window - 1:] > 0] = np.nan
+    return sums
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sum along bars, NaN unless the window holds `window` non-NaN values (pandas min_periods=window)."""
+    out = np.full(values.shape, np.nan)
+    # Cumulative sums restart every chunk so rounding error cannot build up over long histories
+    for start in range(window - 1, values.shape[1], CHUNK):
+        stop = min(start + CHUNK, values.shape[1])
+        out[:, start:stop] = _window_sums(values[:, start - window + 1:stop], window)
+    return out
+
+
+def _rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling sample standard deviation from sums of values taken relative to a per-chunk reference."""
+    out = np.full(values.shape, np.nan)
+    for start in range(window - 1, values.shape[1], CHUNK):
+        stop = min(start + CHUNK, values.shape[1])
+        segment = values[:, start - window + 1:stop]
+        reference = segment[:, -1:]
+        deviations = segment - np.where(np.isnan(reference), 0.0, reference)
+        sums = _window_sums(np.vstack([deviations, deviations * deviations]), window)
+        total, total_sq = sums[:len(values)], sums[len(values):]
+        variance = (total_sq - total * total / window) / (window - 1)
+        out[:, start:stop] = np.sqrt(np.maximum(variance, 0.0))
+    # Windows of one repeated value are exactly 0 as in pandas, not the rounding left by the sums
+    repeated = np.full(values.shape, np.nan)
+    repeated[:, 1:] = values[:, 1:] == values[:, :-1]
+    out[_rolling_sum(repeated, window - 1) == window - 1] = 0.0
+    return out
+
+
+def _rolling_extreme(values: np.ndarray, window: int, function) -> np.ndarray:
+    """Rolling max or min (function is np.maximum or np.minimum) by doubling the span, O(log window) passes."""
+    span, result = 1, values
+    while span * 2 <= window:
+        shifted = np.full_like(result, np.nan)
+        shifted[:, span:] = result[:, :-span]
+        result = function(result, shifted)
+        span *= 2
+    out = np.full_like(values, np.nan)
+    rest = window - span
+    if rest:
+        out[:, window - 1:] = function(result[:, window - 1:], result[:, window - 1 - rest:values.shape[1] - rest])
+    else:
+        out[:, window - 1:] = result[:, window - 1:]
+    return out
+
+
+def _ewm(values: np.ndarray, span: int) -> np.ndarray:
+    """pandas ewm(span, adjust=False).mean() along bars, as blocked matrix products instead of a loop per bar."""
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    symbols, bars = values.shape
+    out = np.full((symbols, bars), np.nan)
+    valid = ~np.isnan(values)
+    has_valid = valid.any(axis=1)
+    first = np.where(has_valid, valid.argmax(axis=1), bars)
+    # Leading NaNs take the first value, so the average starts there exactly as in pandas
+    seed = values[np.arange(symbols), np.minimum(first, bars - 1)]
+    filled = np.where(np.arange(bars)[None, :] < first[:, None], seed[:, None], values)
+
+    lags = np.arange(EWM_BLOCK)
+    exponents = lags[:, None] - lags[None, :]
+    weights = np.where(exponents >= 0, alpha * decay ** np.maximum(exponents, 0), 0.0)
+    carry = decay ** (lags + 1)
+    previous = seed
+    for start in range(0, bars, EWM_BLOCK):
+        stop = min(start + EWM_BLOCK, bars)
+        size = stop - start
+        block = filled[:, start:stop] @ weights[:size, :size].T + previous[:, None] * carry[None, :size]
+        out[:, start:stop] = block
+        previous = block[:, -1]
+    out[np.arange(bars)[None, :] < first[:, None]] = np.nan
+    return out
+
+
+def batch_indicators(ohlcv: Dict[str, np.ndarray], columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    add_technical_indicators for many symbols at once: every input is a (symbols x bars) matrix and so is
+    every output. Intermediates shared between indicators (close delta, true range, SMA_20) are computed
+    once, and rolling sums of the same window run as one pass over stacked rows.
+    """
+    wanted = set(INDICATOR_COLUMNS if columns is None else columns)
+    close, high, low = ohlcv['close'], ohlcv['high'], ohlcv['low']
+    symbols = close.shape[0]
+    out = {}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        previous_close = _shift(close, 1)
+        delta = close - previous_close
+        padding = np.isnan(close)
+
+        if 'returns' in wanted:
+            out['returns'] = close / previous_close - 1
+
+        if wanted & {'SMA_20', 'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower', 'BB_Width'}:
+            sma_20 = _rolling_sum(close, 20) / 20
+            out['SMA_20'] = sma_20
+            out['BB_Middle'] = sma_20
+        if 'EMA_50' in wanted:
+            out['EMA_50'] = _ewm(close, 50)
+
+        if 'RSI' in wanted:
+            gain = np.where(delta > 0, delta, 0.0)
+            loss = np.where(delta < 0, -delta, 0.0)
+            # Padding is not part of the history; the first real bar counts as a 0 change like in pandas
+            gain[padding] = np.nan
+            loss[padding] = np.nan
+            means = _rolling_sum(np.vstack([gain, loss]), 14) / 14
+            out['RSI'] = 100 - (100 / (1 + means[:symbols] / means[symbols:]))
+
+        if wanted & {'MACD', 'Signal_Line', 'MACD_Histogram'}:
+            macd = _ewm(close, 12) - _ewm(close, 26)
+            signal_line = _ewm(macd, 9)
+            out['MACD'] = macd
+            out['Signal_Line'] = signal_line
+            out['MACD_Histogram'] = macd - signal_line
+
+        if wanted & {'BB_Std', 'BB_Upper', 'BB_Lower', 'BB_Width'}:
+            bb_std = _rolling_std(close, 20)
+            out['BB_Std'] = bb_std
+            out['BB_Upper'] = out['BB_Middle'] + bb_std * 2
+            out['BB_Lower'] = out['BB_Middle'] - bb_std * 2
+            out['BB_Width'] = (out['BB_Upper'] - out['BB_Lower']) / out['BB_Middle']
+
+        if wanted & {'%K', '%D'}:
+            low_14 = _rolling_extreme(low, 14, np.minimum)
+            high_14 = _rolling_extreme(high, 14, np.maximum)
+            percent_k = ((close - low_14) / (high_14 - low_14)) * 100
+            out['%K'] = percent_k
+            out['%D'] = _rolling_sum(percent_k, 3) / 3
+
+        if wanted & {'TR', 'ATR', 'ADX'}:
+            tr = np.maximum(high - low, np.maximum(np.abs(high - previous_close), np.abs(low - previous_close)))
+            out['TR'] = tr
+            plus_dm = np.maximum(high - _shift(high, 1), 0)
+            minus_dm = np.maximum(_shift(low, 1) - low, 0)
+            plus_dm[plus_dm <= minus_dm] = 0
+            minus_dm[minus_dm <= plus_dm] = 0
+            # ATR and the three ADX sums share the 14-bar window: one pass over stacked rows
+            sums = _rolling_sum(np.vstack([tr, plus_dm, minus_dm]), 14)
+            tr_sum, plus_sum, minus_sum = sums[:symbols], sums[symbols:2 * symbols], sums[2 * symbols:]
+            out['ATR'] = tr_sum / 14
+            if 'ADX' in wanted:
+                plus_di = 100 * (plus_sum / tr_sum)
+                minus_di = 100 * (minus_sum / tr_sum)
+                dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+                out['ADX'] = _rolling_sum(dx, 14) / 14
+
+        if 'Momentum' in wanted:
+            out['Momentum'] = close - _shift(close, 4)
+        if 'ROC' in wanted:
+            out['ROC'] = (close / _shift(close, 12) - 1) * 100
+
+        if wanted & {'OBV', 'Volume_ROC'}:
+            real_volume = ohlcv['real_volume']
+            volume = np.where(real_volume != 0, real_volume, ohlcv['tick_volume'])
+            flow = np.sign(delta) * volume
+            obv = np.nancumsum(flow, axis=1)
+            obv[np.isnan(flow)] = np.nan
+            out['OBV'] = obv
+            out['Volume_ROC'] = (volume / _shift(volume, 1) - 1) * 100
+
+    return {column: out[column] for column in INDICATOR_COLUMNS if column in wanted}
+
+
+def add_technical_indicators_batch(frames: Dict[str, pd.DataFrame], columns: Optional[Iterable[str]] = None,
+                                   dtype: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Per-symbol frames with indicator columns added, computed in one batch. Like compute_indicators, frames
+    are sorted by time first and a dtype applies to the indicator columns only.
+    """
+    frames = {symbol: frame if frame['time'].is_monotonic_increasing else frame.sort_values('time') for symbol, frame in frames.items()}
+    symbols, ohlcv = stack_frames(frames)
+    indicators = batch_indicators(ohlcv, columns)
+    bars = ohlcv['close'].shape[1]
+    result = {}
+    for row, symbol in enumerate(symbols):
+        frame = frames[symbol].copy()
+        offset = bars - len(frame)
+        for column, values in indicators.items():
+            frame[column] = values[row, offset:] if dtype is None else values[row, offset:].astype(dtype)
+        result[symbol] = frame
+    return result
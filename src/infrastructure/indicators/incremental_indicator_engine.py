@@ -0,0 +1,333 @@
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.domain.entities.candle_series import CandleSeries, TIME_DTYPE
+from src.domain.value_objects.timeframe import Timeframe
+
+NAN = float('nan')
+
+# Running sums are re-added from scratch every RESYNC_INTERVAL updates so rounding error cannot accumulate
+RESYNC_INTERVAL = 4096
+
+CANDLE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume']
+INDICATOR_COLUMNS = [
+    'returns', 'SMA_20', 'EMA_50', 'RSI', 'MACD', 'Signal_Line', 'MACD_Histogram',
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower', 'BB_Width', '%K', '%D',
+    'TR', 'ATR', 'ADX', 'Momentum', 'ROC', 'OBV', 'Volume_ROC',
+]
+# Same dtypes as a DataFrame built from MT5 rates
+CANDLE_DTYPES = {
+    'time': TIME_DTYPE, 'open': np.float64, 'high': np.float64, 'low': np.float64, 'close': np.float64,
+    'tick_volume': np.uint64, 'spread': np.int32, 'real_volume': np.uint64,
+}
+
+
+def _div(a: float, b: float) -> float:
+    # Float division with numpy semantics (x/0 -> +-inf, 0/0 -> nan) instead of ZeroDivisionError
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _RollingSum:
+    """Sum over a fixed window; NaN until the window holds `size` non-NaN values, like pandas rolling."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        self.total = 0.0
+        self.nan_count = 0
+        self.updates = 0
+
+    def _after(self, x: float) -> Tuple[float, int, int]:
+        total, nan_count, count = self.total, self.nan_count, len(self.values)
+        if count == self.size:
+            oldest = self.values[0]
+            if oldest != oldest:
+                nan_count -= 1
+            else:
+                total -= oldest
+            count -= 1
+        if x != x:
+            nan_count += 1
+        else:
+            total += x
+        return total, nan_count, count + 1
+
+    def _result(self, total: float, nan_count: int, count: int) -> float:
+        if count < self.size or nan_count:
+            return NAN
+        return total
+
+    def update(self, x: float, commit: bool = True) -> float:
+        total, nan_count, count = self._after(x)
+        if commit:
+            if len(self.values) == self.size:
+                self.values.popleft()
+            self.values.append(x)
+            self.total, self.nan_count = total, nan_count
+            self.updates += 1
+            if self.updates % RESYNC_INTERVAL == 0:
+                self.total = total = math.fsum(v for v in self.values if v == v)
+        return self._result(total, nan_count, count)
+
+
+class _RollingMean(_RollingSum):
+    def _result(self, total: float, nan_count: int, count: int) -> float:
+        if count < self.size or nan_count:
+            return NAN
+        return total / self.size
+
+
+class _RollingStd:
+    """Sample standard deviation (ddof=1) over a fixed window of finite values."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque()
+        # Sums are kept relative to `shift` to avoid cancellation on large price levels
+        self.shift = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def _resync(self):
+        self.shift = math.fsum(self.values) / len(self.values)
+        self.total = math.fsum(v - self.shift for v in self.values)
+        self.total_sq = math.fsum((v - self.shift) ** 2 for v in self.values)
+
+    def update(self, x: float, commit: bool = True) -> float:
+        shift = x if self.shift is None else self.shift
+        total, total_sq, count = self.total, self.total_sq, len(self.values)
+        if count == self.size:
+            oldest = self.values[0] - shift
+            total -= oldest
+            total_sq -= oldest * oldest
+            count -= 1
+        d = x - shift
+        total += d
+        total_sq += d * d
+        count += 1
+        if commit:
+            if len(self.values) == self.size:
+                self.values.popleft()
+            self.values.append(x)
+            self.shift, self.total, self.total_sq = shift, total, total_sq
+            self.updates += 1
+            if self.updates % RESYNC_INTERVAL == 0:
+                self._resync()
+                total, total_sq = self.total, self.total_sq
+        if count < self.size:
+            return NAN
+        variance = (total_sq - total * total / count) / (count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _RollingExtreme:
+    """Rolling min or max using a monotonic deque, amortized O(1) per update."""
+
+    def __init__(self, size: int, is_max: bool):
+        self.size = size
+        self.is_max = is_max
+        self.window = deque()  # (position, value), values monotonic from the front
+        self.count = 0
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def update(self, x: float, commit: bool = True) -> float:
+        position = self.count
+        if not commit:
+            if position + 1 < self.size:
+                return NAN
+            for index, value in self.window:
+                if index > position - self.size:
+                    return value if self._dominates(value, x) else x
+            return x
+
+        window = self.window
+        while window and self._dominates(x, window[-1][1]):
+            window.pop()
+        window.append((position, x))
+        if window[0][0] <= position - self.size:
+            window.popleft()
+        self.count += 1
+        return window[0][1] if self.count >= self.size else NAN
+
+
+class _Lag:
+    def __init__(self, periods: int):
+        self.values = deque(maxlen=periods)
+
+    def value(self) -> float:
+        return self.values[0] if len(self.values) == self.values.maxlen else NAN
+
+    def push(self, x: float):
+        self.values.append(x)
+
+
+class _Ewm:
+    # Matches pandas ewm(span=..., adjust=False) on series without NaN
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = None
+
+    def update(self, x: float, commit: bool = True) -> float:
+        value = x if self.value is None else (1.0 - self.alpha) * self.value + self.alpha * x
+        if commit:
+            self.value = value
+        return value
+
+
+class IndicatorState:
+    """Running indicator state for one symbol/timeframe, reproducing add_technical_indicators bar by bar."""
+
+    def __init__(self, history_size: int = 500, columns: Optional[List[str]] = None, dtype: Optional[str] = None):
+        self.history_size = history_size
+        # Every indicator is updated, the history only keeps the requested ones
+        self.columns = [column for column in INDICATOR_COLUMNS if columns is None or column in columns]
+        self.dtype = np.dtype(dtype or np.float64)
+        self.reset()
+
+    def reset(self):
+        dtypes = {**CANDLE_DTYPES, **{column: self.dtype for column in self.columns}}
+        self.history = CandleSeries.empty(dtypes, capacity=self.history_size)
+        self.last_time = None
+        self.prev_close = NAN
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_volume = NAN
+        self.obv_total = 0.0
+
+        self.sma_20 = _RollingMean(20)
+        self.ema_50 = _Ewm(50)
+        self.gain_14 = _RollingMean(14)
+        self.loss_14 = _RollingMean(14)
+        self.ema_12 = _Ewm(12)
+        self.ema_26 = _Ewm(26)
+        self.signal_9 = _Ewm(9)
+        self.std_20 = _RollingStd(20)
+        self.low_14 = _RollingExtreme(14, is_max=False)
+        self.high_14 = _RollingExtreme(14, is_max=True)
+        self.percent_d = _RollingMean(3)
+        self.atr_14 = _RollingMean(14)
+        self.plus_dm_14 = _RollingSum(14)
+        self.minus_dm_14 = _RollingSum(14)
+        self.tr_14 = _RollingSum(14)
+        self.adx_14 = _RollingMean(14)
+        self.lag_4 = _Lag(4)
+        self.lag_12 = _Lag(12)
+
+    def update(self, bar: Dict, commit: bool = True) -> Dict:
+        close, high, low = float(bar['close']), float(bar['high']), float(bar['low'])
+        real_volume = float(bar['real_volume'])
+        volume = real_volume if real_volume != 0 else float(bar['tick_volume'])
+        prev_close = self.prev_close
+
+        row = dict(bar)
+        row['returns'] = _div(close, prev_close) - 1
+
+        sma_20 = self.sma_20.update(close, commit)
+        row['SMA_20'] = sma_20
+        row['EMA_50'] = self.ema_50.update(close, commit)
+
+        delta = close - prev_close
+        gain = self.gain_14.update(delta if delta > 0 else 0.0, commit)
+        loss = self.loss_14.update(-delta if delta < 0 else 0.0, commit)
+        row['RSI'] = 100 - _div(100, 1 + _div(gain, loss))
+
+        macd = self.ema_12.update(close, commit) - self.ema_26.update(close, commit)
+        signal_line = self.signal_9.update(macd, commit)
+        row['MACD'] = macd
+        row['Signal_Line'] = signal_line
+        row['MACD_Histogram'] = macd - signal_line
+
+        bb_std = self.std_20.update(close, commit)
+        bb_upper = sma_20 + bb_std * 2
+        bb_lower = sma_20 - bb_std * 2
+        row['BB_Middle'] = sma_20
+        row['BB_Std'] = bb_std
+        row['BB_Upper'] = bb_upper
+        row['BB_Lower'] = bb_lower
+        row['BB_Width'] = _div(bb_upper - bb_lower, sma_20)
+
+        low_14 = self.low_14.update(low, commit)
+        high_14 = self.high_14.update(high, commit)
+        percent_k = _div(close - low_14, high_14 - low_14) * 100
+        row['%K'] = percent_k
+        row['%D'] = self.percent_d.update(percent_k, commit)
+
+        if prev_close != prev_close:
+            tr = NAN
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        row['TR'] = tr
+        row['ATR'] = self.atr_14.update(tr, commit)
+
+        plus_dm = max(high - self.prev_high, 0.0) if self.prev_high == self.prev_high else NAN
+        minus_dm = max(self.prev_low - low, 0.0) if self.prev_low == self.prev_low else NAN
+        # Same order as the pandas masks: plus_dm is zeroed first and minus_dm compared against the result
+        if plus_dm <= minus_dm:
+            plus_dm = 0.0
+        if minus_dm <= plus_dm:
+            minus_dm = 0.0
+        tr_sum = self.tr_14.update(tr, commit)
+        plus_di = 100 * _div(self.plus_dm_14.update(plus_dm, commit), tr_sum)
+        minus_di = 100 * _div(self.minus_dm_14.update(minus_dm, commit), tr_sum)
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        row['ADX'] = self.adx_14.update(dx, commit)
+
+        row['Momentum'] = close - self.lag_4.value()
+        row['ROC'] = (_div(close, self.lag_12.value()) - 1) * 100
+
+        direction = NAN if delta != delta else float((delta > 0) - (delta < 0))
+        if direction != direction:
+            row['OBV'] = NAN
+        else:
+            obv_total = self.obv_total + direction * volume
+            row['OBV'] = obv_total
+            if commit:
+                self.obv_total = obv_total
+        row['Volume_ROC'] = (_div(volume, self.prev_volume) - 1) * 100
+
+        if commit:
+            self.prev_close, self.prev_high, self.prev_low, self.prev_volume = close, high, low, volume
+            self.lag_4.push(close)
+            self.lag_12.push(close)
+            self.last_time = bar['time']
+            self.history.append(row)
+        return row
+
+    def peek(self, bar: Dict) -> Dict:
+        # Indicator values for a bar that has not closed yet, leaving the running state untouched
+        return self.update(bar, commit=False)
+
+    def series(self, num_candles: int, forming_bar: Optional[Dict] = None) -> CandleSeries:
+        if forming_bar is None:
+            return self.history.tail(num_candles)
+        return self.history.tail(num_candles - 1).with_row(self.peek(forming_bar))
+
+
+class IncrementalIndicatorEngine:
+    """Keeps one IndicatorState per (symbol, timeframe) so each closed bar costs O(1) to process."""
+
+    def __init__(self, history_size: int = 500, columns: Optional[List[str]] = None, dtype: Optional[str] = None):
+        self.history_size = history_size
+        self.columns = columns
+        self.dtype = dtype
+        self._states: Dict[Tuple[str, Timeframe], IndicatorState] = {}
+
+    def state(self, symbol: str, timeframe: Timeframe) -> IndicatorState:
+        key = (symbol, timeframe)
+        if key not in self._states:
+            self._states[key] = IndicatorState(self.history_size, self.columns, self.dtype)
+        return self._states[key]
+
+    def update(self, symbol: str, timeframe: Timeframe, bar: Dict) -> Dict:
+        return self.state(symbol, timeframe).update(bar)
+
+    def reset(self, symbol: str, timeframe: Timeframe):
+        self._states.pop((symbol, timeframe), None)
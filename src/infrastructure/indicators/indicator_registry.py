@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from src.domain.entities.candle_series import CandleSeries
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    outputs: Tuple[str, ...]
+    # Candle columns or outputs of other indicators, passed to compute in this order
+    inputs: Tuple[str, ...]
+    compute: Callable
+
+
+class IndicatorRegistry:
+    """
+    Indicators with declared inputs and outputs. Outputs starting with '_' are intermediates shared by
+    several indicators (the true range, the close-to-close delta...) and are never returned.
+    """
+
+    def __init__(self):
+        self._producers: Dict[str, IndicatorSpec] = {}
+
+    def register(self, outputs: List[str], inputs: List[str]):
+        def decorator(function: Callable) -> Callable:
+            spec = IndicatorSpec(tuple(outputs), tuple(inputs), function)
+            for output in outputs:
+                if output in self._producers:
+                    raise ValueError(f"Indicator column {output} is already registered")
+                self._producers[output] = spec
+            return function
+        return decorator
+
+    @property
+    def columns(self) -> List[str]:
+        return [column for column in self._producers if not column.startswith('_')]
+
+    def resolve(self, columns: Iterable[str]) -> List[IndicatorSpec]:
+        """The indicators needed for `columns`, each after the ones it depends on. Unknown names are candle columns."""
+        ordered, visiting = [], set()
+
+        def visit(column: str):
+            spec = self._producers.get(column)
+            if spec is None or spec in ordered:
+                return
+            if spec in visiting:
+                raise ValueError(f"Circular indicator dependency at {column}")
+            visiting.add(spec)
+            for dependency in spec.inputs:
+                visit(dependency)
+            visiting.discard(spec)
+            ordered.append(spec)
+
+        for column in columns:
+            visit(column)
+        return ordered
+
+    def evaluate(self, data: Union[pd.DataFrame, CandleSeries]) -> 'LazyIndicators':
+        return LazyIndicators(self, data)
+
+    def compute(self, data: pd.DataFrame, columns: Optional[Iterable[str]] = None, dtype: Optional[str] = None) -> pd.DataFrame:
+        """
+        The candle columns of `data` plus the requested indicator columns (all when None), in registry order.
+        With a dtype the indicator columns are cast to it; prices keep their precision.
+        """
+        if not data['time'].is_monotonic_increasing:
+            data = data.sort_values('time')
+        wanted = set(self.columns if columns is None else columns)
+        indicators = self.evaluate(data)
+        result = {column: data[column] for column in data.columns}
+        for column in self.columns:
+            if column in wanted:
+                values = indicators[column]
+                result[column] = values.astype(dtype) if dtype is not None else values
+        return pd.DataFrame(result, index=data.index)
+
+
+class LazyIndicators:
+    """Indicator columns of one data set, computed on first access together with their dependencies and kept."""
+
+    def __init__(self, registry: IndicatorRegistry, data: Union[pd.DataFrame, CandleSeries]):
+        self.registry = registry
+        self.data = data
+        self._values: Dict[str, pd.Series] = {}
+        self.evaluations = 0
+
+    def __getitem__(self, column: str) -> pd.Series:
+        if column not in self._values:
+            spec = self.registry._producers.get(column)
+            if spec is None:
+                self._values[column] = self._candle_column(column)
+            else:
+                outputs = spec.compute(*(self[dependency] for dependency in spec.inputs))
+                if len(spec.outputs) == 1:
+                    outputs = (outputs,)
+                self._values.update(zip(spec.outputs, outputs))
+                self.evaluations += 1
+        return self._values[column]
+
+    def _candle_column(self, column: str) -> pd.Series:
+        if isinstance(self.data, pd.DataFrame):
+            return self.data[column]
+        return pd.Series(self.data[column])
+
+
+INDICATORS = IndicatorRegistry()
+indicator = INDICATORS.register
+
+
+def compute_indicators(data: pd.DataFrame, columns: Optional[Iterable[str]] = None, dtype: Optional[str] = None) -> pd.DataFrame:
+    return INDICATORS.compute(data, columns, dtype)
+
+
+@indicator(['returns'], ['close'])
+def _returns(close):
+    return close.pct_change()
+
+
+@indicator(['SMA_20'], ['close'])
+def _sma_20(close):
+    return close.rolling(window=20).mean()
+
+
+@indicator(['EMA_50'], ['close'])
+def _ema_50(close):
+    return close.ewm(span=50, adjust=False).mean()
+
+
+@indicator(['_delta'], ['close'])
+def _delta(close):
+    return close.diff()
+
+
+@indicator(['RSI'], ['_delta'])
+def _rsi(delta):
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+@indicator(['MACD'], ['close'])
+def _macd(close):
+    return close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+
+
+@indicator(['Signal_Line'], ['MACD'])
+def _signal_line(macd):
+    return macd.ewm(span=9, adjust=False).mean()
+
+
+@indicator(['MACD_Histogram'], ['MACD', 'Signal_Line'])
+def _macd_histogram(macd, signal_line):
+    return macd - signal_line
+
+
+@indicator(['BB_Middle'], ['SMA_20'])
+def _bb_middle(sma_20):
+    return sma_20
+
+
+@indicator(['BB_Std'], ['close'])
+def _bb_std(close):
+    return close.rolling(window=20).std()
+
+
+@indicator(['BB_Upper', 'BB_Lower'], ['BB_Middle', 'BB_Std'])
+def _bb_bands(middle, std):
+    return middle + (std * 2), middle - (std * 2)
+
+
+@indicator(['BB_Width'], ['BB_Upper', 'BB_Lower', 'BB_Middle'])
+def _bb_width(upper, lower, middle):
+    return (upper - lower) / middle
+
+
+@indicator(['%K'], ['close', 'low', 'high'])
+def _stochastic_k(close, low, high):
+    low_14 = low.rolling(window=14).min()
+    high_14 = high.rolling(window=14).max()
+    return ((close - low_14) / (high_14 - low_14)) * 100
+
+
+@indicator(['%D'], ['%K'])
+def _stochastic_d(percent_k):
+    return percent_k.rolling(window=3).mean()
+
+
+@indicator(['TR'], ['high', 'low', 'close'])
+def _true_range(high, low, close):
+    return np.maximum(high - low, np.maximum(abs(high - close.shift()), abs(low - close.shift())))
+
+
+@indicator(['ATR'], ['TR'])
+def _atr(tr):
+    return tr.rolling(window=14).mean()
+
+
+@indicator(['ADX'], ['high', 'low', 'TR'])
+def _adx(high, low, tr):
+    plus_dm = np.maximum(high - high.shift(), 0)
+    minus_dm = np.maximum(low.shift() - low, 0)
+    plus_dm[(plus_dm < minus_dm) | (plus_dm == minus_dm)] = 0
+    minus_dm[(minus_dm < plus_dm) | (minus_dm == plus_dm)] = 0
+
+    plus_di = 100 * (plus_dm.rolling(window=14).sum() / tr.rolling(window=14).sum())
+    minus_di = 100 * (minus_dm.rolling(window=14).sum() / tr.rolling(window=14).sum())
+    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
+    return dx.rolling(window=14).mean()
+
+
+@indicator(['Momentum'], ['close'])
+def _momentum(close):
+    return close - close.shift(4)
+
+
+@indicator(['ROC'], ['close'])
+def _roc(close):
+    return close.pct_change(periods=12) * 100
+
+
+@indicator(['_volume'], ['real_volume', 'tick_volume'])
+def _volume(real_volume, tick_volume):
+    return real_volume.where(real_volume != 0, tick_volume)
+
+
+@indicator(['OBV'], ['_delta', '_volume'])
+def _obv(delta, volume):
+    return (np.sign(delta) * volume).cumsum()
+
+
+@indicator(['Volume_ROC'], ['_volume'])
+def _volume_roc(volume):
+    return volume.pct_change(periods=1) * 100
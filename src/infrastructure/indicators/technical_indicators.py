@@ -0,0 +1,7 @@
+import pandas as pd
+from src.infrastructure.indicators.indicator_registry import compute_indicators
+
+
+def add_technical_indicators(data: pd.DataFrame) -> pd.DataFrame:
+    # Every indicator of the registry, which holds the only definitions
+    return compute_indicators(data)
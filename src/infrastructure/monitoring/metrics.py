@@ -0,0 +1,241 @@
+import bisect
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from config.settings import CONFIG
+
+# Upper bounds in seconds of the latency buckets: 50us to about 100s, each sqrt(2) wider than the last
+LATENCY_BUCKETS = tuple(5e-5 * 2 ** (i / 2) for i in range(43))
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """
+    Counts per fixed bucket. Observing is a binary search and an increment; percentiles are read from
+    the bucket counts, interpolated within a bucket, so they are exact to a bucket's width.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q / 100 * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Metrics:
+    """
+    Latency histograms and counters of the running process, keyed by name and labels. Components that
+    already keep their own statistics register a collector instead; its numbers are read at export time.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._histograms: Dict[SeriesKey, Histogram] = {}
+        self._counters: Dict[SeriesKey, Counter] = {}
+        self._collectors: Dict[SeriesKey, Callable[[], Dict]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> SeriesKey:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def observe_all(self, name: str, timings: Dict[str, float], label: str, **labels):
+        # One observation per entry of a StageTimer's timings, the entry name as `label`
+        for entry, seconds in timings.items():
+            self.histogram(name, **{label: entry}, **labels).observe(seconds)
+
+    @contextmanager
+    def _timer(self, histogram: Histogram):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - started)
+
+    def timer(self, name: str, **labels):
+        return self._timer(self.histogram(name, **labels))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        counter.inc(amount)
+
+    def register_collector(self, name: str, collect: Callable[[], Dict], **labels):
+        """collect() returns a possibly nested dict; its numeric values are exported as gauges under `name` with `labels`."""
+        with self._lock:
+            self._collectors[self._key(name, labels)] = collect
+
+    def _collected(self) -> Dict[SeriesKey, Dict]:
+        with self._lock:
+            collectors = dict(self._collectors)
+        collected = {}
+        for key, collect in collectors.items():
+            try:
+                collected[key] = collect()
+            except Exception as e:
+                collected[key] = {'error': str(e)}
+        return collected
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            histograms, counters = dict(self._histograms), dict(self._counters)
+        return {
+            'histograms': [{'name': name, 'labels': dict(labels), **histogram.snapshot()} for (name, labels), histogram in histograms.items()],
+            'counters': [{'name': name, 'labels': dict(labels), 'value': counter.value} for (name, labels), counter in counters.items()],
+            'collected': [{'name': name, 'labels': dict(labels), 'values': values} for (name, labels), values in self._collected().items()],
+        }
+
+    def prometheus(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        with self._lock:
+            histograms, counters = dict(self._histograms), dict(self._counters)
+        lines, typed = [], set()
+
+        def declare(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in sorted(histograms.items()):
+            declare(name, 'histogram')
+            with histogram._lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels, le=f'{bound:.6g}')} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), counter in sorted(counters.items()):
+            declare(name, 'counter')
+            lines.append(f"{name}{_labels(labels)} {counter.value}")
+        # Collectors are registered per label set, so their samples are grouped into one block per metric
+        gauges: Dict[str, List[str]] = {}
+        for (collector, labels), values in self._collected().items():
+            for path, value in _flatten(values):
+                name = _metric_name('trading', collector, *path)
+                gauges.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for name, samples in gauges.items():
+            declare(name, 'gauge')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class NullMetrics(Metrics):
+    """Metrics switched off: every call returns at once and nothing is kept."""
+
+    enabled = False
+    _null_timer = nullcontext()
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return Histogram()
+
+    def observe(self, name: str, seconds: float, **labels):
+        pass
+
+    def observe_all(self, name: str, timings: Dict[str, float], label: str, **labels):
+        pass
+
+    def timer(self, name: str, **labels):
+        return self._null_timer
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        pass
+
+    def register_collector(self, name: str, collect: Callable[[], Dict], **labels):
+        pass
+
+
+def _labels(labels: Iterable[Tuple[str, str]], **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+
+def _escape(value: str) -> str:
+    # Label value escaping of the exposition format: backslash, double quote and newline
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', '_'.join(str(part) for part in parts)).lower()
+
+
+def _flatten(values: Dict, path: Tuple = ()) -> Iterable[Tuple[Tuple, float]]:
+    # Numeric and boolean leaves of a nested stats dict; strings and None are not gauges
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, path + (key,))
+        elif isinstance(value, (int, float)) and math.isfinite(value):
+            yield path + (key,), float(value)
+
+
+def create_metrics(enabled: bool = CONFIG['METRICS_ENABLED']) -> Metrics:
+    return Metrics() if enabled else NullMetrics()
+
+
+# Process-wide registry the trading cycle's components report to
+METRICS = create_metrics()
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from config.settings import CONFIG
+from src.infrastructure.monitoring.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PrometheusExporter:
+    """Serves the metrics in the Prometheus text format at http://<host>:<port>/metrics from a background thread."""
+
+    def __init__(self, metrics: Metrics, port: int = CONFIG['METRICS_PORT'], host: str = '0.0.0.0'):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self._server is not None:
+            return
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes would flood the trading log
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on http://{self.host}:{self._server.server_address[1]}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread.join()
+
+
+class JsonLinesExporter:
+    """Appends a snapshot of the metrics as one JSON line every `interval` seconds, and once more on stop."""
+
+    def __init__(self, metrics: Metrics, path: str = CONFIG['METRICS_JSONL_PATH'], interval: float = CONFIG['METRICS_JSONL_INTERVAL']):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-jsonl', daemon=True)
+        self._thread.start()
+        logger.info(f"Writing metrics to {self.path} every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self):
+        try:
+            line = json.dumps({'time': time.time(), **self.metrics.snapshot()}, default=str)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+        except Exception as e:
+            logger.error(f"Failed to write metrics to {self.path}: {e}")
+
+
+def create_metrics_exporter(metrics: Metrics, mode: Optional[str] = CONFIG['METRICS_EXPORT']):
+    if not mode or not metrics.enabled:
+        return None
+    if mode == 'prometheus':
+        return PrometheusExporter(metrics)
+    if mode == 'jsonl':
+        return JsonLinesExporter(metrics)
+    raise ValueError(f"Unknown metrics export mode: {mode}")
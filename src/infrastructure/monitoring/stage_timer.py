@@ -0,0 +1,58 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict
+import numpy as np
+
+
+class StageTimer:
+    """Wall-clock duration of each named stage of one trading cycle. Stages may run on other threads."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, self.clock() - started)
+
+    def timed(self, name: str, function: Callable, *args, **kwargs):
+        # Runs function as stage `name`, for work submitted to an executor
+        with self.stage(name):
+            return function(*args, **kwargs)
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def summary(self) -> str:
+        return ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.timings.items())
+
+
+class StageStats:
+    """Rolling per-stage latency percentiles over the last `window` cycles."""
+
+    def __init__(self, window: int = 500):
+        self._samples: Dict[str, deque] = {}
+        self.window = window
+        self._lock = threading.Lock()
+
+    def add(self, timer: StageTimer):
+        with self._lock:
+            for name, seconds in timer.timings.items():
+                self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    'count': len(samples),
+                    'p50_ms': float(np.percentile(samples, 50)) * 1000,
+                    'p95_ms': float(np.percentile(samples, 95)) * 1000,
+                }
+                for name, samples in self._samples.items()
+            }
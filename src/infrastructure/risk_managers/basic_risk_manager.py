@@ -1,14 +1,24 @@
-import MetaTrader5 as mt5
 from config.settings import CONFIG
+from src.infrastructure.brokers.broker_gateway import POSITION_TYPE_BUY, POSITION_TYPE_SELL
 import numpy as np
 from datetime import datetime
+from typing import List
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RiskManager():
-    def __init__(self, max_risk_per_trade: float = CONFIG['MAX_RISK_PER_TRADE']):
+    def __init__(self, max_risk_per_trade: float = CONFIG['MAX_RISK_PER_TRADE'], max_drawdown: float = CONFIG['MAX_DRAWDOWN'],
+                 one_minute_max_volatility: float = CONFIG['1MIN_MAX_VOLATILITY'], five_minute_max_volatility: float = CONFIG['5MIN_MAX_VOLATILITY'],
+                 no_trade_hours: List[int] = CONFIG['NO_TRADE_HOURS'], min_reward_ratio: float = CONFIG['MIN_REWARD_RATIO']):
         self.max_risk_per_trade = max_risk_per_trade
+        self.max_drawdown = max_drawdown
+        self.volatility_thresholds = {
+            '1m': one_minute_max_volatility,
+            '5m': five_minute_max_volatility,
+        }
+        self.no_trade_hours = list(no_trade_hours)
+        self.min_reward_ratio = min_reward_ratio
 
     def calculate_position_size(self, account_balance: float, risk_amount: float, stop_loss_pips: float) -> float:
         max_risk_amount = account_balance * self.max_risk_per_trade
@@ -19,19 +29,19 @@ class RiskManager():
     def adjust_stop_loss(self, entry_price: float, stop_loss: float, take_profit: float) -> float:
         risk = abs(entry_price - stop_loss)
         reward = abs(take_profit - entry_price)
-        if reward / risk < 2:
-            return entry_price - (take_profit - entry_price) / 2
+        if reward / risk < self.min_reward_ratio:
+            return entry_price - (take_profit - entry_price) / self.min_reward_ratio
         return stop_loss
 
     def should_execute_trade(self, decision, open_positions):
         for position in open_positions:
-            if (position.type == mt5.POSITION_TYPE_BUY and decision.signal == 'buy') or \
-               (position.type == mt5.POSITION_TYPE_SELL and decision.signal == 'sell'):
+            if (position.type == POSITION_TYPE_BUY and decision.signal == 'buy') or \
+               (position.type == POSITION_TYPE_SELL and decision.signal == 'sell'):
                 logger.info("Skipping trade due to existing position in same direction")
                 return False
         return True
 
-    def can_open_more_trades(self, account_info, open_positions, market_data):
+    def can_open_more_trades(self, account_info, open_positions, market_data, current_time: datetime = None, market_view=None):
 
         # 1. Check account health
         equity = account_info.equity
@@ -50,29 +60,54 @@ class RiskManager():
 
         # 3. Calculate current drawdown
         drawdown = (balance - equity) / balance
-        if drawdown > CONFIG['MAX_DRAWDOWN']:
+        if drawdown > self.max_drawdown:
             return False
 
-        volatility_thresholds = {
-            '1m': CONFIG['1MIN_MAX_VOLATILITY'],  # 0.5% for 1-minute timeframe
-            '5m': CONFIG['5MIN_MAX_VOLATILITY'],  # 0.3% for 5-minute timeframe
-        }
+        # 4. Drawdown caused by this symbol's open positions alone
+        symbol_drawdown = -sum(getattr(position, 'profit', 0.0) for position in open_positions) / balance
+        if symbol_drawdown > CONFIG['MAX_SYMBOL_DRAWDOWN']:
+            logger.error(f"Symbol drawdown ({symbol_drawdown:.2%}) exceeds maximum ({CONFIG['MAX_SYMBOL_DRAWDOWN']:.2%})")
+            return False
+
+        volatility_thresholds = self.volatility_thresholds
 
         for timeframe, data in market_data.items():
             if timeframe not in volatility_thresholds:
                 logger.error(f"Unsupported timeframe: {timeframe}")
                 continue
 
-            recent_prices = data['close'].tail(20)  # Last 20 periods
-            volatility = np.std(recent_prices.pct_change())
+            recent_prices = np.asarray(data['close'])[-20:]  # Last 20 periods
+            volatility = np.std(recent_prices[1:] / recent_prices[:-1] - 1) if len(recent_prices) > 1 else np.nan
             if volatility > volatility_thresholds[timeframe]:
                 logger.error(f"Volatility for timeframe {timeframe} ({volatility:.2f}) exceeds maximum ({volatility_thresholds[timeframe]})")
                 return False
 
+        # Spread and volatility measured on collected ticks, when available
+        if market_view is not None:
+            if market_view.relative_spread > CONFIG['MAX_SPREAD_RATIO']:
+                logger.error(f"Spread ({market_view.relative_spread:.4%}) exceeds maximum ({CONFIG['MAX_SPREAD_RATIO']:.4%})")
+                return False
+            if market_view.volatility > CONFIG['TICK_MAX_VOLATILITY']:
+                logger.error(f"Tick volatility ({market_view.volatility:.4f}) exceeds maximum ({CONFIG['TICK_MAX_VOLATILITY']})")
+                return False
+
         # 5. Time-based rules
-        current_hour = datetime.now().hour
-        if current_hour in CONFIG['NO_TRADE_HOURS']:
+        current_hour = (current_time or datetime.now()).hour
+        if current_hour in self.no_trade_hours:
             logger.error(f"Trading is not allowed during hour {current_hour} as per NO_TRADE_HOURS configuration.")
             return False
 
-        return True
\ No newline at end of file
+        return True
+
+    def within_portfolio_limits(self, account_info, all_positions) -> bool:
+        # Account-wide limits shared by every traded symbol
+        if len(all_positions) >= CONFIG['MAX_PORTFOLIO_POSITIONS']:
+            logger.error(f"Maximum portfolio positions ({CONFIG['MAX_PORTFOLIO_POSITIONS']}) reached")
+            return False
+
+        drawdown = (account_info.balance - account_info.equity) / account_info.balance
+        if drawdown > self.max_drawdown:
+            logger.error(f"Portfolio drawdown ({drawdown:.2%}) exceeds maximum ({self.max_drawdown:.2%})")
+            return False
+
+        return True
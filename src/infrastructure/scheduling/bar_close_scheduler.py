@@ -0,0 +1,96 @@
+import math
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional
+import numpy as np
+from config.settings import CONFIG
+from src.domain.value_objects.timeframe import Timeframe
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_MODE_BAR_CLOSE = 'bar_close'  # wake at the computed bar close
+SCHEDULER_MODE_POLL = 'poll'            # wake at the bar close, then poll the data provider until the new bar shows up
+
+
+class BarCloseScheduler:
+    """
+    Wakes the trading loop right after each bar of `timeframe` closes. The wait runs on the monotonic
+    clock and is re-anchored to the wall clock on every wake-up, so NTP steps and sleep overshoot do
+    not accumulate. The lag between each bar close and the start of the decision is recorded.
+    """
+
+    def __init__(self, timeframe: Timeframe, mode: str = CONFIG['SCHEDULER_MODE'],
+                 new_bar_probe: Optional[Callable[[], Optional[int]]] = None,
+                 offset_seconds: float = CONFIG['BAR_CLOSE_OFFSET_SECONDS'], max_sleep: float = 1.0,
+                 poll_interval: float = 0.2, poll_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.time, monotonic: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if mode == SCHEDULER_MODE_POLL and new_bar_probe is None:
+            raise ValueError("The poll scheduler mode needs a new_bar_probe")
+        self.period = timeframe.value * 60
+        self.mode = mode
+        self.new_bar_probe = new_bar_probe
+        # Shifts bar boundaries for brokers whose H4/D1 bars do not start at UTC midnight
+        self.offset_seconds = offset_seconds
+        self.max_sleep = max_sleep
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.clock = clock
+        self.monotonic = monotonic
+        self.sleep = sleep
+        self.last_bar_close = None
+        self.last_bar_time = None
+        self.lags = deque(maxlen=500)
+
+    def next_bar_close(self, now: float) -> float:
+        periods = math.floor((now - self.offset_seconds) / self.period) + 1
+        return periods * self.period + self.offset_seconds
+
+    def wait_for_next_bar(self) -> float:
+        """Blocks until the next bar close (and, in poll mode, until the provider has the new bar)."""
+        if self.mode == SCHEDULER_MODE_POLL and self.last_bar_time is None:
+            self.last_bar_time = self.new_bar_probe()
+
+        target = self.next_bar_close(self.clock())
+        deadline = self.monotonic() + (target - self.clock())
+        while True:
+            remaining = deadline - self.monotonic()
+            if remaining <= 0:
+                break
+            self.sleep(min(remaining, self.max_sleep))
+            # Drift correction: trust the wall clock for where the bar boundary is
+            deadline = self.monotonic() + (target - self.clock())
+
+        if self.mode == SCHEDULER_MODE_POLL:
+            self._poll_new_bar()
+
+        self.last_bar_close = target
+        return target
+
+    def _poll_new_bar(self):
+        give_up_at = self.monotonic() + self.poll_timeout
+        while self.monotonic() < give_up_at:
+            bar_time = self.new_bar_probe()
+            if bar_time is not None and (self.last_bar_time is None or bar_time > self.last_bar_time):
+                self.last_bar_time = bar_time
+                return
+            self.sleep(self.poll_interval)
+        logger.warning(f"No new bar detected {self.poll_timeout}s after the expected close")
+
+    def record_decision_start(self) -> float:
+        # Seconds between the bar close and now; called when the decision work starts
+        lag = self.clock() - self.last_bar_close
+        self.lags.append(lag)
+        return lag
+
+    def lag_stats(self) -> Dict:
+        if not self.lags:
+            return {'count': 0}
+        lags_ms = np.array(self.lags) * 1000
+        return {
+            'count': len(lags_ms),
+            'p50_ms': float(np.percentile(lags_ms, 50)),
+            'p95_ms': float(np.percentile(lags_ms, 95)),
+            'max_ms': float(lags_ms.max()),
+        }
@@ -1,64 +1,114 @@
-from typing import List
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import logging
+from config.settings import CONFIG
 from src.domain.entities.trading_decision import TradingDecision
+from src.infrastructure.external_services.decision_parser import DecisionParser
 from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.monitoring.metrics import METRICS, Metrics
+from src.infrastructure.trading_strategies.signal_gate import SignalGate, determine_trend
 
 logger = logging.getLogger(__name__)
 
 class TradingModule():
-    def __init__(self, api_client: LLMApiClient):
+    # Indicator columns the trend filter and the stop distance check read
+    DECISION_COLUMNS = ['SMA_20', 'ADX', 'ATR']
+
+    def __init__(self, api_client: LLMApiClient, signal_gate: Optional[SignalGate] = None, metrics: Optional[Metrics] = None):
         self.api_client = api_client
+        # Symbol the metrics are labelled with, replayed clients only serve the configured one
+        self.symbol = getattr(api_client, 'symbol', CONFIG['SYMBOL'])
+        self.metrics = metrics or METRICS
+        if signal_gate is None and CONFIG['USE_SIGNAL_GATE']:
+            signal_gate = SignalGate()
+        self.signal_gate = signal_gate
+        self.decision_parser = DecisionParser()
+        self.llm_calls = 0
+        self.invalid_responses = 0
+
+    def required_columns(self) -> Optional[List[str]]:
+        """Indicator columns the decisions need, None when the prompt shows every column."""
+        prompt_columns = self.api_client.prompt_columns() if self.api_client is not None else []
+        if prompt_columns is None:
+            return None
+        return list(dict.fromkeys(self.DECISION_COLUMNS + prompt_columns))
 
     def generate_trading_decisions(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame) -> List[TradingDecision]:
         try:
-            latest_one_minute_data = one_minute_data.tail(50).to_dict(orient='records')
-            latest_five_minute_data = five_minute_data.tail(50).to_dict(orient='records')
-            response = self.api_client.get_trading_decision(latest_one_minute_data, latest_five_minute_data)
-            trading_decision = self._parse_llm_response(response)
-            if trading_decision:
-                validated_decision = self._validate_and_format_decision(trading_decision, one_minute_data, five_minute_data)
-                if validated_decision:
-                    return [validated_decision], True
-                else:
-                    return [], False
-            return [], True
+            allowed_side = None
+            if self.signal_gate is not None:
+                allowed_side = self.signal_gate.admissible_side(one_minute_data, five_minute_data)
+                if allowed_side is None:
+                    return [], True
+            latest_one_minute_data = one_minute_data.tail(50)
+            latest_five_minute_data = five_minute_data.tail(50)
+            response = self.api_client.get_trading_decision(latest_one_minute_data, latest_five_minute_data, allowed_side)
+            with self.metrics.timer('trading_stage_seconds', stage='parse_validate', symbol=self.symbol):
+                return self._decisions_from_response(response, one_minute_data, five_minute_data)
         except Exception as e:
             logger.error(f"Error occurred while generating trading decisions: {e}")
-            return []
+            return [], False
+
+    async def generate_trading_decisions_batch(self, windows: Iterable[Tuple[pd.DataFrame, pd.DataFrame]]) -> AsyncIterator[Tuple[int, List[TradingDecision], bool]]:
+        # Requests every (1m, 5m) window concurrently through an AsyncLLMApiClient and yields
+        # (window index, decisions, is_valid) in completion order
+        async def decide(index: int, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame):
+            try:
+                allowed_side = None
+                if self.signal_gate is not None:
+                    allowed_side = self.signal_gate.admissible_side(one_minute_data, five_minute_data)
+                    if allowed_side is None:
+                        return index, [], True
+                latest_one_minute_data = one_minute_data.tail(50)
+                latest_five_minute_data = five_minute_data.tail(50)
+                response = await self.api_client.get_trading_decision_async(latest_one_minute_data, latest_five_minute_data, allowed_side)
+                decisions, is_valid = self._decisions_from_response(response, one_minute_data, five_minute_data)
+            except Exception as e:
+                logger.error(f"Error occurred while generating trading decisions for window {index}: {e}")
+                decisions, is_valid = [], False
+            return index, decisions, is_valid
+
+        tasks = [asyncio.ensure_future(decide(index, one, five)) for index, (one, five) in enumerate(windows)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _decisions_from_response(self, response: str, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame) -> Tuple[List[TradingDecision], bool]:
+        self.llm_calls += 1
+        trading_decision = self._parse_llm_response(response)
+        if trading_decision:
+            validated_decision = self._validate_and_format_decision(trading_decision, one_minute_data, five_minute_data)
+            if validated_decision:
+                return [validated_decision], True
+            else:
+                # An invalid decision makes the trading cycle ask again
+                self.invalid_responses += 1
+                self.metrics.inc('trading_invalid_decisions_total', symbol=self.symbol)
+                return [], False
+        return [], True
+
+    def stats(self) -> Dict:
+        stats = {
+            'llm_calls': self.llm_calls,
+            'invalid_responses': self.invalid_responses,
+            'retry_rate': self.invalid_responses / self.llm_calls if self.llm_calls else 0.0,
+            **self.decision_parser.stats(),
+        }
+        if self.signal_gate is not None:
+            stats['signal_gate'] = self.signal_gate.stats()
+        return stats
 
     def _parse_llm_response(self, response: str) -> dict:
-        decision = {}
-        lines = response.split('\n')
-        for line in lines:
-            if line.startswith("Signal:"):
-                decision["signal"] = line.split(":")[1].strip()
-            elif line.startswith("Stop Loss:"):
-                try:
-                    decision["stop_loss"] = float(line.split(":")[1].strip())
-                except ValueError:
-                    logger.error("Invalid Stop Loss value")
-            elif line.startswith("Take Profit:"):
-                try:
-                    decision["take_profit"] = float(line.split(":")[1].strip())
-                except ValueError:
-                    logger.error("Invalid Take Profit value")
-            elif line.startswith("Explanation:"):
-                decision["explanation"] = line.split(":", 1)[1].strip()
-
-        if "Insufficient data to make a trading decision" in response:
-            logger.info("LLM reported insufficient data for a decision")
-            return {}
-
-        if all(key in decision for key in ["signal", "stop_loss", "take_profit", "explanation"]):
-            return decision
-        else:
-            logger.error("Incomplete decision data received from LLM")
-            return {}
+        return self.decision_parser.parse(response)
 
     def _validate_and_format_decision(self, decision: dict, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame) -> TradingDecision:
-        current_price = one_minute_data['close'].iloc[-1]
-        atr = one_minute_data['ATR'].iloc[-1]
+        current_price = np.asarray(one_minute_data['close'])[-1]
+        atr = np.asarray(one_minute_data['ATR'])[-1]
 
         # Validate signal
         if decision['signal'] not in ['buy', 'sell']:
@@ -119,15 +169,8 @@ class TradingModule():
             return one_min_trend == 'down' and five_min_trend in ['down', 'neutral']
 
     def _determine_trend(self, data: pd.DataFrame) -> str:
-        sma_short = data['SMA_20'].iloc[-1]
-        sma_long = data['SMA_20'].rolling(window=20).mean().iloc[-1]
-
-        if sma_short > sma_long and data['ADX'].iloc[-1] > 25:
-            return 'up'
-        elif sma_short < sma_long and data['ADX'].iloc[-1] > 25:
-            return 'down'
-        else:
-            return 'neutral'
+        # Shared with the signal gate so the pre-call filter and the validation can never disagree
+        return determine_trend(data, self.signal_gate.adx_threshold if self.signal_gate is not None else CONFIG['TREND_ADX_THRESHOLD'])
 
     def _is_valid_decision(self, decision: dict, current_price: float) -> bool:
         return (
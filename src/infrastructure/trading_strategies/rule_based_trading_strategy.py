@@ -0,0 +1,51 @@
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+import logging
+from config.settings import CONFIG
+from src.domain.entities.trading_decision import TradingDecision
+from src.infrastructure.trading_strategies.llm_trading_strategy import TradingModule
+from src.infrastructure.trading_strategies.signal_gate import determine_trend
+
+logger = logging.getLogger(__name__)
+
+class RuleBasedTradingModule(TradingModule):
+    """Deterministic trend-following decisions with ATR based stops, no LLM involved."""
+
+    def __init__(self, atr_multiple: float = 1.5, reward_ratio: float = 2.0, adx_threshold: float = CONFIG['TREND_ADX_THRESHOLD']):
+        super().__init__(api_client=None)
+        self.atr_multiple = atr_multiple
+        self.reward_ratio = reward_ratio
+        self.adx_threshold = adx_threshold
+
+    def generate_trading_decisions(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame) -> Tuple[List[TradingDecision], bool]:
+        current_price = np.asarray(one_minute_data['close'])[-1]
+        atr = np.asarray(one_minute_data['ATR'])[-1]
+        if pd.isna(atr) or atr <= 0:
+            return [], True
+
+        one_min_trend = self._determine_trend(one_minute_data)
+        five_min_trend = self._determine_trend(five_minute_data)
+        risk = self.atr_multiple * atr
+
+        if one_min_trend == 'up' and five_min_trend in ['up', 'neutral']:
+            decision = {
+                'signal': 'buy',
+                'stop_loss': current_price - risk,
+                'take_profit': current_price + self.reward_ratio * risk,
+            }
+        elif one_min_trend == 'down' and five_min_trend in ['down', 'neutral']:
+            decision = {
+                'signal': 'sell',
+                'stop_loss': current_price + risk,
+                'take_profit': current_price - self.reward_ratio * risk,
+            }
+        else:
+            return [], True
+
+        decision['explanation'] = f"1m trend {one_min_trend}, 5m trend {five_min_trend}, stop {self.atr_multiple} ATR away"
+        validated_decision = self._validate_and_format_decision(decision, one_minute_data, five_minute_data)
+        return ([validated_decision], True) if validated_decision else ([], True)
+
+    def _determine_trend(self, data: pd.DataFrame) -> str:
+        return determine_trend(data, self.adx_threshold)
@@ -0,0 +1,65 @@
+import logging
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def determine_trend(data: pd.DataFrame, adx_threshold: float = CONFIG['TREND_ADX_THRESHOLD']) -> str:
+    sma = np.asarray(data['SMA_20'])
+    sma_short = sma[-1]
+    # Mean of the last 20 SMA_20 values, NaN unless all 20 exist (same as rolling(window=20).mean())
+    sma_long = sma[-20:].mean() if len(sma) >= 20 else np.nan
+    adx = np.asarray(data['ADX'])[-1]
+
+    if sma_short > sma_long and adx > adx_threshold:
+        return 'up'
+    elif sma_short < sma_long and adx > adx_threshold:
+        return 'down'
+    else:
+        return 'neutral'
+
+
+class SignalGate:
+    """
+    Works out from the indicators, before any LLM call, which side a decision could have and still
+    pass TradingModule's trend alignment check. When neither side can, the model is not called at all.
+    """
+
+    def __init__(self, adx_threshold: float = CONFIG['TREND_ADX_THRESHOLD'], max_attempts: int = CONFIG['MAX_DECISION_ATTEMPTS']):
+        self.adx_threshold = adx_threshold
+        self.max_attempts = max_attempts
+        self.evaluations = 0
+        self.calls_avoided = 0
+        self.retries_saved = 0
+        self.sides = {'buy': 0, 'sell': 0}
+
+    def admissible_side(self, one_minute_data: pd.DataFrame, five_minute_data: pd.DataFrame) -> Optional[str]:
+        self.evaluations += 1
+        one_min_trend = determine_trend(one_minute_data, self.adx_threshold)
+        five_min_trend = determine_trend(five_minute_data, self.adx_threshold)
+
+        if one_min_trend == 'up' and five_min_trend in ['up', 'neutral']:
+            side = 'buy'
+        elif one_min_trend == 'down' and five_min_trend in ['down', 'neutral']:
+            side = 'sell'
+        else:
+            # Every answer would have been rejected, and the cycle would have retried up to max_attempts times
+            self.calls_avoided += 1
+            self.retries_saved += self.max_attempts - 1
+            logger.info(f"Signal gate closed (1m trend {one_min_trend}, 5m trend {five_min_trend}), skipping LLM call")
+            return None
+
+        self.sides[side] += 1
+        return side
+
+    def stats(self) -> Dict:
+        return {
+            'evaluations': self.evaluations,
+            'calls_avoided': self.calls_avoided,
+            'retries_saved': self.retries_saved,
+            'buy': self.sides['buy'],
+            'sell': self.sides['sell'],
+        }
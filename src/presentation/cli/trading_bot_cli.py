@@ -1,6 +1,12 @@
+import json
 import click
+from config.settings import CONFIG
+from src.application.parameter_optimizer import OBJECTIVES, ParameterOptimizer, grid, load_history, sample
 from src.application.trading_service import TradingService
 from src.application.backtesting_service import BacktestingService
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
+from src.infrastructure.data_providers.candle_store import CandleStore
+from src.infrastructure.trading_strategies.rule_based_trading_strategy import RuleBasedTradingModule
 
 @click.group()
 def cli():
@@ -12,10 +18,65 @@ def run_live():
     trading_service.run()
 
 @cli.command()
-def run_backtest():
-    backtesting_service = BacktestingService()
-    results = backtesting_service.run_backtest()
+@click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_START_DATE'], help='First day of the backtest')
+@click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_END_DATE'], help='Last day of the backtest')
+@click.option('--source', type=click.Choice(['llm', 'recorded', 'rules']), default='llm', help='Where trading decisions come from')
+@click.option('--responses', 'responses_path', type=click.Path(dir_okay=False), default=None, help='JSON-lines file of LLM responses to record to or replay from')
+@click.option('--cache-mode', type=click.Choice(['off', 'read_through', 'record_only', 'replay_only']), default=CONFIG['LLM_CACHE_MODE'], help='How LLM responses are cached between runs')
+def run_backtest(start_date, end_date, source, responses_path, cache_mode):
+    backtesting_service = BacktestingService(source, responses_path, cache_mode)
+    results = backtesting_service.run_backtest(start_date, end_date)
     backtesting_service.analyze_results(results)
 
+@cli.command()
+@click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_START_DATE'], help='First day of stored candles to replay')
+@click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_END_DATE'], help='Last day of stored candles to replay')
+@click.option('--source', type=click.Choice(['llm', 'rules']), default='rules', help='Where trading decisions come from')
+@click.option('--spread', 'spread_points', type=float, default=CONFIG['PAPER_SPREAD_POINTS'], help='Fixed spread in points, the stored candle spread by default')
+@click.option('--slippage', 'slippage_points', type=float, default=CONFIG['PAPER_SLIPPAGE_POINTS'], help='Maximum adverse slippage in points')
+def run_paper(start_date, end_date, source, spread_points, slippage_points):
+    """Runs the live trading loop against a simulated broker replaying the candle store."""
+    symbols = CONFIG['SYMBOLS']
+    broker = SimulatedBroker.from_candle_store(CandleStore(CONFIG['CANDLE_STORE_DIR']), symbols, start_date, end_date,
+                                               spread_points=spread_points, slippage_points=slippage_points)
+    trading_modules = {symbol: RuleBasedTradingModule() for symbol in symbols} if source == 'rules' else None
+    trading_service = TradingService(symbols, broker=broker, trading_modules=trading_modules)
+    summary = trading_service.run_paper()
+    for key, value in summary.items():
+        click.echo(f"{key}: {value}")
+
+@cli.command()
+@click.option('--mode', type=click.Choice(['grid', 'random', 'walk-forward']), default='grid', help='Search every combination, random samples, or walk-forward folds')
+@click.option('--space', 'space_path', type=click.Path(exists=True, dir_okay=False), required=True,
+              help='JSON object of CONFIG key to a list of values, or to {"min": .., "max": ..} for random sampling')
+@click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_START_DATE'], help='First day of the sweep')
+@click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), default=CONFIG['BACKTESTING_END_DATE'], help='Last day of the sweep')
+@click.option('--results', 'results_path', type=click.Path(dir_okay=False), default='optimization.jsonl', help='JSON-lines results file, trials already in it are skipped')
+@click.option('--samples', type=int, default=50, help='Random parameter sets, for random mode and random walk-forward training')
+@click.option('--train-search', type=click.Choice(['grid', 'random']), default='grid', help='How each walk-forward fold searches its training window')
+@click.option('--folds', type=int, default=4, help='Walk-forward folds')
+@click.option('--seed', type=int, default=0, help='Seed of the random parameter sets')
+@click.option('--workers', type=int, default=None, help='Worker processes, one per core by default')
+@click.option('--objective', type=click.Choice(OBJECTIVES), default='balance', help='Result the best parameters are chosen by')
+def optimize(mode, space_path, start_date, end_date, results_path, samples, train_search, folds, seed, workers, objective):
+    """Sweeps risk and trend parameters with rule-based backtests on a process pool."""
+    with open(space_path) as f:
+        space = json.load(f)
+    random_search = mode == 'random' or (mode == 'walk-forward' and train_search == 'random')
+    trials = sample(space, samples, seed) if random_search else grid(space)
+    one_minute_data, five_minute_data = load_history(start_date, end_date)
+    optimizer = ParameterOptimizer(one_minute_data, five_minute_data, results_path, workers=workers, objective=objective)
+    try:
+        if mode == 'walk-forward':
+            for record in optimizer.walk_forward(trials, start_date, end_date, folds):
+                click.echo(f"fold {record.get('fold')} {record['start']} - {record['end']}: {record['params']} "
+                           f"{objective} {record[objective]:.4f}, {record['trades']} trades")
+        else:
+            for record in optimizer.search(trials, start_date, end_date)[:10]:
+                click.echo(f"{record['params']}: {objective} {record[objective]:.4f}, {record['trades']} trades, "
+                           f"max drawdown {record['max_drawdown']:.2%}")
+    finally:
+        optimizer.close()
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
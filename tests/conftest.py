@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+import pytest
+from benchmarks.market_generator import generate_rates, resample, to_frame
+from src.infrastructure.indicators.indicator_registry import compute_indicators
+
+
+class MockChatCompletionsServer:
+    """
+    Local stand-in for an OpenAI-compatible /v1/chat/completions endpoint. Streaming requests get the
+    content as SSE chunks of `chunk_size` characters, `chunk_delay` seconds apart.
+    """
+
+    def __init__(self):
+        self.content = "Insufficient data to make a trading decision."
+        # Status codes answered, in order, before requests succeed
+        self.failures: List[int] = []
+        # (delay in seconds, content) of the next successful answers, in order, before `content` is used
+        self.replies: List[Tuple[float, str]] = []
+        self.requests: List[dict] = []
+        self.chunk_size = 3
+        self.chunk_delay = 0.005
+        self.streams_completed = 0
+        # Streams the client closed before the last chunk
+        self.streams_aborted = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1/chat/completions'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_reply(self, body: dict) -> Tuple[Optional[int], float, str]:
+        with self._lock:
+            self.requests.append(body)
+            if self.failures:
+                return self.failures.pop(0), 0.0, ''
+            if self.replies:
+                delay, content = self.replies.pop(0)
+                return None, delay, content
+            return None, 0.0, self.content
+
+    def _completion(self, body: dict, content: str) -> dict:
+        return {
+            'id': 'chatcmpl-test',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'test'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        }
+
+    def _chunk(self, body: dict, text: str) -> dict:
+        return {
+            'id': 'chatcmpl-test',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': body.get('model', 'test'),
+            'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}],
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                failure, delay, content = server._next_reply(body)
+                if failure is not None:
+                    self._send_json(failure, {'error': {'message': 'mock failure', 'type': 'server_error'}})
+                    return
+                time.sleep(delay)
+                if body.get('stream'):
+                    self._send_stream(body, content)
+                else:
+                    self._send_json(200, server._completion(body, content))
+
+            def _send_stream(self, body: dict, content: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                try:
+                    for start in range(0, len(content), server.chunk_size):
+                        chunk = server._chunk(body, content[start:start + server.chunk_size])
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                        time.sleep(server.chunk_delay)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.streams_aborted += 1
+                    return
+                with server._lock:
+                    server.streams_completed += 1
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def llm_server():
+    server = MockChatCompletionsServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope='session')
+def windows():
+    """Twenty (1m, 5m) windows with indicators, cut from one seeded series."""
+    one_minute = generate_rates(3000, seed=7)
+    one_minute_data = compute_indicators(to_frame(one_minute))
+    five_minute_data = compute_indicators(to_frame(resample(one_minute, 5)))
+    result = []
+    for end in range(1000, 3000, 100):
+        end_time = one_minute_data['time'].iloc[end - 1]
+        result.append((one_minute_data.iloc[end - 150:end], five_minute_data[five_minute_data['time'] <= end_time].tail(150)))
+    return result
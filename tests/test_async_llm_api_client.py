@@ -0,0 +1,72 @@
+import asyncio
+import openai
+import pytest
+from src.infrastructure.external_services.async_llm_api_client import AsyncLLMApiClient
+from src.infrastructure.trading_strategies.llm_trading_strategy import TradingModule
+
+
+def _client(llm_server, **kwargs) -> AsyncLLMApiClient:
+    options = dict(max_concurrency=4, requests_per_second=0, backoff_base=0.01, streaming=False, structured_output=False)
+    options.update(kwargs)
+    return AsyncLLMApiClient(llm_server.url, 'test-key', **options)
+
+
+def _trading_module(client: AsyncLLMApiClient) -> TradingModule:
+    trading_module = TradingModule(client)
+    # Every window goes to the server, whatever the trend filter thinks of it
+    trading_module.signal_gate = None
+    return trading_module
+
+
+async def _collect(trading_module: TradingModule, windows):
+    return [result async for result in trading_module.generate_trading_decisions_batch(windows)]
+
+
+def test_batch_yields_every_window(llm_server, windows):
+    trading_module = _trading_module(_client(llm_server))
+
+    results = asyncio.run(_collect(trading_module, windows))
+
+    assert sorted(index for index, _, _ in results) == list(range(len(windows)))
+    assert all(is_valid and decisions == [] for _, decisions, is_valid in results)
+    assert len(llm_server.requests) == len(windows)
+
+
+def test_client_survives_a_new_event_loop(llm_server, windows):
+    # Each asyncio.run() starts a new loop; the semaphore, rate limiter lock and HTTP client must follow it
+    trading_module = _trading_module(_client(llm_server, requests_per_second=1000))
+
+    for _ in range(2):
+        results = asyncio.run(_collect(trading_module, windows))
+        assert all(is_valid for _, _, is_valid in results)
+    assert len(llm_server.requests) == 2 * len(windows)
+
+
+def test_retries_rate_limits_and_server_errors(llm_server, windows):
+    llm_server.failures = [429, 503]
+    llm_server.content = '{"signal": "buy", "stop_loss": 100.5, "take_profit": 102.0, "explanation": "Uptrend."}'
+    client = _client(llm_server, max_retries=3)
+
+    response = asyncio.run(client.get_trading_decision_async(*windows[0]))
+
+    assert response == llm_server.content
+    assert client.retries == 2
+    assert len(llm_server.requests) == 3
+
+
+def test_gives_up_after_max_retries(llm_server, windows):
+    llm_server.failures = [500] * 5
+    client = _client(llm_server, max_retries=1)
+
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(client.get_trading_decision_async(*windows[0]))
+    assert len(llm_server.requests) == 2
+
+
+def test_batch_client_does_not_hedge_or_degrade(llm_server):
+    client = _client(llm_server, model='batch-model', token_budget=100)
+
+    assert client.latency_slo is None
+    assert not client.hedging
+    assert client.active_model == 'batch-model'
+    assert client.token_budget == 100
@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+import pytest
+from benchmarks.market_generator import generate_rates, resample, to_frame
+from src.application.backtest_engine import BacktestEngine
+from src.application.backtesting_service import BacktestingService
+from src.infrastructure.backtesting.exit_resolver import (
+    EXIT_END_OF_DATA, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, ExitResolver, SAME_BAR_OPEN_DISTANCE, SAME_BAR_STOP_LOSS,
+    SAME_BAR_TAKE_PROFIT, SIDE_BUY, SIDE_SELL,
+)
+from src.infrastructure.indicators.technical_indicators import add_technical_indicators
+from src.infrastructure.risk_managers.basic_risk_manager import RiskManager
+from src.infrastructure.trading_strategies.rule_based_trading_strategy import RuleBasedTradingModule
+
+SAME_BAR_POLICIES = [SAME_BAR_STOP_LOSS, SAME_BAR_TAKE_PROFIT, SAME_BAR_OPEN_DISTANCE]
+
+
+def walk_candles(rates, start, end, side, stop_loss, take_profit, same_bar):
+    """The candle by candle loop the resolver replaces."""
+    for index in range(start, end):
+        if side == SIDE_BUY:
+            sl_hit, tp_hit = rates['low'][index] <= stop_loss, rates['high'][index] >= take_profit
+        else:
+            sl_hit, tp_hit = rates['high'][index] >= stop_loss, rates['low'][index] <= take_profit
+        if sl_hit and tp_hit:
+            if same_bar == SAME_BAR_OPEN_DISTANCE:
+                bar_open = rates['open'][index]
+                sl_hit = abs(bar_open - stop_loss) <= abs(bar_open - take_profit)
+            else:
+                sl_hit = same_bar == SAME_BAR_STOP_LOSS
+            tp_hit = not sl_hit
+        if sl_hit:
+            return stop_loss, index, EXIT_STOP_LOSS
+        if tp_hit:
+            return take_profit, index, EXIT_TAKE_PROFIT
+    return rates['close'][end - 1], end - 1, EXIT_END_OF_DATA
+
+
+@pytest.fixture(scope='module')
+def trades():
+    rates = generate_rates(4000, seed=5)
+    rng = np.random.default_rng(5)
+    count = 500
+    start = rng.integers(0, len(rates) - 1, count)
+    end = np.minimum(start + rng.integers(1, 600, count), len(rates))
+    side = rng.choice([SIDE_BUY, SIDE_SELL], count)
+    price = rates['close'][start]
+    # Tight levels on some trades so bars touching both are common
+    distance = price * rng.choice([0.0003, 0.001, 0.004], count)
+    stop_loss = price - side * distance * rng.uniform(0.5, 1.5, count)
+    take_profit = price + side * distance * rng.uniform(0.5, 1.5, count)
+    return rates, start, end, side, stop_loss, take_profit
+
+
+@pytest.mark.parametrize('same_bar', SAME_BAR_POLICIES)
+def test_resolver_matches_candle_walk(trades, same_bar):
+    rates, start, end, side, stop_loss, take_profit = trades
+    resolver = ExitResolver(rates['high'], rates['low'], rates['close'], rates['open'])
+    batch = resolver.resolve(start, side, stop_loss, take_profit, end, same_bar=same_bar)
+    reasons = set()
+    for i in range(len(start)):
+        expected_price, expected_index, expected_reason = walk_candles(rates, start[i], end[i], side[i], stop_loss[i], take_profit[i], same_bar)
+        one = resolver.resolve_one(int(start[i]), int(side[i]), stop_loss[i], take_profit[i], int(end[i]), same_bar=same_bar)
+        assert one == (expected_price, expected_index, expected_index - start[i] + 1, expected_reason)
+        assert (batch.exit_price[i], batch.exit_index[i], batch.exit_reason[i]) == (expected_price, expected_index, expected_reason)
+        reasons.add(expected_reason)
+    assert reasons == {EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END_OF_DATA}
+
+
+def test_rules_replay_is_consistent_with_analyze_results(caplog):
+    one_minute = generate_rates(6000, seed=9)
+    one_minute_data = add_technical_indicators(to_frame(one_minute))
+    five_minute_data = add_technical_indicators(to_frame(resample(one_minute, 5)))
+    engine = BacktestEngine(None, RuleBasedTradingModule(), RiskManager(), initial_balance=10_000, decision_interval=1)
+    results = engine.replay(one_minute_data, five_minute_data)
+
+    assert len(results) > 20
+    assert set(results['exit_reason']) <= {EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END_OF_DATA}
+    side = np.where(results['signal'] == 'buy', 1, -1)
+    pnl = side * (results['exit_price'] - results['entry_price']) / engine.point * results['position_size']
+    np.testing.assert_allclose(results['pnl'], pnl)
+    np.testing.assert_allclose(results['balance'], 10_000 + results['pnl'].cumsum())
+    assert (results['exit_time'] > results['entry_time']).all()
+
+    # BacktestingService.__init__ connects a data fetcher; analyze_results reads only the results
+    service = BacktestingService.__new__(BacktestingService)
+    with caplog.at_level(logging.INFO, logger='src.application.backtesting_service'):
+        service.analyze_results(results)
+    assert f"Total Trades: {len(results)}" in caplog.messages
+    assert f"Win Rate: {(results['pnl'] > 0).mean():.2%}" in caplog.messages
+    assert f"Final Balance: ${results['balance'].iloc[-1]:.2f}" in caplog.messages
@@ -0,0 +1,69 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from benchmarks.market_generator import generate_universe, to_frame
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
+from src.infrastructure.data_providers.mt5_data_provider import DataFetcher, fetch_historical_batch
+from src.infrastructure.indicators.batch_indicators import add_technical_indicators_batch
+from src.infrastructure.indicators.incremental_indicator_engine import INDICATOR_COLUMNS
+from src.infrastructure.indicators.indicator_registry import compute_indicators
+from src.infrastructure.indicators.technical_indicators import add_technical_indicators
+
+
+@pytest.fixture(scope='module')
+def frames():
+    """Seeded histories of unequal lengths, two of them with flat runs of repeated bars."""
+    lengths = [5000, 4200, 700, 60, 20]
+    universe = generate_universe(len(lengths), max(lengths), seed=11)
+    result = {}
+    for (symbol, rates), length in zip(universe.items(), lengths):
+        rates = rates[-length:].copy()
+        if length >= 700:
+            # A market closed for a while: the same bar repeated, with no ticks
+            flat = slice(length // 3, length // 3 + 45)
+            for column in ('open', 'high', 'low', 'close'):
+                rates[column][flat] = rates['close'][flat.start - 1]
+            rates['tick_volume'][flat] = 0
+        result[symbol] = to_frame(rates)
+    return result
+
+
+def test_batch_matches_per_frame_indicators(frames):
+    batch = add_technical_indicators_batch(frames)
+    for symbol, frame in frames.items():
+        expected = add_technical_indicators(frame.copy())
+        assert len(batch[symbol]) == len(frame)
+        for column in INDICATOR_COLUMNS:
+            np.testing.assert_allclose(batch[symbol][column].to_numpy(), expected[column].to_numpy(),
+                                       rtol=1e-7, atol=1e-6, equal_nan=True, err_msg=f'{symbol} {column}')
+
+
+def test_flat_windows_have_zero_bollinger_std(frames):
+    batch = add_technical_indicators_batch(frames, ['BB_Std'])
+    for symbol, frame in frames.items():
+        expected = add_technical_indicators(frame.copy())['BB_Std'].to_numpy()
+        flat = expected == 0
+        if len(frame) >= 700:
+            assert flat.any()
+        assert np.array_equal(batch[symbol]['BB_Std'].to_numpy() == 0, flat), symbol
+
+
+@pytest.mark.parametrize('timeframe', [Timeframe.M1, Timeframe.M5])
+def test_historical_batch_matches_per_symbol_preparation(timeframe):
+    universe = generate_universe(3, 3000, seed=5)
+    broker = SimulatedBroker(universe, warmup_bars=2999, seed=1)
+    columns = ['RSI', 'ATR', 'ADX', 'BB_Width']
+    data_fetchers = [DataFetcher(symbol, broker=broker, indicator_columns=columns, indicator_dtype='float32') for symbol in universe]
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+
+    batch = fetch_historical_batch(data_fetchers, timeframe, start, end)
+
+    assert list(batch) == list(universe)
+    for data_fetcher in data_fetchers:
+        expected = compute_indicators(data_fetcher.fetch_historical_rates(timeframe, start, end), columns, 'float32')
+        frame = batch[data_fetcher.symbol]
+        assert list(frame.columns) == list(expected.columns)
+        assert (frame.dtypes == expected.dtypes).all()
+        for column in columns:
+            np.testing.assert_allclose(frame[column], expected[column], rtol=1e-5, equal_nan=True, err_msg=column)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.market_generator import generate_rates, to_frame
+from src.infrastructure.indicators.incremental_indicator_engine import INDICATOR_COLUMNS, IndicatorState
+from src.infrastructure.indicators.technical_indicators import add_technical_indicators
+
+
+def bars_of(frame: pd.DataFrame):
+    return frame.to_dict(orient='records')
+
+
+def assert_matches(actual: pd.DataFrame, expected: pd.DataFrame):
+    assert len(actual) == len(expected)
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(actual[column].to_numpy(dtype=np.float64), expected[column].to_numpy(dtype=np.float64),
+                                   rtol=1e-8, atol=1e-8, equal_nan=True, err_msg=column)
+
+
+@pytest.fixture(scope='module')
+def frame():
+    """Seeded M1 rates with a flat run of repeated zero-volume bars and a weekend-like time gap."""
+    rates = generate_rates(1500, seed=21)
+    flat = slice(400, 440)
+    for column in ('open', 'high', 'low', 'close'):
+        rates[column][flat] = rates['close'][flat.start - 1]
+    rates['tick_volume'][flat] = 0
+    rates['time'][900:] += 2 * 24 * 3600
+    return to_frame(rates)
+
+
+def test_full_history_matches_pandas(frame):
+    state = IndicatorState(history_size=len(frame))
+    for bar in bars_of(frame):
+        state.update(bar)
+    assert_matches(state.series(len(frame)).to_frame(), add_technical_indicators(frame.copy()))
+
+
+def test_forming_bar_is_evaluated_without_committing(frame):
+    closed, forming = frame.iloc[:1000], frame.iloc[1000]
+    state = IndicatorState(history_size=300)
+    for bar in bars_of(closed):
+        state.update(bar)
+    series = state.series(200, forming_bar=forming.to_dict())
+    expected = add_technical_indicators(frame.iloc[:1001].copy()).tail(200)
+    assert_matches(series.to_frame(), expected)
+
+    # The forming bar left the running state as it was
+    assert state.last_time == closed['time'].iloc[-1]
+    for bar in bars_of(frame.iloc[1000:1100]):
+        state.update(bar)
+    assert_matches(state.series(300).to_frame(), add_technical_indicators(frame.iloc[:1100].copy()).tail(300))
+
+
+def test_reset_starts_a_new_history(frame):
+    state = IndicatorState(history_size=500)
+    for bar in bars_of(frame.iloc[:600]):
+        state.update(bar)
+    state.reset()
+    assert state.last_time is None
+    restart = frame.iloc[880:1300].reset_index(drop=True)
+    for bar in bars_of(restart):
+        state.update(bar)
+    assert_matches(state.series(len(restart)).to_frame(), add_technical_indicators(restart.copy()))
+
+
+def test_flat_window_values(frame):
+    state = IndicatorState(history_size=len(frame))
+    for bar in bars_of(frame):
+        state.update(bar)
+    history = state.series(len(frame)).to_frame()
+    # 20 repeated closes: no band width, no true range, no momentum
+    assert (history['BB_Std'].iloc[420:440] == 0).all()
+    assert (history['TR'].iloc[401:440] == 0).all()
+    assert (history['Momentum'].iloc[404:440] == 0).all()
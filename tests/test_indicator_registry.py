@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.market_generator import generate_rates, to_frame
+from src.infrastructure.indicators.indicator_registry import INDICATORS, IndicatorRegistry, IndicatorSpec, compute_indicators
+from src.infrastructure.indicators.technical_indicators import add_technical_indicators
+
+CANDLE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume']
+
+
+@pytest.fixture(scope='module')
+def frame() -> pd.DataFrame:
+    return to_frame(generate_rates(1500, seed=8, exchange_volume=True))
+
+
+@pytest.fixture(scope='module')
+def full(frame) -> pd.DataFrame:
+    return add_technical_indicators(frame.copy())
+
+
+def test_add_technical_indicators_returns_every_registered_column(full):
+    assert list(full.columns) == CANDLE_COLUMNS + INDICATORS.columns
+    assert not any(column.startswith('_') for column in full.columns)
+
+
+@pytest.mark.parametrize('column', INDICATORS.columns)
+def test_single_column_equals_the_full_computation(frame, full, column):
+    subset = compute_indicators(frame, [column])
+
+    assert list(subset.columns) == CANDLE_COLUMNS + [column]
+    pd.testing.assert_series_equal(subset[column], full[column], check_exact=True)
+
+
+def test_subset_keeps_registry_order_and_values(frame, full):
+    columns = ['OBV', 'ATR', 'BB_Width', 'RSI', 'ADX']
+    subset = compute_indicators(frame, columns)
+
+    assert list(subset.columns) == CANDLE_COLUMNS + [column for column in INDICATORS.columns if column in columns]
+    pd.testing.assert_frame_equal(subset, full[subset.columns], check_exact=True)
+
+
+def test_dtype_applies_to_indicators_only(frame, full):
+    subset = compute_indicators(frame, ['SMA_20', 'ATR'], dtype='float32')
+
+    assert subset['close'].dtype == np.float64
+    assert subset['SMA_20'].dtype == subset['ATR'].dtype == np.float32
+    np.testing.assert_allclose(subset['ATR'], full['ATR'].astype('float32'))
+
+
+def test_atr_and_adx_share_the_true_range(frame, monkeypatch):
+    spec = INDICATORS._producers['TR']
+    calls = []
+
+    def counted(*args):
+        calls.append(len(args[0]))
+        return spec.compute(*args)
+
+    monkeypatch.setitem(INDICATORS._producers, 'TR', IndicatorSpec(spec.outputs, spec.inputs, counted))
+    compute_indicators(frame, ['ATR', 'ADX'])
+    assert calls == [len(frame)]
+
+    indicators = INDICATORS.evaluate(frame)
+    indicators['ATR']
+    evaluations = indicators.evaluations
+    indicators['ADX']
+    # Only ADX itself is evaluated for the second column
+    assert indicators.evaluations == evaluations + 1
+    assert len(calls) == 2
+
+
+def test_unsorted_rates_are_sorted_first(frame, full):
+    shuffled = frame.sample(frac=1, random_state=1)
+    pd.testing.assert_frame_equal(compute_indicators(shuffled, ['MACD', 'Momentum']), full[CANDLE_COLUMNS + ['MACD', 'Momentum']])
+
+
+def test_registering_a_column_twice_fails():
+    registry = IndicatorRegistry()
+    registry.register(['A'], ['close'])(lambda close: close)
+
+    with pytest.raises(ValueError):
+        registry.register(['A'], ['close'])(lambda close: close)
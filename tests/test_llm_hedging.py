@@ -0,0 +1,97 @@
+import json
+import time
+from src.infrastructure.external_services.llm_api_client import LLMApiClient
+from src.infrastructure.external_services.llm_response_cache import LLMResponseCache
+
+BUY = "Signal: Buy\nExplanation: Higher lows.\nStop Loss: 60100\nTake Profit: 60500\n"
+SELL = "Signal: Sell\nExplanation: Lower highs.\nStop Loss: 60500\nTake Profit: 60100\n"
+NONE = "Insufficient data to make a trading decision."
+# Commentary before the decision, so a slow request is still streaming when the other one wins
+PREAMBLE = "Looking at the candles in detail before deciding. " * 20
+
+
+def _client(llm_server, **kwargs) -> LLMApiClient:
+    client = LLMApiClient(llm_server.url, 'test-key', streaming=False, structured_output=False, latency_budget=10.0, hedging=True, **kwargs)
+    client.latency_slo.default_hedge_delay = 0.3
+    return client
+
+
+def _wait_for_streams(llm_server, count: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while llm_server.streams_completed + llm_server.streams_aborted < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fast_answer_needs_no_hedge(llm_server, windows):
+    llm_server.replies = [(0.0, BUY)]
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response['signal'] == 'buy'
+    assert client.hedges == 0
+    assert len(llm_server.requests) == 1
+
+
+def test_unusable_hedge_answer_waits_for_the_valid_one(llm_server, windows):
+    # The primary is slow but valid, the hedge answers at once with no decision
+    llm_server.replies = [(0.8, BUY), (0.0, NONE)]
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response['signal'] == 'buy'
+    assert client.hedges == 1
+    assert client.hedge_wins == 0
+
+
+def test_answer_on_the_wrong_side_does_not_win(llm_server, windows):
+    llm_server.replies = [(0.8, BUY), (0.0, SELL)]
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0], allowed_side='buy'))
+
+    assert response['signal'] == 'buy'
+    assert client.hedge_wins == 0
+
+
+def test_losing_request_is_cancelled(llm_server, windows):
+    llm_server.replies = [(0.5, PREAMBLE + BUY), (0.0, SELL)]
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response['signal'] == 'sell'
+    assert client.hedge_wins == 1
+    _wait_for_streams(llm_server, 2)
+    assert llm_server.streams_aborted == 1
+    assert len(client.latency_slo._request_latencies) == 1
+
+
+def test_both_unusable_returns_an_answer(llm_server, windows):
+    llm_server.replies = [(0.6, NONE), (0.0, NONE)]
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response['signal'] == 'none'
+
+
+def test_hedge_answer_is_cached_under_the_model_that_gave_it(llm_server, windows, tmp_path):
+    llm_server.replies = [(0.8, PREAMBLE + BUY), (0.0, SELL)]
+    cache = LLMResponseCache(str(tmp_path / 'cache.sqlite'))
+    client = _client(llm_server, model='primary', hedge_model='hedge', cache=cache)
+
+    response = client.get_trading_decision(*windows[0])
+    prompt = client._generate_prompt(*windows[0])
+    params = client._request_params()
+
+    assert client.hedge_wins == 1
+    assert cache.lookup('hedge', prompt, params) == response
+    assert cache.lookup('primary', prompt, params) is None
+
+
+def test_hedging_is_off_by_default(llm_server):
+    client = LLMApiClient(llm_server.url, 'test-key')
+
+    assert not client.hedging
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from src.infrastructure.external_services.llm_response_cache import (
+    CACHE_MODE_READ_THROUGH, CACHE_MODE_RECORD_ONLY, CACHE_MODE_REPLAY_ONLY, CacheMissError, LLMResponseCache,
+)
+
+PARAMS = {'temperature': 0.0}
+
+
+def make_cache(tmp_path, mode: str = CACHE_MODE_READ_THROUGH, max_bytes: int = 1 << 20) -> LLMResponseCache:
+    return LLMResponseCache(str(tmp_path / 'cache.sqlite'), max_bytes=max_bytes, mode=mode)
+
+
+class Calls:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self) -> str:
+        self.count += 1
+        return f'answer {self.count}'
+
+
+def test_read_through_calls_once_per_prompt(tmp_path):
+    cache, call = make_cache(tmp_path), Calls()
+    assert cache.get_or_call('m', 'prompt', PARAMS, call) == 'answer 1'
+    assert cache.get_or_call('m', 'prompt', PARAMS, call) == 'answer 1'
+    # Model and parameters are part of the key
+    assert cache.get_or_call('other', 'prompt', PARAMS, call) == 'answer 2'
+    assert cache.get_or_call('m', 'prompt', {'temperature': 0.5}, call) == 'answer 3'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+
+
+def test_record_only_always_calls_and_stores(tmp_path):
+    recorder, call = make_cache(tmp_path, CACHE_MODE_RECORD_ONLY), Calls()
+    assert recorder.get_or_call('m', 'prompt', PARAMS, call) == 'answer 1'
+    assert recorder.get_or_call('m', 'prompt', PARAMS, call) == 'answer 2'
+    assert recorder.stats()['hits'] == 0 and recorder.stats()['misses'] == 2
+    # The latest answer is what a later run replays
+    replay = make_cache(tmp_path, CACHE_MODE_REPLAY_ONLY)
+    assert replay.get_or_call('m', 'prompt', PARAMS, call) == 'answer 2'
+    assert call.count == 2
+
+
+def test_replay_only_never_calls(tmp_path):
+    cache, call = make_cache(tmp_path, CACHE_MODE_REPLAY_ONLY), Calls()
+    with pytest.raises(CacheMissError):
+        cache.get_or_call('m', 'prompt', PARAMS, call)
+
+    async def call_async():
+        return call()
+
+    with pytest.raises(CacheMissError):
+        asyncio.run(cache.get_or_call_async('m', 'prompt', PARAMS, call_async))
+    assert call.count == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=30)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key * 10)
+    assert cache.get('a') == 'a' * 10
+    cache.put('d', 'd' * 10)
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['a' * 10, 'c' * 10, 'd' * 10]
+    assert cache.total_bytes == 30
+
+    # Replacing an entry counts its new size only, and sizes survive a reopen
+    cache.put('a', 'a' * 5)
+    assert make_cache(tmp_path, max_bytes=30).total_bytes == 25
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        make_cache(tmp_path, 'sometimes')
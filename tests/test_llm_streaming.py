@@ -0,0 +1,111 @@
+import json
+import time
+import pytest
+from src.infrastructure.external_services.decision_parser import DecisionParser, STREAM_COMPLETE, StreamingDecisionParser
+from src.infrastructure.external_services.llm_api_client import LLMApiClient
+
+# Sent after the decision; a client that stops reading early never receives it
+TAIL = "\n" + "Additional commentary the client should never wait for. " * 20
+
+
+def _client(llm_server, structured_output: bool = False) -> LLMApiClient:
+    return LLMApiClient(llm_server.url, 'test-key', streaming=True, structured_output=structured_output, latency_budget=0)
+
+
+def _wait_for_stream_end(llm_server, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while llm_server.streams_completed + llm_server.streams_aborted == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_text_answer_completes_early(llm_server, windows):
+    llm_server.content = "Signal: Buy\nExplanation: Price holds above the rising SMA.\nStop Loss: 60,120.50\nTake Profit: $60,480.25\n" + TAIL
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response == {'signal': 'buy', 'stop_loss': 60120.5, 'take_profit': 60480.25, 'explanation': 'Price holds above the rising SMA.'}
+    timing = client.stream_timings[-1]
+    assert timing['status'] == 'complete'
+    assert 0 < timing['ttft'] <= timing['time_to_decision']
+    _wait_for_stream_end(llm_server)
+    assert llm_server.streams_aborted == 1
+
+
+def test_json_answer_keeps_the_explanation(llm_server, windows):
+    decision = {'signal': 'sell', 'explanation': 'Lower highs and "ADX" above 25.', 'stop_loss': 60400.0, 'take_profit': 59800.5}
+    llm_server.content = json.dumps(decision) + TAIL
+    client = _client(llm_server, structured_output=True)
+
+    response = json.loads(client.get_trading_decision(*windows[0], allowed_side='sell'))
+
+    assert response == decision
+    assert llm_server.requests[-1]['response_format']['json_schema']['schema']['required'][1] == 'explanation'
+
+
+def test_signal_outside_the_allowed_side_aborts(llm_server, windows):
+    llm_server.content = "Signal: Sell\nExplanation: Downtrend.\nStop Loss: 60400\nTake Profit: 59800\n" + TAIL
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0], allowed_side='buy'))
+
+    assert response['signal'] == 'none'
+    assert response['stop_loss'] is None and response['take_profit'] is None
+    timing = client.stream_timings[-1]
+    assert timing['status'] == 'unusable'
+    assert 'outside the admissible side' in timing['reason']
+    _wait_for_stream_end(llm_server)
+    assert llm_server.streams_aborted == 1
+
+
+def test_insufficient_data_aborts(llm_server, windows):
+    llm_server.content = "Insufficient data to make a trading decision." + TAIL
+    client = _client(llm_server)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert response['signal'] == 'none'
+    assert client.stream_timings[-1]['reason'] == 'insufficient data'
+
+
+def test_undecided_answer_is_returned_whole(llm_server, windows):
+    llm_server.content = "The market is choppy, I would rather wait."
+    client = _client(llm_server)
+
+    assert client.get_trading_decision(*windows[0]) == llm_server.content
+    assert client.stream_timings[-1]['status'] == 'pending'
+    _wait_for_stream_end(llm_server)
+    assert llm_server.streams_completed == 1
+
+
+QUOTING_EXPLANATION = "A stop loss: 100 would be too tight, take profit: 200 too far; keep the ATR multiples."
+QUOTING_ANSWERS = [
+    json.dumps({'signal': 'buy', 'explanation': QUOTING_EXPLANATION, 'stop_loss': 59850, 'take_profit': 60300}),
+    f"Signal: Buy\nExplanation: {QUOTING_EXPLANATION}\nStop Loss: 59850\nTake Profit: 60300\n",
+]
+
+
+@pytest.mark.parametrize('answer', QUOTING_ANSWERS, ids=['json', 'text'])
+def test_prices_quoted_in_the_explanation_are_not_the_decision(answer):
+    expected = {'signal': 'buy', 'stop_loss': 59850.0, 'take_profit': 60300.0, 'explanation': QUOTING_EXPLANATION}
+    parser = StreamingDecisionParser()
+    for start in range(0, len(answer), 3):
+        if parser.feed(answer[start:start + 3]) != 'pending':
+            break
+    assert parser.status == STREAM_COMPLETE
+    assert len(parser.buffer) > answer.index('60300')
+    assert parser.decision == expected
+
+    assert DecisionParser().parse(answer) == expected
+    # The regex fallback, as for a JSON answer cut off before its closing brace
+    assert DecisionParser._parse_text(answer) == expected
+
+
+def test_streamed_answer_quoting_prices_completes_on_the_real_ones(llm_server, windows):
+    llm_server.content = QUOTING_ANSWERS[0] + TAIL
+    client = _client(llm_server, structured_output=True)
+
+    response = json.loads(client.get_trading_decision(*windows[0]))
+
+    assert (response['stop_loss'], response['take_profit']) == (59850.0, 60300.0)
+    assert response['explanation'] == QUOTING_EXPLANATION
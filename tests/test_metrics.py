@@ -0,0 +1,47 @@
+from benchmarks.market_generator import generate_rates
+from src.application.trading_service import TradingService
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
+from src.infrastructure.monitoring.metrics import Metrics
+
+
+def test_prometheus_escapes_label_values():
+    metrics = Metrics()
+    metrics.inc('orders_total', symbol='A"B\\C\nD')
+    assert 'orders_total{symbol="A\\"B\\\\C\\nD"} 1.0' in metrics.prometheus().splitlines()
+
+
+def test_collectors_export_their_labels():
+    metrics = Metrics()
+    metrics.register_collector('decisions', lambda: {'invalid': 2, 'model': 'text'}, symbol='BTCUSD')
+    metrics.register_collector('decisions', lambda: {'invalid': 5}, symbol='ETHUSD')
+    lines = metrics.prometheus().splitlines()
+    assert lines.count('# TYPE trading_decisions_invalid gauge') == 1
+    assert 'trading_decisions_invalid{symbol="BTCUSD"} 2.0' in lines
+    assert 'trading_decisions_invalid{symbol="ETHUSD"} 5.0' in lines
+    collected = {entry['labels']['symbol']: entry['values'] for entry in metrics.snapshot()['collected']}
+    assert collected == {'BTCUSD': {'invalid': 2, 'model': 'text'}, 'ETHUSD': {'invalid': 5}}
+
+
+def test_prometheus_keeps_each_metric_family_together():
+    metrics = Metrics()
+    for symbol in ('A', 'B', 'C'):
+        metrics.register_collector('decisions', lambda: {'invalid': 1, 'valid': 2}, symbol=symbol)
+    lines = metrics.prometheus().splitlines()
+
+    names = [line.split()[2] if line.startswith('# TYPE') else line.split('{')[0] for line in lines]
+    families = [name for i, name in enumerate(names) if i == 0 or name != names[i - 1]]
+    assert families == ['trading_decisions_invalid', 'trading_decisions_valid']
+    assert lines[0] == '# TYPE trading_decisions_invalid gauge'
+    assert lines[4] == '# TYPE trading_decisions_valid gauge'
+
+
+def test_trading_service_components_report_to_its_metrics():
+    metrics = Metrics()
+    broker = SimulatedBroker({'BTCUSD': generate_rates(500, seed=3)})
+    service = TradingService(['BTCUSD'], broker=broker, metrics=metrics)
+    trading_module = service.trading_modules['BTCUSD']
+    assert service.data_fetchers['BTCUSD'].metrics is metrics
+    assert trading_module.metrics is metrics
+    assert trading_module.api_client.metrics is metrics
+    names = {(entry['name'], entry['labels'].get('symbol')) for entry in metrics.snapshot()['collected']}
+    assert ('decisions', 'BTCUSD') in names and ('llm_stream', 'BTCUSD') in names
@@ -0,0 +1,180 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from src.infrastructure.brokers.mt5_session import (
+    BrokerConnectionError, MT5Session, STATE_CIRCUIT_OPEN, STATE_CONNECTED,
+)
+
+
+class FakeMT5:
+    """In-process stand-in for the MetaTrader5 module functions the session uses."""
+
+    def __init__(self):
+        # Results of the next initialize() calls, True once exhausted
+        self.initialize_results = []
+        self.connected = True
+        self.calls = []
+
+    def initialize(self):
+        self.calls.append('initialize')
+        return self.initialize_results.pop(0) if self.initialize_results else True
+
+    def login(self, login, password, server):
+        self.calls.append('login')
+        return True
+
+    def shutdown(self):
+        self.calls.append('shutdown')
+
+    def last_error(self):
+        return (-10004, 'No IPC connection')
+
+    def terminal_info(self):
+        self.calls.append('terminal_info')
+        return SimpleNamespace(connected=self.connected)
+
+    def account_info(self):
+        self.calls.append('account_info')
+        return SimpleNamespace(balance=1000.0) if self.connected else None
+
+    def count(self, name: str) -> int:
+        return self.calls.count(name)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def fake():
+    return FakeMT5()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_session(fake, clock, **kwargs) -> MT5Session:
+    settings = dict(login=1, password='p', server='s', max_attempts=4, backoff_base=1, backoff_max=3,
+                    failure_threshold=6, circuit_cooldown=120, health_check_interval=10)
+    settings.update(kwargs)
+    return MT5Session(fake, clock=clock, sleep=clock.sleep, **settings)
+
+
+def test_logs_in_once_and_skips_health_checks_after_recent_calls(fake, clock):
+    session = make_session(fake, clock)
+    session.ensure_connection()
+    for _ in range(5):
+        clock.now += 4
+        assert session.account_info().balance == 1000.0
+        session.ensure_connection()
+    assert (fake.count('initialize'), fake.count('login'), fake.count('terminal_info')) == (1, 1, 0)
+    assert session.state == STATE_CONNECTED
+
+
+def test_health_check_runs_once_the_last_call_is_old(fake, clock):
+    session = make_session(fake, clock)
+    session.ensure_connection()
+    clock.now += 11
+    session.ensure_connection()
+    session.ensure_connection()
+    assert fake.count('terminal_info') == 1
+    assert fake.count('login') == 1
+
+
+def test_reconnects_when_the_terminal_drops(fake, clock):
+    session = make_session(fake, clock)
+    session.ensure_connection()
+    fake.connected = False
+    # A failed call invalidates the health cache at once, so the next check sees the drop
+    assert session.account_info() is None
+    fake.initialize_results = [False]
+    session.ensure_connection()
+    assert fake.count('terminal_info') == 1
+    assert fake.count('initialize') == 3
+    assert clock.sleeps == [1]
+    assert session.state == STATE_CONNECTED
+    assert session.metrics()['reconnects'] == 1
+    assert session.metrics()['health_checks'] == 1
+
+
+def test_backoff_doubles_up_to_the_maximum(fake, clock):
+    session = make_session(fake, clock, failure_threshold=10)
+    fake.initialize_results = [False, False, False, False]
+    with pytest.raises(BrokerConnectionError):
+        session.ensure_connection()
+    assert clock.sleeps == [1, 2, 3]
+    assert fake.count('initialize') == 4
+
+    fake.initialize_results = [False, False]
+    session.ensure_connection()
+    assert clock.sleeps == [1, 2, 3, 1, 2]
+    assert session.state == STATE_CONNECTED
+
+
+def test_circuit_opens_then_lets_one_attempt_through(fake, clock):
+    session = make_session(fake, clock, failure_threshold=3)
+    fake.initialize_results = [False] * 10
+    with pytest.raises(BrokerConnectionError):
+        session.ensure_connection()
+    assert session.state == STATE_CIRCUIT_OPEN
+    assert fake.count('initialize') == 3
+
+    # Open: fails fast without touching the terminal
+    clock.now += 60
+    with pytest.raises(BrokerConnectionError, match='circuit open'):
+        session.ensure_connection()
+    assert fake.count('initialize') == 3
+
+    # Half-open: one attempt, which fails and reopens the circuit
+    clock.now += 60
+    with pytest.raises(BrokerConnectionError):
+        session.ensure_connection()
+    assert fake.count('initialize') == 4
+    assert session.state == STATE_CIRCUIT_OPEN
+
+    fake.initialize_results = []
+    clock.now += 120
+    session.ensure_connection()
+    assert session.state == STATE_CONNECTED
+    assert session.metrics() == {
+        'state': STATE_CONNECTED, 'connects': 1, 'reconnects': 0, 'failed_attempts': 4,
+        'consecutive_failures': 0, 'health_checks': 0,
+    }
+
+
+def test_backoff_does_not_hold_the_session_lock(fake, clock):
+    session = make_session(fake, clock)
+    fake.initialize_results = [False]
+    outcomes = {}
+
+    def from_other_thread(name, function):
+        def run():
+            try:
+                outcomes[name] = function()
+            except BrokerConnectionError as e:
+                outcomes[name] = e
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(timeout=2)
+        assert not thread.is_alive(), f'{name} blocked behind the backoff'
+
+    def sleep(seconds):
+        from_other_thread('call', session.account_info)
+        from_other_thread('ensure', session.ensure_connection)
+
+    session.sleep = sleep
+    session.ensure_connection()
+    assert outcomes['call'].balance == 1000.0
+    assert isinstance(outcomes['ensure'], BrokerConnectionError)
+    assert session.state == STATE_CONNECTED
@@ -0,0 +1,56 @@
+import numpy as np
+from benchmarks.market_generator import generate_rates, to_frame
+from src.infrastructure.external_services.prompt_encoder import CompactTablePromptEncoder, price_decimals
+from src.infrastructure.indicators.indicator_registry import compute_indicators
+
+
+def _window(price: float, point: float):
+    return compute_indicators(to_frame(generate_rates(300, seed=3, price=price, volatility=0.0002, point=point))).tail(50)
+
+
+def _rows(text: str):
+    lines = text.splitlines()
+    header = lines[0].split(',')
+    return [dict(zip(header, line.split(','))) for line in lines[1:]]
+
+
+def test_price_decimals_follow_the_quotes():
+    assert price_decimals(np.array([1.08512, 1.0853, 1.08])) == 5
+    assert price_decimals(np.array([60012.25, 60013.5])) == 2
+    assert price_decimals(np.array([155.123, 155.2])) == 3
+    assert price_decimals(np.array([5012.0, 5013.0])) == 0
+
+
+def test_fx_prices_keep_their_pips():
+    data = _window(1.085, 0.00001)
+    rows = _rows(CompactTablePromptEncoder().encode(data))
+
+    closes = [row['close'] for row in rows]
+    assert len(set(closes)) > 10
+    assert all(len(close.split('.')[1]) == 5 for close in closes)
+    np.testing.assert_allclose([float(close) for close in closes], data['close'].to_numpy(), atol=5e-6)
+
+
+def test_small_indicators_never_round_to_zero():
+    data = _window(1.085, 0.00001)
+    rows = _rows(CompactTablePromptEncoder().encode(data))
+
+    for column in ['ATR', 'MACD']:
+        written = np.array([float(row[column]) for row in rows])
+        expected = data[column].to_numpy()
+        assert np.all((written != 0) == (expected != 0))
+        np.testing.assert_allclose(written, expected, rtol=1e-3)
+
+
+def test_relative_prices_use_the_same_decimals():
+    data = _window(60000.0, 0.01)
+    text = CompactTablePromptEncoder(relative_prices=True).encode(data)
+
+    assert text.splitlines()[0] == f"last_close={data['close'].iloc[-1]:.2f}"
+    assert _rows('\n'.join(text.splitlines()[1:]))[-1]['close'] == '+0.00'
+
+
+def test_fixed_precision_still_applies():
+    data = _window(60000.0, 0.01)
+    rows = _rows(CompactTablePromptEncoder(precision=1).encode(data))
+    assert all(len(row['close'].split('.')[1]) == 1 for row in rows)
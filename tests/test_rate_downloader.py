@@ -0,0 +1,176 @@
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pytest
+from benchmarks.market_generator import generate_rates
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import TIMEFRAME_H1, TIMEFRAME_M1
+from src.infrastructure.data_providers.candle_store import to_epoch
+from src.infrastructure.data_providers.rate_downloader import RateDownloader, to_datetime
+
+
+class FakeHistory:
+    """
+    copy_rates_range over fixed rates with a latency per call. `failures` lists results for the first
+    calls ('error' raises, None answers None); `dead` is a range of epochs whose requests always fail.
+    `overlap` bars beyond each end of the requested range are returned as well, like brokers that
+    include the bar straddling a boundary.
+    """
+
+    def __init__(self, rates: np.ndarray, latency: float = 0.0, failures=(), dead=None, overlap: int = 0, period: int = 60):
+        self.rates = rates
+        self.latency = latency
+        self.failures = list(failures)
+        self.dead = dead
+        self.overlap = overlap
+        self.period = period
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        start, end = to_epoch(date_from), to_epoch(date_to)
+        with self._lock:
+            self.calls.append((timeframe, start, end))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failure = self.failures.pop(0) if self.failures else 'ok'
+        try:
+            time.sleep(self.latency)
+            if failure == 'error':
+                raise RuntimeError('terminal busy')
+            if failure is None or (self.dead is not None and self.dead[0] <= start <= self.dead[1]):
+                return None
+            times = self.rates['time']
+            lo = np.searchsorted(times, start - self.overlap * self.period, side='left')
+            hi = np.searchsorted(times, end + self.overlap * self.period, side='right')
+            return self.rates[lo:hi].copy()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_downloader(history: FakeHistory, **kwargs) -> RateDownloader:
+    settings = dict(workers=4, bars_per_request=500, max_retries=3, retry_delay=0.0, sleep=lambda seconds: None)
+    settings.update(kwargs)
+    return RateDownloader(history.copy_rates_range, **settings)
+
+
+def span(rates: np.ndarray):
+    return to_datetime(int(rates['time'][0])), to_datetime(int(rates['time'][-1]))
+
+
+def test_chunks_are_fetched_in_parallel():
+    rates = generate_rates(6000, seed=1)
+    history = FakeHistory(rates, latency=0.02)
+
+    result, failed = make_downloader(history).download('TEST', Timeframe.M1, *span(rates))
+
+    assert not failed
+    np.testing.assert_array_equal(result, rates)
+    assert history.max_active == 4
+    assert all(timeframe == TIMEFRAME_M1 for timeframe, _, _ in history.calls)
+    # Chunks tile the range without gaps or overlaps
+    requested = sorted((start, end) for _, start, end in history.calls)
+    assert all(previous[1] + 1 == current[0] for previous, current in zip(requested, requested[1:]))
+
+
+def test_chunk_spans_adapt_to_sparse_data():
+    # One bar in four minutes, as a thin market with many empty minutes
+    rates = generate_rates(20_000, seed=2)[::4]
+    history = FakeHistory(rates)
+    downloader = make_downloader(history, workers=1)
+
+    result, failed = downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    assert not failed
+    np.testing.assert_array_equal(result, rates)
+    bars = [np.count_nonzero((rates['time'] >= start) & (rates['time'] <= end)) for _, start, end in history.calls]
+    # The first chunk assumes dense data, the next ones stretch to about bars_per_request bars
+    assert bars[0] == 125
+    assert all(abs(count - 500) <= 1 for count in bars[1:-1])
+    assert downloader.last_report.chunks == len(history.calls) < len(rates) // 125
+
+
+def test_stretch_is_capped_over_empty_ranges():
+    rates = generate_rates(3000, seed=3)
+    rates = np.concatenate([rates[:1000], rates[2800:]])
+    history = FakeHistory(rates)
+    downloader = make_downloader(history, workers=1, bars_per_request=100)
+
+    result, _ = downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    np.testing.assert_array_equal(result, rates)
+    widths = [(end - start + 1) // 60 for _, start, end in history.calls]
+    assert max(widths) <= 100 * RateDownloader.MAX_STRETCH
+
+
+def test_overlapping_chunk_boundaries_are_deduplicated():
+    rates = generate_rates(3000, seed=4)
+    history = FakeHistory(rates, overlap=2)
+    downloader = make_downloader(history)
+
+    result, failed = downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    assert not failed
+    np.testing.assert_array_equal(result, rates)
+    assert np.all(np.diff(result['time']) > 0)
+    report = downloader.last_report
+    # Bars past the requested range are dropped; inside it each inner boundary is returned twice on both sides
+    assert report.duplicates == 4 * (report.chunks - 1)
+
+
+def test_failed_requests_are_retried():
+    rates = generate_rates(2000, seed=5)
+    history = FakeHistory(rates, failures=['error', None, 'ok', 'error'])
+    delays = []
+    downloader = make_downloader(history, workers=1, sleep=delays.append, retry_delay=0.5)
+
+    result, failed = downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    assert not failed
+    np.testing.assert_array_equal(result, rates)
+    report = downloader.last_report
+    assert report.retries == 3
+    assert report.requests == report.chunks + 3
+    assert delays == [0.5, 0.5, 0.5]
+
+
+def test_a_chunk_failing_every_attempt_is_reported():
+    rates = generate_rates(2000, seed=6)
+    dead = (int(rates['time'][600]), int(rates['time'][1099]))
+    history = FakeHistory(rates, dead=dead)
+    downloader = make_downloader(history, workers=2)
+
+    result, failed = downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    assert failed
+    assert downloader.last_report.failed_chunks >= 1
+    missing = np.setdiff1d(rates['time'], result['time'])
+    assert len(missing) and missing.min() >= dead[0]
+    assert np.all(np.isin(result['time'], rates['time']))
+
+
+def test_report_measures_bars_per_second():
+    rates = generate_rates(1500, seed=7)
+    ticks = iter([100.0, 102.5])
+    downloader = make_downloader(FakeHistory(rates), clock=lambda: next(ticks))
+
+    downloader.download('TEST', Timeframe.M1, *span(rates))
+
+    report = downloader.last_report
+    assert report.bars == 1500
+    assert report.seconds == 2.5
+    assert report.bars_per_second == pytest.approx(600)
+
+
+def test_hourly_requests_use_the_mt5_constant():
+    rates = generate_rates(500, seed=8, timeframe_minutes=60)
+    history = FakeHistory(rates, period=3600)
+
+    result, _ = make_downloader(history).download('TEST', Timeframe.H1, datetime(2024, 1, 1), to_datetime(int(rates['time'][-1])))
+
+    np.testing.assert_array_equal(result, rates)
+    assert {timeframe for timeframe, _, _ in history.calls} == {TIMEFRAME_H1}
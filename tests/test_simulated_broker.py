@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from benchmarks.market_generator import generate_rates
+from src.infrastructure.brokers.broker_gateway import (
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL, TRADE_ACTION_DEAL, TRADE_RETCODE_DONE, TRADE_RETCODE_INVALID_VOLUME,
+    TRADE_RETCODE_NO_MONEY, TRADE_RETCODE_REQUOTE,
+)
+from src.infrastructure.brokers.simulated_broker import SimulatedBroker
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE
+from src.infrastructure.data_providers.timeframe_resampler import aggregate_rates
+
+START = 1_704_067_200  # 2024-01-01 00:00 UTC
+POINT = 0.01
+SPREAD = 5 * POINT
+
+
+def make_rates(bars) -> np.ndarray:
+    """M1 rates from (open, high, low, close) tuples, one minute apart."""
+    rates = np.zeros(len(bars), dtype=RATE_DTYPE)
+    rates['time'] = START + 60 * np.arange(len(bars))
+    for i, (open_, high, low, close) in enumerate(bars):
+        rates[i] = (rates['time'][i], open_, high, low, close, 10, 5, 0)
+    return rates
+
+
+def make_broker(bars, **kwargs) -> SimulatedBroker:
+    settings = dict(initial_balance=10_000, spread_points=5, slippage_points=0, point=POINT, leverage=100, warmup_bars=0, seed=1)
+    settings.update(kwargs)
+    return SimulatedBroker({'TEST': make_rates(bars)}, **settings)
+
+
+def order(side: int, volume: float = 0.1, **fields):
+    return {'action': TRADE_ACTION_DEAL, 'symbol': 'TEST', 'type': side, 'volume': volume, **fields}
+
+
+FLAT = (100.0, 100.2, 99.8, 100.0)
+
+
+def test_fills_at_the_bar_open_on_the_right_side_of_the_spread():
+    broker = make_broker([FLAT] * 3)
+    buy = broker.order_send(order(ORDER_TYPE_BUY))
+    sell = broker.order_send(order(ORDER_TYPE_SELL))
+    assert buy.retcode == sell.retcode == TRADE_RETCODE_DONE
+    assert buy.price == pytest.approx(100.0 + SPREAD)
+    assert sell.price == pytest.approx(100.0)
+    # Marked where they would close: the buy on the bid, the sell on the ask
+    positions = {position.ticket: position for position in broker.positions_get('TEST')}
+    assert positions[buy.order].profit == pytest.approx(-SPREAD * 0.1 / POINT)
+    assert positions[sell.order].profit == pytest.approx(-SPREAD * 0.1 / POINT)
+
+
+def test_slippage_is_adverse_and_bounded():
+    broker = make_broker([FLAT] * 3, slippage_points=3)
+    for _ in range(50):
+        buy = broker.order_send(order(ORDER_TYPE_BUY, 0.01))
+        sell = broker.order_send(order(ORDER_TYPE_SELL, 0.01))
+        assert 100.0 + SPREAD <= buy.price <= 100.0 + SPREAD + 3 * POINT
+        assert 100.0 - 3 * POINT <= sell.price <= 100.0
+
+
+def test_stops_and_targets_trigger_on_the_bar_range():
+    broker = make_broker([FLAT, (100.0, 100.5, 99.6, 100.1), (100.1, 101.2, 100.0, 101.0), FLAT])
+    target = broker.order_send(order(ORDER_TYPE_BUY, sl=99.5, tp=101.0)).order
+    stop = broker.order_send(order(ORDER_TYPE_SELL, sl=100.5, tp=98.0)).order
+    # Levels are checked as each bar closes, from the bar the orders filled in
+    broker.advance()
+    assert broker.closed_positions == []
+    broker.advance()
+    # The sell stops out once the ask (high + spread) reaches its stop loss
+    closed = {trade['ticket']: trade for trade in broker.closed_positions}
+    assert list(closed) == [stop]
+    assert closed[stop]['reason'] == 'sl' and closed[stop]['price_close'] == 100.5
+
+    broker.advance()
+    closed = {trade['ticket']: trade for trade in broker.closed_positions}
+    assert closed[target]['reason'] == 'tp' and closed[target]['price_close'] == 101.0
+    assert closed[target]['time_close'] == START + 120
+    assert broker.positions_get() == ()
+
+
+def test_stop_loss_wins_a_bar_that_touches_both_and_gaps_fill_at_the_open():
+    broker = make_broker([FLAT, (100.0, 101.5, 98.5, 100.0), FLAT, (97.0, 97.5, 96.5, 97.0), FLAT])
+    both = broker.order_send(order(ORDER_TYPE_BUY, sl=99.0, tp=101.0)).order
+    broker.advance(2)
+    gap = broker.order_send(order(ORDER_TYPE_BUY, sl=99.0, tp=103.0)).order
+    broker.advance(2)
+    closed = {trade['ticket']: trade for trade in broker.closed_positions}
+    assert closed[both]['reason'] == 'sl' and closed[both]['price_close'] == 99.0
+    # Opened below the stop: filled at the open, worse than the stop
+    assert closed[gap]['reason'] == 'sl' and closed[gap]['price_close'] == 97.0
+    assert broker.balance == pytest.approx(10_000 + sum(trade['profit'] for trade in broker.closed_positions))
+
+
+def test_rejects_requotes_invalid_volume_and_missing_margin():
+    broker = make_broker([FLAT] * 3, initial_balance=100)
+    assert broker.order_send(order(ORDER_TYPE_BUY, price=99.0, deviation=10)).retcode == TRADE_RETCODE_REQUOTE
+    assert broker.order_send(order(ORDER_TYPE_BUY, volume=500)).retcode == TRADE_RETCODE_INVALID_VOLUME
+    assert broker.order_send(order(ORDER_TYPE_BUY, volume=5)).retcode == TRADE_RETCODE_NO_MONEY
+    assert broker.metrics()['rejected_orders'] == 3 and broker.positions_get() == ()
+
+
+def test_higher_timeframes_show_only_what_is_known():
+    rates = generate_rates(300, seed=4)
+    broker = SimulatedBroker({'TEST': rates}, warmup_bars=0)
+    broker.advance(137)
+    five = broker.copy_rates_from_pos('TEST', 5, 0, 10)
+    closed = aggregate_rates(rates[:135], 5)
+    assert np.array_equal(five[:-1], closed[-9:])
+    # The forming M5 bar holds the two closed M1 bars and the open of the forming one
+    known = rates[135:137]
+    opening = rates['open'][137]
+    assert five[-1]['time'] == rates['time'][135]
+    assert five[-1]['open'] == known['open'][0]
+    assert five[-1]['high'] == max(known['high'].max(), opening)
+    assert five[-1]['low'] == min(known['low'].min(), opening)
+    assert five[-1]['close'] == opening
+    assert five[-1]['tick_volume'] == known['tick_volume'].sum()
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+import numpy as np
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.brokers.broker_gateway import BrokerGateway, TICK_DTYPE, TICK_FLAG_VOLUME
+from src.infrastructure.data_providers.tick_collector import TickCollector
+
+START_MSC = 1_700_000_040_000
+
+
+class TickBroker(BrokerGateway):
+    """Serves a fixed tick history, revealed up to `now_msc`, through copy_ticks_from."""
+
+    def __init__(self, ticks: np.ndarray):
+        self.ticks = ticks
+        self.now_msc = int(ticks['time_msc'][0])
+        self.failing = False
+
+    def last_error(self):
+        return (1, 'test')
+
+    def symbol_info(self, symbol):
+        return SimpleNamespace(point=0.01)
+
+    def _visible(self) -> np.ndarray:
+        return self.ticks[self.ticks['time_msc'] <= self.now_msc]
+
+    def symbol_info_tick(self, symbol):
+        tick = self._visible()[-1]
+        return SimpleNamespace(time=int(tick['time']), time_msc=int(tick['time_msc']), bid=float(tick['bid']), ask=float(tick['ask']))
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        if self.failing:
+            return None
+        visible = self._visible()
+        return visible[visible['time'] >= date_from][:count]
+
+
+def make_ticks(n: int, seed: int = 3) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    ticks = np.zeros(n, dtype=TICK_DTYPE)
+    # Several ticks can share a millisecond
+    ticks['time_msc'] = START_MSC + np.cumsum(rng.integers(0, 40, n))
+    ticks['time'] = ticks['time_msc'] // 1000
+    ticks['bid'] = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    ticks['ask'] = ticks['bid'] + 0.02
+    ticks['last'] = ticks['bid']
+    deals = rng.random(n) < 0.3
+    ticks['flags'] = np.where(deals, TICK_FLAG_VOLUME, 6)
+    ticks['volume'] = 1
+    ticks['volume_real'] = rng.integers(1, 5, n)
+    return ticks
+
+
+def collect(broker: TickBroker, step_msc: int, end_msc: int, **kwargs) -> TickCollector:
+    collector = TickCollector(broker, ['TEST'], timeframes=(Timeframe.M1,), capacity=10_000, **kwargs)
+    while broker.now_msc < end_msc:
+        collector.poll_once()
+        broker.now_msc += step_msc
+    collector.poll_once()
+    return collector
+
+
+def test_bars_include_every_tick_between_polls():
+    ticks = make_ticks(20_000)
+    broker = TickBroker(ticks)
+    collector = collect(broker, 1700, int(ticks['time_msc'][-1]))
+
+    assert collector.stats()['ticks']['TEST'] == len(ticks)
+    bars = collector.bars('TEST', Timeframe.M1, 100)
+    starts = ticks['time_msc'] // 60_000 * 60
+    for bar in bars:
+        in_bar = ticks[starts == bar['time']]
+        assert bar['tick_volume'] == len(in_bar)
+        assert bar['high'] == in_bar['bid'].max()
+        assert bar['low'] == in_bar['bid'].min()
+        assert bar['close'] == in_bar['bid'][-1]
+        deals = in_bar[in_bar['flags'] & TICK_FLAG_VOLUME > 0]
+        assert bar['real_volume'] == deals['volume_real'].sum()
+
+
+def test_market_view_is_withheld_while_polls_fail():
+    ticks = make_ticks(500)
+    broker = TickBroker(ticks)
+    clock = SimpleNamespace(now=0.0)
+    collector = collect(broker, 1000, START_MSC + 3000, max_age=5, clock=lambda: clock.now)
+    assert collector.market_view('TEST') is not None
+
+    broker.failing = True
+    clock.now = 4.0
+    collector.poll_once()
+    assert collector.market_view('TEST') is not None
+    clock.now = 6.0
+    collector.poll_once()
+    assert collector.market_view('TEST') is None
+    assert collector.errors == 2
+
+    broker.failing = False
+    collector.poll_once()
+    assert collector.market_view('TEST') is not None
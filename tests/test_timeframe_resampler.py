@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.market_generator import generate_rates
+from src.domain.value_objects.timeframe import Timeframe
+from src.infrastructure.data_providers.candle_store import RATE_DTYPE
+from src.infrastructure.data_providers.timeframe_resampler import TimeframeResampler, aggregate_rates
+
+
+def m1_with_gaps(bars: int = 3000, seed: int = 11) -> np.ndarray:
+    rates = generate_rates(bars, seed=seed, exchange_volume=True)
+    # Missing minutes, as around weekends and thin sessions
+    keep = np.random.default_rng(seed).random(bars) > 0.1
+    return rates[keep]
+
+
+def pandas_resample(m1: np.ndarray, minutes: int, offset_minutes: int) -> pd.DataFrame:
+    data = pd.DataFrame(m1)
+    data.index = pd.to_datetime(data['time'], unit='s')
+    bars = data.resample(f'{minutes}min', origin='epoch', offset=f'{offset_minutes}min').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+        'tick_volume': 'sum', 'spread': 'min', 'real_volume': 'sum', 'time': 'size',
+    })
+    bars = bars[bars['time'] > 0]
+    bars['time'] = bars.index.astype('int64') // 10 ** 9
+    return bars
+
+
+@pytest.mark.parametrize('minutes,offset_minutes', [(5, 0), (15, 0), (60, 0), (240, 0), (240, 120), (1440, -180)])
+def test_aggregation_matches_pandas_resample(minutes, offset_minutes):
+    m1 = m1_with_gaps()
+    bars = aggregate_rates(m1, minutes, offset_minutes * 60)
+    expected = pandas_resample(m1, minutes, offset_minutes)
+
+    assert len(bars) == len(expected)
+    np.testing.assert_array_equal(bars['time'], expected['time'])
+    for field in ('open', 'high', 'low', 'close', 'tick_volume', 'spread', 'real_volume'):
+        np.testing.assert_array_equal(bars[field], expected[field], err_msg=field)
+
+
+def test_bars_start_at_the_session_offset():
+    m1 = m1_with_gaps()
+    bars = aggregate_rates(m1, 240, 120 * 60)
+
+    assert np.all((bars['time'] - 120 * 60) % (240 * 60) == 0)
+    assert set(bars['time'] // 3600 % 24) <= {2, 6, 10, 14, 18, 22}
+
+
+def expected_latest(m1: np.ndarray, timeframe: Timeframe, count: int, offset_minutes: int) -> np.ndarray:
+    """Bars of every M1 rate up to the forming one, without the partial oldest bar."""
+    bars = aggregate_rates(m1, timeframe.value, offset_minutes * 60)
+    if len(bars) and bars['time'][0] < m1['time'][0]:
+        bars = bars[1:]
+    return bars[-count:]
+
+
+@pytest.mark.parametrize('offset_minutes', [0, 120])
+def test_latest_holds_partial_bars_until_they_close(offset_minutes):
+    m1 = m1_with_gaps(1500)
+    resampler = TimeframeResampler(history_size=5000, offset_minutes=offset_minutes)
+    resampler.update(m1[:200])
+    # Each later update carries a few closed bars and the forming one, overlapping the previous update
+    for end in range(200, len(m1) + 1, 7):
+        resampler.update(m1[end - 20:end])
+        seen = m1[:end]
+        assert resampler.snapshot_time == m1['time'][end - 1]
+        for timeframe in (Timeframe.M5, Timeframe.M15, Timeframe.H1, Timeframe.H4):
+            latest = resampler.latest(timeframe, 10)
+            np.testing.assert_array_equal(latest, expected_latest(seen, timeframe, 10, offset_minutes))
+
+
+def test_forming_bar_only_closes_once_a_later_bar_starts():
+    m1 = np.zeros(7, dtype=RATE_DTYPE)
+    m1['time'] = 1_704_067_200 + 60 * np.arange(7)
+    m1['open'] = m1['high'] = m1['low'] = m1['close'] = 100 + np.arange(7)
+    m1['tick_volume'] = 1
+    resampler = TimeframeResampler()
+
+    # 00:00-00:04 are in, the 00:04 bar still forming: the M5 bar is forming too
+    resampler.update(m1[:5])
+    latest = resampler.latest(Timeframe.M5, 5)
+    assert len(latest) == 1
+    assert latest[-1]['time'] == m1['time'][0]
+    assert latest[-1]['close'] == 104
+    assert latest[-1]['tick_volume'] == 5
+
+    # The forming M1 bar opens 00:05, so the 00:00 bar is closed and a new one forms
+    resampler.update(m1[4:6])
+    latest = resampler.latest(Timeframe.M5, 5)
+    assert list(latest['time']) == [m1['time'][0], m1['time'][5]]
+    assert latest[0]['close'] == 104
+    assert latest[-1]['open'] == latest[-1]['close'] == 105
+    assert latest[-1]['tick_volume'] == 1
+
+
+def test_gap_rebuilds_the_history():
+    m1 = generate_rates(600, seed=4)
+    resampler = TimeframeResampler()
+    resampler.update(m1[:100])
+    resampler.update(m1[400:600])
+
+    assert resampler.last_closed_time == m1['time'][598]
+    np.testing.assert_array_equal(resampler.latest(Timeframe.M15, 50), expected_latest(m1[400:600], Timeframe.M15, 50, 0))